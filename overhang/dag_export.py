@@ -0,0 +1,88 @@
+'''
+Author: Kevin Volkel
+
+Filename: dag_export.py
+
+Description: Writes the reaction DAG of a full (non lite) reaction tree out for other tools, either as compressed sparse row arrays in an .npz file or as a streamed edge list
+
+'''
+import logging
+import numpy as np
+
+elogger=logging.getLogger('dna.overhang.dag_export')
+elogger.addHandler(logging.NullHandler())
+
+'''
+.npz layout, node IDs are 0..N-1 in the order the walk reached them, only nodes reachable from the terminators are written:
+    height, use_count, true_children: int32 per node, pad reactions have height -1
+    is_pad, is_term: bool per node
+    pad_strand: int32 index into pad_strands per node, pad_strands[0] is ""
+    pad_strands: fixed width byte strings of the distinct pad strands
+    child_offsets: int64, the children of node i are children[child_offsets[i]:child_offsets[i+1]] in the order the tree holds them
+    children: int32 child node IDs
+    terminators: int32 IDs of the terminator nodes
+Every array has a plain dtype, so np.load(path) reads the file without pickling and without importing this package.
+'''
+
+
+def _walk(reactiontree): #yields (node ID, node, child node IDs) once per node reachable from the terminators, IDs are given out as nodes are first reached
+    IDs={} #node -> ID, nodes of a NodeStore are keyed by row
+    def node_ID(node):
+        key=node.get_index() if hasattr(node,'get_index') else id(node)
+        if key not in IDs:
+            IDs[key]=len(IDs)
+        return IDs[key]
+    for terminator in reactiontree._term_nodes: #terminators take the first IDs
+        node_ID(terminator)
+    for node,children in reactiontree.walk_nodes():
+        yield node_ID(node),node,[node_ID(_) for _ in children]
+
+
+def export_dag_csr(reactiontree,path): #write the DAG of a full reaction tree to path as an .npz of CSR arrays, returns the number of nodes written
+    rows={} #node ID -> (height, use count, true children, pad, term, pad strand index, children)
+    pad_strands={"":0}
+    for ID,node,child_IDs in _walk(reactiontree):
+        pad_strand=node.get_pad_strand()
+        if pad_strand not in pad_strands:
+            pad_strands[pad_strand]=len(pad_strands)
+        rows[ID]=(node.get_height(),node.get_use_count(),node.get_true_children(),bool(node.is_pad()),bool(node.is_term()),pad_strands[pad_strand],child_IDs)
+    num_nodes=len(rows)
+    order=[rows[_] for _ in range(0,num_nodes)]
+    child_counts=np.array([len(_[6]) for _ in order],dtype=np.int64)
+    child_offsets=np.zeros(num_nodes+1,dtype=np.int64)
+    child_offsets[1:]=np.cumsum(child_counts)
+    pool=[None]*len(pad_strands)
+    for pad_strand,index in pad_strands.items():
+        pool[index]=pad_strand
+    np.savez(path,
+             height=np.array([_[0] for _ in order],dtype=np.int32),
+             use_count=np.array([_[1] for _ in order],dtype=np.int32),
+             true_children=np.array([_[2] for _ in order],dtype=np.int32),
+             is_pad=np.array([_[3] for _ in order],dtype=bool),
+             is_term=np.array([_[4] for _ in order],dtype=bool),
+             pad_strand=np.array([_[5] for _ in order],dtype=np.int32),
+             pad_strands=np.array([_.encode('ascii') if not isinstance(_,bytes) else _ for _ in pool],dtype=bytes),
+             child_offsets=child_offsets,
+             children=np.array([child for _ in order for child in _[6]],dtype=np.int32),
+             terminators=np.array([_ for _ in range(0,num_nodes) if order[_][4]],dtype=np.int32))
+    elogger.info("exported {} nodes and {} edges to {}".format(num_nodes,int(child_offsets[-1]),path))
+    return num_nodes
+
+
+def load_dag_csr(path): #dictionary of the arrays written by export_dag_csr
+    data=np.load(path)
+    return dict([(name,data[name]) for name in data.files])
+
+
+def write_edge_list(reactiontree,out_file): #stream the DAG to an open text file without holding it in arrays, returns (nodes, edges) written
+    #lines are "n ID height use_count is_pad is_term" for each node, written when the walk reaches it, then "e parent_ID child_ID" for each of its edges
+    out_file.write("# n ID height use_count is_pad is_term\n# e parent_ID child_ID\n")
+    num_nodes=0
+    num_edges=0
+    for ID,node,child_IDs in _walk(reactiontree):
+        out_file.write("n {} {} {} {} {}\n".format(ID,node.get_height(),node.get_use_count(),1 if node.is_pad() else 0,1 if node.is_term() else 0))
+        for child_ID in child_IDs:
+            out_file.write("e {} {}\n".format(ID,child_ID))
+        num_nodes+=1
+        num_edges+=len(child_IDs)
+    return num_nodes,num_edges
@@ -2,6 +2,7 @@ from dnastorage.system.formats import *
 from dnastorage.system.header import *
 import io
 import sys
+from overhang.packed_strand import pack_strand
 
 import logging
 logger = logging.getLogger('dna.storage.system.dnafile')
@@ -339,6 +340,29 @@ class OverhangBitStringWriteDNAFile(WriteDNAFile):
                 assert type(ss) is not list
                 strand_list.append(ss)
         return strand_list
+
+    def get_packed_strands(self):#return strands as PackedStrands: payload bits packed into bytes, overhangs implied by codeword position
+        return list(self.iter_packed_strands())
+
+    def iter_strands(self):#generator over strands as the encoder produces them, without keeping them in self.strands
+        #iterating the encoder restarts it from the beginning of the file, so each call yields every strand once, if the file was already flushed the kept strands are used instead
+        if len(self.strands)>0:
+            source=self.strands
+        else:
+            source=self.enc
+        for ss in source:
+            if type(ss) is list:
+                for s in ss:
+                    assert type(s) is not list
+                    yield s
+            else:
+                yield ss
+
+    def iter_packed_strands(self):#generator over strands as PackedStrands
+        prefix_length=len(self.flanking_primer5+self.primer5)
+        suffix_length=len(self.flanking_primer3+self.primer3)
+        for s in self.iter_strands():
+            yield pack_strand(s[prefix_length:len(s)-suffix_length],self._num_overhangs,self._bits_per_block)
     
     def close(self): #write out the strands to file, this is an experimental format, so dumping on a close is useful only for debugging purposes 
         logger.debug("WriteOverhangBitStringDNAFile.close")
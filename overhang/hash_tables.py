@@ -0,0 +1,263 @@
+'''
+Author: Kevin Volkel
+
+Filename: hash_tables.py
+
+Description: Alternative strand hash tables that can be handed to the tree builders in place of a plain dictionary
+
+'''
+import hashlib
+import logging
+import os
+import sys
+import sqlite3
+import tempfile
+import pickle
+
+hlogger=logging.getLogger('dna.overhang.hash_tables')
+hlogger.addHandler(logging.NullHandler())
+
+
+def key_bytes(key): #byte string that uniquely identifies a strand hash table key (strand strings or packed integer keys)
+    if isinstance(key,bytes):
+        return b's'+key
+    if isinstance(key,str):
+        return b's'+key.encode('ascii')
+    if isinstance(key,int) or type(key).__name__=='long':
+        return b'i'+('%x'%key).encode('ascii')
+    return b'r'+repr(key).encode('ascii')
+
+
+def key_digest(key,digest_size=16): #fixed width digest of a key, blake2b when hashlib has it (python 3), md5 otherwise
+    if hasattr(hashlib,'blake2b'):
+        return hashlib.blake2b(key_bytes(key),digest_size=digest_size).digest()
+    return hashlib.md5(key_bytes(key)).digest()[:digest_size]
+
+
+class DigestHashTable(object): #strand hash table keyed on a digest of the key, top of tree keys are thousands of characters long but their digest is digest_size bytes
+    def __init__(self,digest_size=16,audit_rate=0.0):
+        self._table={}
+        self.digest_size=digest_size
+        #audit state: a sample of keys is kept in full so that digest collisions can be detected and reported
+        self.audit_rate=audit_rate
+        self._audit_threshold=int(audit_rate*65536) #keys whose digest starts with a 16 bit value below this are sampled
+        self._audit_keys={}
+        self._audit_checks=0
+        self._collisions=[]
+        #the builders look up the same key several times in a row, so remember the last digest
+        self._last_key=None
+        self._last_digest=None
+        self._last_audited=None
+
+    def _digest(self,key):
+        if key is not self._last_key:
+            self._last_key=key
+            self._last_digest=key_digest(key,self.digest_size)
+        return self._last_digest
+
+    def _audit(self,digest,key):
+        if key is self._last_audited or (ord(digest[0:1])<<8|ord(digest[1:2]))>=self._audit_threshold:
+            return
+        self._last_audited=key
+        self._audit_checks+=1
+        if digest not in self._audit_keys:
+            self._audit_keys[digest]=key
+        elif self._audit_keys[digest]!=key:
+            hlogger.warning("digest collision between sampled keys of length {} and {}".format(len(key_bytes(key)),len(key_bytes(self._audit_keys[digest]))))
+            self._collisions.append((self._audit_keys[digest],key))
+
+    def __contains__(self,key):
+        digest=self._digest(key)
+        if self._audit_threshold>0: self._audit(digest,key)
+        return digest in self._table
+
+    def __getitem__(self,key):
+        return self._table[self._digest(key)]
+
+    def __setitem__(self,key,value):
+        digest=self._digest(key)
+        if self._audit_threshold>0: self._audit(digest,key)
+        self._table[digest]=value
+
+    def __delitem__(self,key):
+        del self._table[self._digest(key)]
+
+    def __len__(self):
+        return len(self._table)
+
+    def __iter__(self): #iterates over digests, the full keys are not kept
+        return iter(self._table)
+
+    def get(self,key,default=None):
+        return self._table.get(self._digest(key),default)
+
+    def get_digest(self,digest,default=None): #lookup by a digest already computed with key_digest
+        return self._table.get(digest,default)
+
+    def set_digest(self,digest,value): #insert by a digest already computed with key_digest, used when tables are built in other processes
+        self._table[digest]=value
+
+    def iteritems(self):
+        for digest in self._table:
+            yield digest,self._table[digest]
+
+    def audit_report(self): #summary of the audit sample
+        return {"audit_rate":self.audit_rate,
+                "sampled_keys":len(self._audit_keys),
+                "audit_checks":self._audit_checks,
+                "collisions":len(self._collisions)}
+
+    def get_collisions(self): #(stored key, colliding key) pairs seen in the audit sample
+        return self._collisions
+
+
+class SpillHashTable(object): #strand hash table that keeps entries in memory up to a byte budget, then spills the least recently used partitions to an sqlite file
+    def __init__(self,memory_budget=1<<30,num_partitions=256,spill_dir=None,digest_keys=False):
+        self.memory_budget=memory_budget #approximate bytes of keys and values held in memory before partitions are spilled
+        self.num_partitions=num_partitions
+        self.digest_keys=digest_keys #store digests of keys rather than the keys themselves
+        self._partitions=[{} for _ in range(0,num_partitions)] #in memory entries of each partition
+        self._partition_bytes=[0]*num_partitions
+        self._disk_length=[0]*num_partitions #entries of each partition held on disk
+        self._last_used=[0]*num_partitions
+        self._memory_bytes=0
+        self._clock=0
+        self._db_path=None
+        self._db=None
+        self._spill_dir=spill_dir
+        self._last_key=None
+        self._last_stored_key=None
+        #statistics
+        self._hits=0
+        self._misses=0
+        self._disk_reads=0
+        self._spills=0
+        self._spilled_entries=0
+        self._promotions=0
+
+    def _stored_key(self,key):
+        if not self.digest_keys:
+            return key
+        if key is not self._last_key: #the builders look up the same key several times in a row
+            self._last_key=key
+            self._last_stored_key=key_digest(key)
+        return self._last_stored_key
+
+    def _open_db(self):
+        handle,self._db_path=tempfile.mkstemp(prefix='strand_hash_table_',suffix='.sqlite',dir=self._spill_dir)
+        os.close(handle)
+        self._db=sqlite3.connect(self._db_path)
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("CREATE TABLE spill (key BLOB PRIMARY KEY, partition INTEGER, value BLOB)")
+
+    def _find(self,stored_key): #partition and in memory dictionary holding stored_key, an entry found on disk is promoted back into memory
+        partition=hash(stored_key)%self.num_partitions
+        self._clock+=1
+        self._last_used[partition]=self._clock
+        table=self._partitions[partition]
+        if stored_key not in table and self._disk_length[partition]>0:
+            self._disk_reads+=1
+            disk_key=sqlite3.Binary(pickle.dumps(stored_key,2))
+            row=self._db.execute("SELECT value FROM spill WHERE key=?",(disk_key,)).fetchone()
+            if row is not None:
+                self._db.execute("DELETE FROM spill WHERE key=?",(disk_key,))
+                self._disk_length[partition]-=1
+                self._promotions+=1
+                self._insert(partition,table,stored_key,pickle.loads(bytes(row[0])))
+        return partition,table
+
+    def _insert(self,partition,table,stored_key,value):
+        size=sys.getsizeof(stored_key)+sys.getsizeof(value) #approximate, values that grow in place are not tracked
+        self._partition_bytes[partition]+=size
+        self._memory_bytes+=size
+        table[stored_key]=value
+        if self._memory_bytes>self.memory_budget:
+            self._enforce_budget(partition)
+
+    def _spill(self,partition):
+        table=self._partitions[partition]
+        if self._db is None:
+            self._open_db()
+        self._db.executemany("INSERT INTO spill (key,partition,value) VALUES (?,?,?)",
+                             [(sqlite3.Binary(pickle.dumps(key,2)),partition,sqlite3.Binary(pickle.dumps(value,2))) for key,value in table.items()])
+        self._disk_length[partition]+=len(table)
+        self._spills+=1
+        self._spilled_entries+=len(table)
+        self._memory_bytes-=self._partition_bytes[partition]
+        self._partition_bytes[partition]=0
+        self._partitions[partition]={}
+
+    def _enforce_budget(self,keep_partition): #spill least recently used partitions, never the one being worked on since the builders hold references into it
+        candidates=sorted([_ for _ in range(0,self.num_partitions) if _!=keep_partition and len(self._partitions[_])>0],key=lambda _:self._last_used[_])
+        for partition in candidates:
+            if self._memory_bytes<=self.memory_budget:
+                break
+            self._spill(partition)
+
+    def __contains__(self,key):
+        stored_key=self._stored_key(key)
+        _,table=self._find(stored_key)
+        if stored_key in table:
+            self._hits+=1
+            return True
+        self._misses+=1
+        return False
+
+    def __getitem__(self,key):
+        stored_key=self._stored_key(key)
+        return self._find(stored_key)[1][stored_key]
+
+    def __setitem__(self,key,value):
+        stored_key=self._stored_key(key)
+        partition,table=self._find(stored_key)
+        if stored_key in table:
+            table[stored_key]=value
+        else:
+            self._insert(partition,table,stored_key,value)
+
+    def __delitem__(self,key):
+        stored_key=self._stored_key(key)
+        _,table=self._find(stored_key)
+        del table[stored_key]
+
+    def __len__(self):
+        return sum([len(_) for _ in self._partitions])+sum(self._disk_length)
+
+    def get(self,key,default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def iteritems(self): #walks memory and then disk, spilled entries are not promoted
+        for table in self._partitions:
+            for item in list(table.items()):
+                yield item
+        if self._db is not None:
+            for row in self._db.execute("SELECT key,value FROM spill"):
+                yield pickle.loads(bytes(row[0])),pickle.loads(bytes(row[1]))
+
+    def __iter__(self):
+        for key,_ in self.iteritems():
+            yield key
+
+    def spill_report(self): #hit/miss, spill and promotion statistics
+        return {"memory_budget":self.memory_budget,
+                "memory_bytes":self._memory_bytes,
+                "entries":len(self),
+                "entries_on_disk":sum(self._disk_length),
+                "hits":self._hits,
+                "misses":self._misses,
+                "disk_reads":self._disk_reads,
+                "spills":self._spills,
+                "spilled_entries":self._spilled_entries,
+                "promotions":self._promotions}
+
+    def close(self): #drop the spill file
+        if self._db is not None:
+            self._db.close()
+            self._db=None
+            os.remove(self._db_path)
+
+    def __del__(self):
+        self.close()
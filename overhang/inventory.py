@@ -0,0 +1,153 @@
+'''
+Author: Kevin Volkel
+
+Filename: inventory.py
+
+Description: On disk inventory of reactions that have already been synthesized, keyed on (height, payload, start overhang). The lite builders can be handed an inventory so that only the reactions new data adds are counted, and the keys of a finished tree can be appended to it
+
+'''
+import os
+import glob
+import struct
+import logging
+import numpy as np
+from overhang.hash_tables import key_digest, DigestHashTable, SpillHashTable
+
+ilogger=logging.getLogger('dna.overhang.inventory')
+ilogger.addHandler(logging.NullHandler())
+
+ANY_OVERHANG=-1 #start overhang recorded for ideal reactions, which may use any overhangs
+
+'''
+Layout: every flush writes one segment, three .npy arrays of equal length sorted by digest: the high and low 64 bits of a 128 bit
+digest of each key, and the use count recorded for the key. Segments are opened with mmap_mode='r' so only the pages a lookup touches
+are read, and a lookup is a binary search per segment. The use count of a key is the sum over every segment holding it, compact()
+merges all segments into one.
+'''
+
+
+def payload_int(key): #data key of a substrand as the integer a PackedStrand would give, so string and packed runs share entries
+    if isinstance(key,str):
+        return int('1'+key,2)
+    return key
+
+
+def substrand_fields(key,reactiontree): #(data integer, start overhang) of a baseopt substrand key
+    if isinstance(key,str):
+        stride=reactiontree.codeword_length+reactiontree.overhang_length
+        data="".join([key[_:_+reactiontree.codeword_length] for _ in range(reactiontree.overhang_length,len(key),stride)])
+        return int('1'+data,2),reactiontree.overhang_to_num[key[:reactiontree.overhang_length]]
+    return divmod(key,reactiontree.num_overhangs) #packed substrand keys are data_key*num_overhangs+start%num_overhangs
+
+
+def payload_codewords(key,codeword_length): #number of codewords carried by a payload integer
+    return (payload_int(key).bit_length()-1)//codeword_length
+
+
+class ReactionInventory(object):
+    def __init__(self,path):
+        self.path=path
+        if not os.path.exists(path):
+            os.makedirs(path)
+        self._segments=[] #(high, low, count) memory mapped arrays
+        self._pending={} #digest -> use count added since the last flush
+        for name in sorted(glob.glob(os.path.join(path,"segment_*.high.npy"))):
+            self._segments.append(self._open_segment(name[:-len(".high.npy")]))
+        self.lookups=0
+        self.hits=0
+
+    def _open_segment(self,prefix):
+        return (np.load(prefix+".high.npy",mmap_mode='r'),np.load(prefix+".low.npy",mmap_mode='r'),np.load(prefix+".count.npy",mmap_mode='r'))
+
+    def digest(self,height,payload,start_overhang): #128 bit digest of a key split into (high, low) 64 bit integers
+        return struct.unpack(">QQ",key_digest(("%d:%d:%x"%(height,start_overhang,payload_int(payload))).encode('ascii'),16))
+
+    def _segment_count(self,segment,high,low):
+        highs,lows,counts=segment
+        index=int(np.searchsorted(highs,np.uint64(high)))
+        total=0
+        while index<len(highs) and int(highs[index])==high: #equal high words are next to each other, check the low word
+            if int(lows[index])==low:
+                total+=int(counts[index])
+            index+=1
+        return total
+
+    def lookup(self,height,payload,start_overhang): #use count recorded for a key, 0 if it has never been synthesized
+        self.lookups+=1
+        high,low=self.digest(height,payload,start_overhang)
+        total=self._pending.get((high,low),0)
+        for segment in self._segments:
+            total+=self._segment_count(segment,high,low)
+        if total>0:
+            self.hits+=1
+        return total
+
+    def contains(self,height,payload,start_overhang):
+        return self.lookup(height,payload,start_overhang)>0
+
+    def add(self,height,payload,start_overhang,count=1): #record uses of a key, written out by the next flush
+        key=self.digest(height,payload,start_overhang)
+        self._pending[key]=self._pending.get(key,0)+count
+
+    def _write_segment(self,entries,index): #entries is a list of ((high, low), count)
+        entries.sort()
+        prefix=os.path.join(self.path,"segment_%06d"%index)
+        np.save(prefix+".high.npy",np.array([_[0][0] for _ in entries],dtype=np.uint64))
+        np.save(prefix+".low.npy",np.array([_[0][1] for _ in entries],dtype=np.uint64))
+        np.save(prefix+".count.npy",np.array([_[1] for _ in entries],dtype=np.uint64))
+        return prefix
+
+    def _next_index(self):
+        names=glob.glob(os.path.join(self.path,"segment_*.high.npy"))
+        if len(names)==0:
+            return 0
+        return max([int(os.path.basename(_).split('.')[0].split('_')[1]) for _ in names])+1
+
+    def flush(self): #write the keys added since the last flush as a new segment
+        if len(self._pending)==0:
+            return
+        prefix=self._write_segment(list(self._pending.items()),self._next_index())
+        self._segments.append(self._open_segment(prefix))
+        ilogger.info("inventory {}: wrote {} keys, {} segments".format(self.path,len(self._pending),len(self._segments)))
+        self._pending={}
+
+    def _merged_entries(self): #((high, low), count) of every key on disk, summed over the segments holding it
+        merged={}
+        for highs,lows,counts in self._segments:
+            for high,low,count in zip(highs.tolist(),lows.tolist(),counts.tolist()):
+                merged[(high,low)]=merged.get((high,low),0)+count
+        return list(merged.items())
+
+    def compact(self): #merge every segment into one, summing the use counts of keys held by several segments
+        self.flush()
+        if len(self._segments)<2:
+            return
+        entries=self._merged_entries()
+        old_names=glob.glob(os.path.join(self.path,"segment_*.npy"))
+        self._segments=[] #no memory mapped array of the old segments is left open when their files are removed
+        prefix=self._write_segment(entries,self._next_index())
+        for name in old_names:
+            os.remove(name)
+        self._segments=[self._open_segment(prefix)]
+
+    def __len__(self): #entries on disk, a key held by several segments is counted once per segment
+        return sum([len(_[0]) for _ in self._segments])+len(self._pending)
+
+    def record_tree(self,reactiontree,kind): #append the keys of a finished ideal, baseopt or baseopt_w lite tree along with their use counts
+        table=reactiontree.strand_hash_table
+        assert not isinstance(table,DigestHashTable) and not (isinstance(table,SpillHashTable) and table.digest_keys) #the full keys are needed
+        items=table.iteritems() if hasattr(table,'iteritems') else table.items()
+        heights=dict([(block_group_size,height) for height,block_group_size in enumerate(reactiontree.geometry.block_group_sizes)])
+        for key,value in items:
+            if kind=="ideal":
+                self.add(value>>32,key,ANY_OVERHANG,value&(4294967296-1))
+            elif kind=="baseopt":
+                payload,start_overhang=substrand_fields(key,reactiontree)
+                self.add(value>>32,payload,start_overhang,value&(4294967296-1))
+            else: #baseopt_w tables keep overhang versions of complete sub reactions, whose codeword count is the block group size of their height
+                block_group_size=payload_codewords(key,reactiontree.codeword_length)
+                height=heights[block_group_size]
+                for strandIDmod,count in value.items():
+                    #strandIDmod is the sub reaction's index mod num_overhangs, so this is the start overhang baseopt_w_strand_lite looks up
+                    self.add(height,key,(strandIDmod*block_group_size)%reactiontree.num_overhangs,count)
+        self.flush()
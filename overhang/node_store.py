@@ -0,0 +1,343 @@
+'''
+Author: Kevin Volkel
+
+Filename: node_store.py
+
+Description: Struct of arrays storage for the nodes of full reaction trees. Each node is a row of parallel typed arrays instead of a ReactionNode object, and StoredReactionNode gives the builders the same interface as ReactionNode over a row
+
+'''
+import array
+import numpy as np
+from overhang.strand_id_set import StrandIDSet
+
+#bits of the flags array
+PAD_FLAG=1
+TERM_FLAG=2
+VISITED_FLAG=4
+
+NO_EDGE=-1 #end of a child or strand ID chain
+STRAND_CHAIN_LIMIT=16 #strand IDs a node keeps in the chained log before they move to a StrandIDSet
+
+
+def _numpy_view(values,dtype): #numpy array sharing memory with a typed array
+    if len(values)==0: #numpy can not view an empty buffer
+        return np.zeros(0,dtype=dtype)
+    return np.frombuffer(values,dtype=dtype)
+
+
+class NodeStore(object): #parallel arrays indexed by node, the arrays grow by appending so rows are never moved
+    def __init__(self):
+        self.height=array.array('i')
+        self.use_count=array.array('i')
+        self.flags=array.array('B')
+        self.generation=array.array('i') #number of the last tree walk that reached each node
+        self.true_children=array.array('i')
+        self.pad_strand=array.array('i') #index into the interned string pool, 0 is ""
+        #children are appended while a node's subtree is still being walked, so they are kept as an edge log chained per node
+        self.child_head=array.array('i')
+        self.child_tail=array.array('i')
+        self.child_count=array.array('i')
+        self.edge_child=array.array('i')
+        self.edge_next=array.array('i')
+        #finish() replaces the edge log with CSR arrays once the build is done, the children of node i are child_IDs[child_offsets[i]:child_offsets[i+1]]
+        self.child_offsets=None
+        self.child_IDs=None
+        #strand IDs using each node, chained the same way until a node is shared by more than STRAND_CHAIN_LIMIT strands
+        self.strand_count=array.array('i')
+        self.strand_head=array.array('i')
+        self.strand_tail=array.array('i')
+        self.strand_ID=array.array('i')
+        self.strand_next=array.array('i')
+        self._strings=[""] #interned pad strands
+        self._string_index={"":0}
+        self._strand_sets={} #node -> StrandIDSet for heavily shared nodes
+        self._corrected_substrands={} #node -> corrected substrand, these only live until the parent has been corrected
+
+    def __len__(self):
+        return len(self.height)
+
+    def add_node(self,strandID,height,is_pad): #append a row, returns its index
+        index=len(self.height)
+        self.height.append(height)
+        self.use_count.append(1)
+        self.flags.append(PAD_FLAG if is_pad else 0)
+        self.generation.append(0)
+        self.true_children.append(0)
+        self.pad_strand.append(0)
+        self.child_head.append(NO_EDGE)
+        self.child_tail.append(NO_EDGE)
+        self.child_count.append(0)
+        self.strand_count.append(0)
+        self.strand_head.append(NO_EDGE)
+        self.strand_tail.append(NO_EDGE)
+        self.add_strand_IDs(index,strandID)
+        return index
+
+    def intern(self,string): #index of string in the pool
+        index=self._string_index.get(string)
+        if index is None:
+            index=len(self._strings)
+            self._strings.append(string)
+            self._string_index[string]=index
+        return index
+
+    def string(self,index):
+        return self._strings[index]
+
+    def add_child(self,node,child):
+        assert self.child_offsets is None #children can not be added once the store is finished
+        edge=len(self.edge_child)
+        self.edge_child.append(child)
+        self.edge_next.append(NO_EDGE)
+        if self.child_tail[node]==NO_EDGE:
+            self.child_head[node]=edge
+        else:
+            self.edge_next[self.child_tail[node]]=edge
+        self.child_tail[node]=edge
+        self.child_count[node]+=1
+
+    def _chained_child_edges(self,node): #edge log indexes of node's children in order
+        edge=self.child_head[node]
+        while edge!=NO_EDGE:
+            yield edge
+            edge=self.edge_next[edge]
+
+    def child_array(self): #array holding the children, edge_child while the build appends them and child_IDs once the store is finished
+        return self.edge_child if self.child_offsets is None else self.child_IDs
+
+    def child_edges(self,node): #indexes of node's children in child_array() in order
+        if self.child_offsets is not None:
+            return range(self.child_offsets[node],self.child_offsets[node+1])
+        return self._chained_child_edges(node)
+
+    def children(self,node):
+        child_array=self.child_array()
+        return [child_array[_] for _ in self.child_edges(node)]
+
+    def finish(self): #replace the child edge log with CSR arrays, called once the build is done, children can be overwritten but not added afterwards
+        if self.child_offsets is not None:
+            return
+        offsets=array.array('i',[0])
+        children=array.array('i')
+        for node in range(0,len(self)):
+            children.extend([self.edge_child[_] for _ in self._chained_child_edges(node)])
+            offsets.append(len(children))
+        self.child_offsets=offsets
+        self.child_IDs=children
+        self.child_head=array.array('i')
+        self.child_tail=array.array('i')
+        self.edge_child=array.array('i')
+        self.edge_next=array.array('i')
+
+    def add_strand_IDs(self,node,strandID): #strandID can be a single ID, a list of IDs or a StrandIDSet
+        if node in self._strand_sets:
+            self._strand_sets[node].update(strandID if isinstance(strandID,StrandIDSet) or type(strandID) is list else [strandID])
+            return
+        for ID in (strandID if isinstance(strandID,StrandIDSet) or type(strandID) is list else [strandID]):
+            if self.has_strand_ID(node,ID):
+                continue
+            if self.strand_count[node]>=STRAND_CHAIN_LIMIT: #move the node's IDs to a compressed set, the chain entries are left unused
+                IDs=StrandIDSet(self._chained_strand_IDs(node))
+                IDs.update(strandID if isinstance(strandID,StrandIDSet) or type(strandID) is list else [strandID])
+                self._strand_sets[node]=IDs
+                self.strand_head[node]=NO_EDGE
+                self.strand_tail[node]=NO_EDGE
+                return
+            self.strand_count[node]+=1
+            entry=len(self.strand_ID)
+            self.strand_ID.append(ID)
+            self.strand_next.append(NO_EDGE)
+            if self.strand_tail[node]==NO_EDGE:
+                self.strand_head[node]=entry
+            else:
+                self.strand_next[self.strand_tail[node]]=entry
+            self.strand_tail[node]=entry
+
+    def strand_ID_set(self,node): #StrandIDSet of the strands using node
+        if node in self._strand_sets:
+            return self._strand_sets[node]
+        return StrandIDSet(self._chained_strand_IDs(node))
+
+    def has_strand_ID(self,node,ID):
+        if node in self._strand_sets:
+            return ID in self._strand_sets[node]
+        entry=self.strand_head[node]
+        while entry!=NO_EDGE:
+            if self.strand_ID[entry]==ID:
+                return True
+            entry=self.strand_next[entry]
+        return False
+
+    def _chained_strand_IDs(self,node):
+        IDs=[]
+        entry=self.strand_head[node]
+        while entry!=NO_EDGE:
+            IDs.append(self.strand_ID[entry])
+            entry=self.strand_next[entry]
+        return IDs
+
+    def set_corrected_substrand(self,node,corrected_strand):
+        if corrected_strand=="":
+            self._corrected_substrands.pop(node,None)
+        else:
+            self._corrected_substrands[node]=corrected_strand
+
+    def get_corrected_substrand(self,node):
+        return self._corrected_substrands.get(node,"")
+
+    def child_csr(self): #(offsets, children) numpy arrays, the children of node i are children[offsets[i]:offsets[i+1]], finishes the store
+        self.finish()
+        return _numpy_view(self.child_offsets,np.int32).astype(np.int64),_numpy_view(self.child_IDs,np.int32)
+
+    def arrays(self): #zero copy numpy views of the per node arrays
+        return {"height":_numpy_view(self.height,np.int32),
+                "use_count":_numpy_view(self.use_count,np.int32),
+                "flags":_numpy_view(self.flags,np.uint8),
+                "true_children":_numpy_view(self.true_children,np.int32),
+                "pad_strand":_numpy_view(self.pad_strand,np.int32)}
+
+    def memory_bytes(self): #approximate bytes held by the arrays, the string pool is not counted
+        arrays=[self.height,self.use_count,self.flags,self.generation,self.true_children,self.pad_strand,self.child_head,self.child_tail,self.child_count,
+                self.edge_child,self.edge_next,self.child_offsets,self.child_IDs,self.strand_count,self.strand_head,self.strand_tail,self.strand_ID,self.strand_next]
+        return sum([_.itemsize*len(_) for _ in arrays if _ is not None])+sum([_.memory_bytes() for _ in self._strand_sets.values()])
+
+
+class _ChildList(object): #list-like view of a stored node's children, node_correction overwrites the last child in place
+    __slots__=('_store','_node')
+
+    def __init__(self,store,node):
+        self._store=store
+        self._node=node
+
+    def _edge(self,position): #index of the child at position in the store's child_array()
+        count=self._store.child_count[self._node]
+        if position<0:
+            position+=count
+        if position<0 or position>=count:
+            raise IndexError("child index out of range")
+        if self._store.child_offsets is not None:
+            return self._store.child_offsets[self._node]+position
+        if position==count-1:
+            return self._store.child_tail[self._node]
+        for index,edge in enumerate(self._store.child_edges(self._node)):
+            if index==position:
+                return edge
+
+    def __len__(self):
+        return self._store.child_count[self._node]
+
+    def __getitem__(self,position):
+        return StoredReactionNode(self._store,self._store.child_array()[self._edge(position)])
+
+    def __setitem__(self,position,child):
+        self._store.child_array()[self._edge(position)]=child._index
+
+    def __iter__(self):
+        child_array=self._store.child_array()
+        for edge in self._store.child_edges(self._node):
+            yield StoredReactionNode(self._store,child_array[edge])
+
+
+class StoredReactionNode(object): #ReactionNode interface over one row of a NodeStore
+    __slots__=('_store','_index')
+
+    def __init__(self,store,index):
+        self._store=store
+        self._index=index
+
+    def __eq__(self,other):
+        return isinstance(other,StoredReactionNode) and other._store is self._store and other._index==self._index
+
+    def __ne__(self,other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self._index)
+
+    def get_index(self):
+        return self._index
+
+    #methods to update node characteristics upon creation
+    def inc_use_count(self):
+        self._store.use_count[self._index]+=1
+    def dec_use_count(self):
+        self._store.use_count[self._index]-=1
+    def get_use_count(self):
+        return self._store.use_count[self._index]
+
+    def get_corrected_substrand(self):
+        return self._store.get_corrected_substrand(self._index)
+    def set_corrected_substrand(self,corrected_strand):
+        self._store.set_corrected_substrand(self._index,corrected_strand)
+
+    #methods to manage what strand indexes are using this reaction
+    def insert_strand_ID(self,ID):
+        self._store.add_strand_IDs(self._index,ID)
+
+    def is_ID(self,ID):
+        return self._store.has_strand_ID(self._index,ID)
+
+    def get_strand_IDs(self):
+        return self._store.strand_ID_set(self._index)
+
+    #methods for toggling the visited state of the node
+    def _set_flag(self,flag,value):
+        if value:
+            self._store.flags[self._index]|=flag
+        else:
+            self._store.flags[self._index]&=~flag&0xff
+    def _get_flag(self,flag):
+        return 1 if self._store.flags[self._index]&flag else 0
+
+    def set_visited(self):
+        self._set_flag(VISITED_FLAG,True)
+    def clear_visited(self):
+        self._set_flag(VISITED_FLAG,False)
+    def get_visited(self):
+        return self._get_flag(VISITED_FLAG)
+    def invert_visited(self):
+        self._set_flag(VISITED_FLAG,not self._get_flag(VISITED_FLAG))
+    def get_generation(self):
+        return self._store.generation[self._index]
+    def set_generation(self,generation):
+        self._store.generation[self._index]=generation
+
+    #methods to manage node children
+    def add_child(self,child):
+        self._store.add_child(self._index,child._index)
+    def get_child_list(self):
+        return _ChildList(self._store,self._index)
+
+    #methods to manage true children
+    def set_true_children(self,number_true):
+        self._store.true_children[self._index]=number_true
+    def get_true_children(self):
+        return self._store.true_children[self._index]
+
+    #methods to manage terminator status
+    def set_term(self):
+        self._set_flag(TERM_FLAG,True)
+    def is_term(self):
+        return self._get_flag(TERM_FLAG)
+    def clear_term(self):
+        self._set_flag(TERM_FLAG,False)
+
+    #methods to manage whether a node is padding or not
+    def set_pad(self):
+        self._set_flag(PAD_FLAG,True)
+    def clear_pad(self):
+        self._set_flag(PAD_FLAG,False)
+    def is_pad(self):
+        return self._get_flag(PAD_FLAG)
+
+    #methods to manage padding strand
+    def set_pad_strand(self,pad_strand):
+        self._store.pad_strand[self._index]=self._store.intern(pad_strand)
+    def get_pad_strand(self):
+        return self._store.string(self._store.pad_strand[self._index])
+
+    #methods to manage height information
+    def set_height(self,height):
+        self._store.height[self._index]=height
+    def get_height(self):
+        return self._store.height[self._index]
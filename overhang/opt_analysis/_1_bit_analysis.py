@@ -2,6 +2,8 @@ import matplotlib
 matplotlib.use('pdf')
 import matplotlib.pyplot as plt
 import overhang.tree as tree
+import overhang.tree_fused as tree_fused
+import overhang.tree_sample as tree_sample
 import overhang.reaction_node as node
 import logging
 from overhang.dnastorage_utils.system.dnafile import *
@@ -44,45 +46,80 @@ def _sweep_overhangs_1_bit(self,data_buffer,workloadID,debug_fname=None): #workl
     self._1_bit_results[workloadID[0]][workloadID[1]]["overhang_array"]=overhang_list
     self._1_bit_results[workloadID[0]][workloadID[1]]["no_opt_reaction_count"]=[] #array of integers
     self._1_bit_results[workloadID[0]][workloadID[1]]["rotate_reaction_count"]=[]
+    self._1_bit_results[workloadID[0]][workloadID[1]]["estimated"]=self._sample_tolerance is not None #counts are extrapolated from strand samples, height maps are left empty
+    self._1_bit_results[workloadID[0]][workloadID[1]]["estimate_bounds"]={} #count name -> list of (low, high) confidence intervals, one per overhang count
     
     self._1_bit_results[workloadID[0]][workloadID[1]]["ideal_height_map"]=np.zeros((len(overhang_list),int(math.ceil(math.log((strand_length_bytes+index_bytes)*8,2)))),dtype=np.uint) #build np array to be used as heat map
     self._1_bit_results[workloadID[0]][workloadID[1]]["opt_height_map"]=np.zeros((len(overhang_list),int(math.ceil(math.log((strand_length_bytes+index_bytes)*8,2)))),dtype=np.uint)
     
     for overhang_index,overhang_count in enumerate(overhang_list):
         print("{} {}".format(workloadID,overhang_count))
-        dna_file=OverhangBitStringWriteDNAFile(primer5=self._primer5, formatid=self._format_ID, primer3=self._primer3, out_fd=output_filename,fsmd_abbrev='OH_BITSTRING_XXX',\
-                                                   bits_per_block=1,strand_length=strand_length_bytes*8,num_overhangs=overhang_count)
-        dna_file.write(data_buffer)
-        dna_file.header_flush()
-        strand_list=dna_file.get_strands() #get strands after encoding
+        #payloads are encoded once per workload, the strands for each overhang count are derived from them
+        strand_list=self._encoding_cache.strands(data_buffer,output_filename,1,strand_length_bytes*8,overhang_count,
+                                                 packed=self._packed_strands,stream=self._stream_strands)
+        if self._sample_tolerance is not None: #estimate every count from strand samples instead of building the full trees
+            self._estimate_1_bit_counts(strand_list,overhang_count,(index_bytes+strand_length_bytes)*8,self._1_bit_results[workloadID[0]][workloadID[1]])
+            sys.stdout.flush()
+            continue
      
-        start_time=time.time()
-        transform_tree=tree.construct_tree_transform_lite(strand_list,overhang_count,int(math.ceil(math.log(overhang_count,4))),1,
-                                                          (index_bytes+strand_length_bytes)*8,h_array=None) #+4 for the number of bytes used for indexing
-        self._1_bit_results[workloadID[0]][workloadID[1]]["transform_reaction_count"].append(transform_tree.order())
-        #print transform_tree.order()
-        del transform_tree
-        print("---- transform  tree build on {} took {} seconds ---".format(workloadID[1],time.time()-start_time))
-
-
-        start_time=time.time()
-        optimized_tree=tree.construct_tree_baseopt_lite_w(strand_list,overhang_count,int(math.ceil(math.log(overhang_count,4))),1,
-                                                       (index_bytes+strand_length_bytes)*8,h_array=self._1_bit_results[workloadID[0]][workloadID[1]]["opt_height_map"][overhang_index][:]) #+4 for the number of bytes used for indexing
-        self._1_bit_results[workloadID[0]][workloadID[1]]["opt_reaction_count"].append(optimized_tree.order())
-        #print optimized_tree.order()
-        opt_hash=optimized_tree.strand_hash_table #grab the hash table
-        del optimized_tree
+        if self._fused_engine: #transform, optimized and ideal trees share one walk over the strands
+            start_time=time.time()
+            fused_trees=tree_fused.construct_trees_fused_lite(strand_list,overhang_count,int(math.ceil(math.log(overhang_count,4))),1,
+                                                              (index_bytes+strand_length_bytes)*8,strategies=(tree_fused.TRANSFORM,tree_fused.BASEOPT_W,tree_fused.IDEAL),
+                                                              h_arrays={tree_fused.BASEOPT_W:self._1_bit_results[workloadID[0]][workloadID[1]]["opt_height_map"][overhang_index][:],
+                                                                        tree_fused.IDEAL:self._1_bit_results[workloadID[0]][workloadID[1]]["ideal_height_map"][overhang_index][:]},
+                                                              hash_tables={tree_fused.TRANSFORM:self._new_hash_table(),tree_fused.BASEOPT_W:self._new_hash_table(),tree_fused.IDEAL:self._new_hash_table()})
+            self._1_bit_results[workloadID[0]][workloadID[1]]["transform_reaction_count"].append(fused_trees[tree_fused.TRANSFORM].order())
+            self._1_bit_results[workloadID[0]][workloadID[1]]["opt_reaction_count"].append(fused_trees[tree_fused.BASEOPT_W].order())
+            self._1_bit_results[workloadID[0]][workloadID[1]]["ideal_reaction_count"].append(fused_trees[tree_fused.IDEAL].order())
+            self._report_hash_table("transform",fused_trees[tree_fused.TRANSFORM])
+            self._report_hash_table("optimized",fused_trees[tree_fused.BASEOPT_W])
+            self._report_hash_table("ideal",fused_trees[tree_fused.IDEAL])
+            opt_hash=self._snapshot_opt_table(fused_trees[tree_fused.BASEOPT_W].strand_hash_table,workloadID,overhang_count) #grab the hash table
+            del fused_trees
+            gc.collect()
+            print("---- fused transform, optimized and ideal tree builds on {} took {} seconds ---".format(workloadID[1],time.time()-start_time))
+
+            #rotate needs the finished optimized table, so it takes its own walk
+            start_time=time.time()
+            rotate_tree=tree_fused.construct_trees_fused_lite(strand_list,overhang_count,int(math.ceil(math.log(overhang_count,4))),1,
+                                                              (index_bytes+strand_length_bytes)*8,strategies=(tree_fused.ROTATE,),opt_dictionary=opt_hash,
+                                                              hash_tables={tree_fused.ROTATE:self._new_hash_table()})[tree_fused.ROTATE]
+            self._1_bit_results[workloadID[0]][workloadID[1]]["rotate_reaction_count"].append(rotate_tree.order())
+            self._report_hash_table("rotate",rotate_tree)
+            del rotate_tree
+            print("---- rotate  tree build on {} took {} seconds ---".format(workloadID[1],time.time()-start_time))
+        else:
+            start_time=time.time()
+            transform_tree=tree.construct_tree_transform_lite(strand_list,overhang_count,int(math.ceil(math.log(overhang_count,4))),1,
+                                                              (index_bytes+strand_length_bytes)*8,h_array=None,hash_table=self._new_hash_table()) #+4 for the number of bytes used for indexing
+            self._1_bit_results[workloadID[0]][workloadID[1]]["transform_reaction_count"].append(transform_tree.order())
+            self._report_hash_table("transform",transform_tree)
+            #print transform_tree.order()
+            del transform_tree
+            print("---- transform  tree build on {} took {} seconds ---".format(workloadID[1],time.time()-start_time))
+
+
+            start_time=time.time()
+            optimized_tree=tree.construct_tree_baseopt_lite_w(strand_list,overhang_count,int(math.ceil(math.log(overhang_count,4))),1,
+                                                           (index_bytes+strand_length_bytes)*8,h_array=self._1_bit_results[workloadID[0]][workloadID[1]]["opt_height_map"][overhang_index][:],hash_table=self._new_hash_table(),workers=self._workers) #+4 for the number of bytes used for indexing
+            self._1_bit_results[workloadID[0]][workloadID[1]]["opt_reaction_count"].append(optimized_tree.order())
+            self._report_hash_table("optimized",optimized_tree)
+            #print optimized_tree.order()
+            opt_hash=self._snapshot_opt_table(optimized_tree.strand_hash_table,workloadID,overhang_count) #grab the hash table
+            del optimized_tree
         
-        print("---- optimized tree build on {} took {} seconds ---".format(workloadID[1],time.time()-start_time))
+            print("---- optimized tree build on {} took {} seconds ---".format(workloadID[1],time.time()-start_time))
 
         
-        start_time=time.time()
-        rotate_tree=tree.construct_tree_rotate_lite(strand_list,overhang_count,int(math.ceil(math.log(overhang_count,4))),1,
-                                                          (index_bytes+strand_length_bytes)*8,h_array=None,opt_dictionary=opt_hash) #+4 for the number of bytes used for indexing
-        self._1_bit_results[workloadID[0]][workloadID[1]]["rotate_reaction_count"].append(rotate_tree.order())
-        #print transform_tree.order()
-        del rotate_tree
-        print("---- rotate  tree build on {} took {} seconds ---".format(workloadID[1],time.time()-start_time))
+            start_time=time.time()
+            rotate_tree=tree.construct_tree_rotate_lite(strand_list,overhang_count,int(math.ceil(math.log(overhang_count,4))),1,
+                                                              (index_bytes+strand_length_bytes)*8,h_array=None,opt_dictionary=opt_hash,hash_table=self._new_hash_table()) #+4 for the number of bytes used for indexing
+            self._1_bit_results[workloadID[0]][workloadID[1]]["rotate_reaction_count"].append(rotate_tree.order())
+            self._report_hash_table("rotate",rotate_tree)
+            #print transform_tree.order()
+            del rotate_tree
+            print("---- rotate  tree build on {} took {} seconds ---".format(workloadID[1],time.time()-start_time))
 
 
         start_time=time.time()
@@ -92,13 +129,15 @@ def _sweep_overhangs_1_bit(self,data_buffer,workloadID,debug_fname=None): #workl
         del unoptimized_tree
         gc.collect()
         print("---- no optimized tree build on {} took {} seconds ---".format(workloadID[1],time.time()-start_time))
-        start_time=time.time()
-        ideal_tree=tree.construct_tree_ideal_lite(strand_list,overhang_count,int(math.ceil(math.log(overhang_count,4))),1,
-                                                 (index_bytes+strand_length_bytes)*8,h_array=self._1_bit_results[workloadID[0]][workloadID[1]]["ideal_height_map"][overhang_index][:])
-        self._1_bit_results[workloadID[0]][workloadID[1]]["ideal_reaction_count"].append(ideal_tree.order())
-        del ideal_tree
-        gc.collect()
-        print("---- ideal tree build on {} took {} seconds ---".format(workloadID[1],time.time()-start_time))
+        if not self._fused_engine:
+            start_time=time.time()
+            ideal_tree=self._ideal_builder()(strand_list,overhang_count,int(math.ceil(math.log(overhang_count,4))),1,
+                                                     (index_bytes+strand_length_bytes)*8,h_array=self._1_bit_results[workloadID[0]][workloadID[1]]["ideal_height_map"][overhang_index][:],hash_table=self._new_hash_table(),workers=self._workers)
+            self._1_bit_results[workloadID[0]][workloadID[1]]["ideal_reaction_count"].append(ideal_tree.order())
+            self._report_hash_table("ideal",ideal_tree)
+            del ideal_tree
+            gc.collect()
+            print("---- ideal tree build on {} took {} seconds ---".format(workloadID[1],time.time()-start_time))
         tlogger.debug('Finished building trees for '+output_filename)
         #collect the number of nodes in the constructed graphs, this equals the number of reactions the have to be performed 
         sys.stdout.flush()
@@ -107,6 +146,25 @@ def _sweep_overhangs_1_bit(self,data_buffer,workloadID,debug_fname=None): #workl
     pi.dump(self._1_bit_results,picklefile)
     picklefile.close()#store the ultimate results file
     
+def _estimate_1_bit_counts(self,strand_list,overhang_count,strand_length,results): #fill in one overhang count's results with sampled estimates of each tree's reaction count
+    overhang_length=int(math.ceil(math.log(overhang_count,4)))
+    builds={"transform_reaction_count":(lambda strands: tree.construct_tree_transform_lite(strands,overhang_count,overhang_length,1,strand_length),False,False),
+            "opt_reaction_count":(lambda strands: tree.construct_tree_baseopt_lite_w(strands,overhang_count,overhang_length,1,strand_length),False,False),
+            "rotate_reaction_count":(lambda strands: tree.construct_tree_rotate_lite(strands,overhang_count,overhang_length,1,strand_length,
+                                                                                     opt_dictionary=tree.construct_tree_baseopt_lite_w(strands,overhang_count,overhang_length,1,strand_length).strand_hash_table),False,False),
+            "ideal_reaction_count":(lambda strands: tree.construct_tree_ideal_lite(strands,overhang_count,overhang_length,1,strand_length),True,True)}
+    for name in builds:
+        start_time=time.time()
+        build,pad_nodes_counted,per_height=builds[name] #only the ideal table holds (height<<32)|count values to fit per height
+        estimate=tree_sample.estimate_order_sampled(build,strand_list,overhang_count,strand_length,pad_nodes_counted=pad_nodes_counted,per_height=per_height,rel_tolerance=self._sample_tolerance)
+        results[name].append(int(round(estimate.order)))
+        if name not in results["estimate_bounds"]:
+            results["estimate_bounds"][name]=[]
+        results["estimate_bounds"][name].append((estimate.low,estimate.high))
+        print("---- {} estimated at {} ({}, {}) from {} of {} strands in {} seconds ---".format(name,int(round(estimate.order)),int(estimate.low),int(estimate.high),estimate.sample_size,estimate.num_strands,time.time()-start_time))
+    unoptimized_tree=tree.construct_tree_unoptimized_lite(strand_list,overhang_count,overhang_length,1,strand_length)
+    results["no_opt_reaction_count"].append(unoptimized_tree.order()) #the unoptimized count is analytical, so it is exact
+    
 def analyze_1_bit(self):
     #analyze all workloads across different overhangs and data-in-block sizes
     for category in self._workloadDict:
@@ -2,15 +2,61 @@ import logging
 import os
 import shutil
 import pickle as pi
+from overhang.hash_tables import DigestHashTable, SpillHashTable
+from overhang.table_snapshot import save_table_snapshot, TableSnapshot, MOD_COUNTS
+import overhang.tree as tree
+import overhang.tree_batch as tree_batch
+import overhang.tree_approx as tree_approx
+from overhang.opt_analysis.encoding_cache import EncodingCache
 
 tlogger=logging.getLogger('dna.overhang.tools.tree_analysis')
 tlogger.addHandler(logging.NullHandler())
 
 class tree_analysis: #class for analyzing reaction trees based on input files
-    from overhang.opt_analysis._1_bit_analysis import _sweep_overhangs_1_bit,analyze_1_bit,draw_1_bit #import analysis dedicated to 1 bit codewords
+    from overhang.opt_analysis._1_bit_analysis import _sweep_overhangs_1_bit,_estimate_1_bit_counts,analyze_1_bit,draw_1_bit #import analysis dedicated to 1 bit codewords
     from overhang.opt_analysis._opt_codeword_analysis import _sweep_overhangs_codewordsize, analyze_opt_codewordsize, draw_opt_codewordsize
     #import analysis to find optimal overhang/codeword combination 
     
+    def _new_hash_table(self): #strand hash table for a lite tree build, None lets the builder use a plain dictionary
+        if self._spill_budget is not None:
+            return SpillHashTable(memory_budget=self._spill_budget,spill_dir=self._spill_dir,digest_keys=self._digest_keys)
+        if not self._digest_keys:
+            return None
+        return DigestHashTable(audit_rate=self._digest_audit_rate)
+
+    def _ideal_builder(self): #builder used for ideal trees
+        if self._approx_counts:
+            return tree_approx.construct_tree_ideal_approx
+        if self._batch_engine:
+            return tree_batch.construct_tree_ideal_batch
+        if self._consed_builds:
+            return tree.construct_tree_ideal_consed
+        return tree.construct_tree_ideal_lite
+
+    def _baseopt_builder(self): #builder used for baseopt trees
+        if self._approx_counts:
+            return tree_approx.construct_tree_baseopt_approx
+        if self._batch_engine:
+            return tree_batch.construct_tree_baseopt_batch
+        if self._consed_builds:
+            return tree.construct_tree_baseopt_consed
+        return tree.construct_tree_baseopt_lite
+
+    def _report_hash_table(self,tree_name,reactiontree): #log digest audit and spill results for a finished tree build
+        if isinstance(reactiontree.strand_hash_table,DigestHashTable) and reactiontree.strand_hash_table.audit_rate>0:
+            tlogger.info("{} digest audit: {}".format(tree_name,reactiontree.strand_hash_table.audit_report()))
+        if isinstance(reactiontree.strand_hash_table,SpillHashTable):
+            tlogger.info("{} spill table: {}".format(tree_name,reactiontree.strand_hash_table.spill_report()))
+        if isinstance(reactiontree,tree_approx.ApproxReactionTree):
+            tlogger.info("{} approximate count {}, 95% bounds {}".format(tree_name,reactiontree.order(),reactiontree.order_bounds()))
+
+    def _snapshot_opt_table(self,opt_hash,workloadID,overhang_count): #write the optimized table out and hand the rotate build a memory mapped view of it, so the table itself can be freed
+        if self._snapshot_dir is None:
+            return opt_hash
+        path=os.path.join(self._snapshot_dir,os.path.normpath(workloadID[0]),workloadID[1],"optimized_{}".format(overhang_count))
+        save_table_snapshot(opt_hash,path,MOD_COUNTS) #the optimized tree is built by baseopt_w
+        return TableSnapshot(path)
+
     def __init__(self,**kwargs):
         self._workloadDict={} #dictionary to keep buffers for workloads
         self._primer3=""
@@ -19,6 +65,46 @@ class tree_analysis: #class for analyzing reaction trees based on input files
         self._out_dir={} #this dictionary takes in a category directory and file name and outputs a path to the appropriate output directory
         self._1_bit_results={}#dictionary to hold results of 1 bit blocks  analysis, structure is set up like workloadDict, a hierarchical manner to reflect the category and workload, this should be general results
         self._opt_codeword_results={} #this dictionary is a container of results for analyzing an optimal codewordsize/overhang combination
+        self._encoding_cache=EncodingCache(self._primer5,self._primer3,self._format_ID) #encodes each workload once per codeword size for all overhang counts
+        self._packed_strands=False #hand strands to the tree builders as PackedStrands instead of strings
+        if kwargs.has_key('packed_strands'):
+            self._packed_strands=kwargs['packed_strands']
+        self._digest_keys=False #key the lite builders' strand hash tables on digests instead of full strand keys
+        self._digest_audit_rate=0.0 #fraction of digest keys kept in full to check for collisions
+        if kwargs.has_key('digest_keys'):
+            self._digest_keys=kwargs['digest_keys']
+        if kwargs.has_key('digest_audit_rate'):
+            self._digest_audit_rate=kwargs['digest_audit_rate']
+        self._batch_engine=False #count ideal and baseopt trees with the vectorized engine in overhang.tree_batch
+        if kwargs.has_key('batch_engine'):
+            self._batch_engine=kwargs['batch_engine']
+        self._consed_builds=False #key ideal and baseopt tables on interned sub reaction IDs instead of sub reaction strings
+        if kwargs.has_key('consed_builds'):
+            self._consed_builds=kwargs['consed_builds']
+        self._workers=None #number of processes the ideal and baseopt builders split strands across, None builds in this process
+        if kwargs.has_key('workers'):
+            self._workers=kwargs['workers']
+        self._stream_strands=False #build strand strings from the cached payloads while each tree build walks them instead of holding the strand strings in memory
+        if kwargs.has_key('stream_strands'):
+            self._stream_strands=kwargs['stream_strands']
+        self._spill_budget=None #bytes of strand hash table kept in memory before spilling to disk, None keeps the whole table in memory
+        self._spill_dir=None #directory for spill files, None uses the system temporary directory
+        if kwargs.has_key('spill_budget'):
+            self._spill_budget=kwargs['spill_budget']
+        if kwargs.has_key('spill_dir'):
+            self._spill_dir=kwargs['spill_dir']
+        self._fused_engine=False #build the 1 bit sweep's transform, optimized, rotate and ideal trees with the fused engine in overhang.tree_fused
+        if kwargs.has_key('fused_engine'):
+            self._fused_engine=kwargs['fused_engine']
+        self._approx_counts=False #estimate ideal and baseopt counts with per height HyperLogLog sketches in overhang.tree_approx
+        if kwargs.has_key('approx_counts'):
+            self._approx_counts=kwargs['approx_counts']
+        self._sample_tolerance=None #relative confidence interval half width at which sampled estimates of the 1 bit counts stop, None builds the full trees
+        if kwargs.has_key('sample_tolerance'):
+            self._sample_tolerance=kwargs['sample_tolerance']
+        self._snapshot_dir=None #directory that optimized tables are snapshotted to for the rotate builds, None keeps them in memory
+        if kwargs.has_key('snapshot_dir'):
+            self._snapshot_dir=kwargs['snapshot_dir']
 
 
         #load already existing pickled data to short circuit launching the actual analysis
@@ -56,6 +56,9 @@ def _sweep_overhangs_codewordsize(self,data_buffer,workloadID,debug_fname=None):
     self._opt_codeword_results[workloadID[0]][workloadID[1]]["ideal_height_map"]={} #going to have a height map for each codeword
     self._opt_codeword_results[workloadID[0]][workloadID[1]]["opt_height_map"]={}
 
+    #the unoptimized counts only depend on the overhang count and strand length, so the per strand model is evaluated over the whole sweep at once
+    total_strand_lengths=[int(math.ceil((strand_length_bytes*8)/codewordsize))+int(math.ceil((index_bytes*8)/codewordsize)) for codewordsize in codeword_list]
+    unopt_nodes_per_strand=node.unopt_model_grid(np.array(overhang_list)[np.newaxis,:],np.array(total_strand_lengths)[:,np.newaxis],0)[0]
     
     for codeword_index, codewordsize in enumerate(codeword_list):
         strand_length_codewords=int(math.ceil((strand_length_bytes*8)/codewordsize))
@@ -70,28 +73,23 @@ def _sweep_overhangs_codewordsize(self,data_buffer,workloadID,debug_fname=None):
             print("---- starting codeword size {} with overhang count {} ----".format(codewordsize,overhang_count))
             
             self._opt_codeword_results[workloadID[0]][workloadID[1]]["codewordsize_x_overhangcount"][codeword_index,overhang_index]=codewordsize*overhang_count
-            dna_file=OverhangBitStringWriteDNAFile(primer5=self._primer5, formatid=self._format_ID, primer3=self._primer3, out_fd=output_filename,fsmd_abbrev='OH_BITSTRING_XXX',\
-                                                   bits_per_block=codewordsize,strand_length=strand_length_codewords,num_overhangs=overhang_count)
-            dna_file.write(data_buffer)
-            dna_file.header_flush()
-            strand_list=dna_file.get_strands() #get strands after encoding
+            #payloads are encoded once per codeword size, the strands for each overhang count are derived from them
+            strand_list=self._encoding_cache.strands(data_buffer,output_filename,codewordsize,strand_length_codewords,overhang_count,
+                                                     packed=self._packed_strands,stream=self._stream_strands)
             start_time=time.time()
-            optimized_tree=tree.construct_tree_baseopt_lite(strand_list,overhang_count,int(math.ceil(math.log(overhang_count,4))),codewordsize,
+            optimized_tree=self._baseopt_builder()(strand_list,overhang_count,int(math.ceil(math.log(overhang_count,4))),codewordsize,
                                                        total_strand_length, repair_strategy=0,
-                                                       h_array=self._opt_codeword_results[workloadID[0]][workloadID[1]]["opt_height_map"][codewordsize][overhang_index][:],) #+2 for the number of bytes used for indexing
+                                                       h_array=self._opt_codeword_results[workloadID[0]][workloadID[1]]["opt_height_map"][codewordsize][overhang_index][:],hash_table=self._new_hash_table(),workers=self._workers) #+2 for the number of bytes used for indexing
             self._opt_codeword_results[workloadID[0]][workloadID[1]]["opt_reaction_count"][codeword_index,overhang_index]=optimized_tree.order()
+            self._report_hash_table("optimized",optimized_tree)
             del optimized_tree  #limit the amount of time trees are buffered to free up memory space for subsequent tree builds
             print("---- optimized tree build on {} took {} seconds ---".format(workloadID[1],time.time()-start_time))
+            self._opt_codeword_results[workloadID[0]][workloadID[1]]["no_opt_reaction_count"][codeword_index,overhang_index]=unopt_nodes_per_strand[codeword_index,overhang_index]*tree._strand_count(strand_list)
             start_time=time.time()
-            unoptimized_tree=tree.construct_tree_unoptimized_lite(strand_list,overhang_count,int(math.ceil(math.log(overhang_count,4))),codewordsize,
-                                                             total_strand_length, repair_strategy=0)
-            self._opt_codeword_results[workloadID[0]][workloadID[1]]["no_opt_reaction_count"][codeword_index,overhang_index]=unoptimized_tree.order()
-            del unoptimized_tree
-            print("---- no optimized tree build on {} took {} seconds ---".format(workloadID[1],time.time()-start_time))
-            start_time=time.time()
-            ideal_tree=tree.construct_tree_ideal_lite(strand_list,overhang_count,int(math.ceil(math.log(overhang_count,4))),codewordsize,total_strand_length, repair_strategy=0,
-            h_array=self._opt_codeword_results[workloadID[0]][workloadID[1]]["ideal_height_map"][codewordsize][overhang_index][:])
+            ideal_tree=self._ideal_builder()(strand_list,overhang_count,int(math.ceil(math.log(overhang_count,4))),codewordsize,total_strand_length, repair_strategy=0,
+            h_array=self._opt_codeword_results[workloadID[0]][workloadID[1]]["ideal_height_map"][codewordsize][overhang_index][:],hash_table=self._new_hash_table(),workers=self._workers)
             self._opt_codeword_results[workloadID[0]][workloadID[1]]["ideal_reaction_count"][codeword_index,overhang_index]=ideal_tree.order()
+            self._report_hash_table("ideal",ideal_tree)
             del ideal_tree
             print("---- ideal tree build on {} took {} seconds ---".format(workloadID[1],time.time()-start_time))
             tlogger.debug('Finished building trees for '+output_filename)
@@ -0,0 +1,77 @@
+'''
+Author: Kevin Volkel
+
+Filename: encoding_cache.py
+
+Description: Encodes a data buffer once per codeword size. Codeword payloads do not depend on the number of overhangs, overhangs are only a cyclic pattern placed between codewords, so the strands for every overhang count are derived from one cached encoding
+
+'''
+import logging
+from overhang.dnastorage_utils.system.dnafile import OverhangBitStringWriteDNAFile
+from overhang.packed_strand import pack_strand, unpack_strand
+
+clogger=logging.getLogger('dna.overhang.opt_analysis.encoding_cache')
+clogger.addHandler(logging.NullHandler())
+
+ENCODING_OVERHANGS=3 #overhang count used for the one real encoding, any count gives the same payloads
+
+
+class DerivedStrands(object): #strand strings for one overhang count rebuilt from cached payloads as they are iterated, can be iterated any number of times
+    def __init__(self,packed_strands,num_overhangs,prefix,suffix):
+        self._packed_strands=packed_strands
+        self._num_overhangs=num_overhangs
+        self._prefix=prefix
+        self._suffix=suffix
+
+    def __len__(self):
+        return len(self._packed_strands)
+
+    def __iter__(self):
+        for packed in self._packed_strands:
+            yield self._prefix+unpack_strand(packed,self._num_overhangs)+self._suffix
+
+
+class EncodingCache(object): #keeps the packed payloads of the last (data buffer, codeword size, strand length) encoded
+    def __init__(self,primer5,primer3,format_ID):
+        self._primer5=primer5
+        self._primer3=primer3
+        self._format_ID=format_ID
+        self._buffer=None
+        self._key=None
+        self._packed_strands=None
+        self._prefix="" #primer sequences around the payload of every strand
+        self._suffix=""
+        #statistics
+        self.encodings=0
+        self.hits=0
+
+    def _encode(self,data_buffer,out_fd,bits_per_block,strand_length):
+        if data_buffer is self._buffer and self._key==(bits_per_block,strand_length):
+            self.hits+=1
+            return
+        dna_file=OverhangBitStringWriteDNAFile(primer5=self._primer5, formatid=self._format_ID, primer3=self._primer3, out_fd=out_fd,fsmd_abbrev='OH_BITSTRING_XXX',\
+                                               bits_per_block=bits_per_block,strand_length=strand_length,num_overhangs=ENCODING_OVERHANGS)
+        dna_file.write(data_buffer)
+        prefix_length=len(dna_file.flanking_primer5+dna_file.primer5)
+        suffix_length=len(dna_file.flanking_primer3+dna_file.primer3)
+        self._packed_strands=[]
+        for s in dna_file.iter_strands():
+            if len(self._packed_strands)==0:
+                self._prefix=s[:prefix_length]
+                self._suffix=s[len(s)-suffix_length:]
+            self._packed_strands.append(pack_strand(s[prefix_length:len(s)-suffix_length],ENCODING_OVERHANGS,bits_per_block))
+        self._buffer=data_buffer
+        self._key=(bits_per_block,strand_length)
+        self.encodings+=1
+        clogger.debug("encoded {} strands with {} bit codewords".format(len(self._packed_strands),bits_per_block))
+
+    def strands(self,data_buffer,out_fd,bits_per_block,strand_length,num_overhangs,packed=False,stream=False):
+        #strands of data_buffer encoded with num_overhangs overhangs, PackedStrands do not carry overhangs so the cached list is handed out as is
+        #stream returns a DerivedStrands so strand strings are only built while a tree builder walks them
+        self._encode(data_buffer,out_fd,bits_per_block,strand_length)
+        if packed:
+            return self._packed_strands
+        derived=DerivedStrands(self._packed_strands,num_overhangs,self._prefix,self._suffix)
+        if stream:
+            return derived
+        return list(derived)
@@ -0,0 +1,99 @@
+'''
+Author: Kevin Volkel
+
+Filename: packed_strand.py
+
+Description: Compact strand representation for the tree builders. Codeword payload bits are packed 8 to a byte and overhangs are not stored, overhang k always precedes codeword k so overhang IDs are implied by position
+
+'''
+import math
+import binascii
+import numpy as np
+import overhang.dnastorage_utils.codec.base_conversion as bc
+
+
+class PackedStrand(object): #payload of one strand, codeword bits are packed MSB first into a byte string
+    __slots__=("payload","num_codewords","codeword_length")
+
+    def __init__(self,payload,num_codewords,codeword_length):
+        self.payload=payload
+        self.num_codewords=num_codewords
+        self.codeword_length=codeword_length
+
+    def __len__(self):
+        return self.num_codewords
+
+    def bits(self,start,end): #integer formed by the payload bits of codewords [start,end)
+        start_bit=start*self.codeword_length
+        end_bit=end*self.codeword_length
+        first_byte=start_bit>>3
+        last_byte=(end_bit+7)>>3
+        value=int(binascii.hexlify(self.payload[first_byte:last_byte]),16)
+        value>>=(last_byte<<3)-end_bit #drop bits belonging to codewords after end
+        return value&((1<<(end_bit-start_bit))-1)
+
+    def data_key(self,start,end): #key for the data of codewords [start,end), the leading 1 bit keeps payloads of different lengths apart
+        return self.bits(start,end)|(1<<((end-start)*self.codeword_length))
+
+    def substrand_key(self,start,end,num_overhangs): #key for the data of codewords [start,end) along with the overhangs bookending them
+        return self.data_key(start,end)*num_overhangs+start%num_overhangs
+
+    def codewords(self): #numpy array holding the value of each codeword
+        bits=np.unpackbits(np.frombuffer(self.payload,dtype=np.uint8))[:self.num_codewords*self.codeword_length]
+        bits=bits.reshape((self.num_codewords,self.codeword_length)).astype(np.uint16)
+        weights=1<<np.arange(self.codeword_length-1,-1,-1,dtype=np.uint16)
+        return bits.dot(weights)
+
+
+class PackedSegment(object): #view of codewords [start,end) of a packed strand, used in place of a substrand when builders split packed strands
+    __slots__=("strand","start","end")
+
+    def __init__(self,strand,start,end):
+        self.strand=strand
+        self.start=start
+        self.end=end
+
+    def __len__(self):
+        return self.end-self.start
+
+    def sub_segment(self,index,block_group_size): #index-th group of block_group_size codewords inside this segment
+        start=self.start+index*block_group_size
+        return PackedSegment(self.strand,start,min(start+block_group_size,self.end))
+
+    def data_key(self):
+        return self.strand.data_key(self.start,self.end)
+
+    def substrand_key(self,num_overhangs):
+        return self.strand.substrand_key(self.start,self.end,num_overhangs)
+
+
+def get_overhang_length(num_overhangs):
+    return int(math.ceil(math.log(num_overhangs,4))) #overhangs are represented as base 4 numbers
+
+
+def pack_strand(strand,num_overhangs,codeword_length): #convert an encoded strand string (overhang:codeword:overhang...) into a PackedStrand
+    overhang_length=get_overhang_length(num_overhangs)
+    stride=codeword_length+overhang_length
+    num_codewords=(len(strand)-overhang_length)//stride
+    if codeword_length==1:
+        bit_string=strand[overhang_length::stride][:num_codewords]
+    else:
+        bit_string="".join([strand[_:_+codeword_length] for _ in range(overhang_length,overhang_length+num_codewords*stride,stride)])
+    bits=np.frombuffer(bit_string.encode('ascii'),dtype=np.uint8)-ord('0')
+    return PackedStrand(np.packbits(bits).tobytes(),num_codewords,codeword_length)
+
+
+def pack_strands(strands,num_overhangs,codeword_length):
+    return [pack_strand(s,num_overhangs,codeword_length) for s in strands]
+
+
+def unpack_strand(packed,num_overhangs): #rebuild the strand string for a packed strand using num_overhangs overhangs
+    overhang_length=get_overhang_length(num_overhangs)
+    overhangs=[bc.convertQuarnary(_,overhang_length)[::-1] for _ in range(0,num_overhangs)]
+    bits=np.unpackbits(np.frombuffer(packed.payload,dtype=np.uint8))[:packed.num_codewords*packed.codeword_length]
+    bit_string=str((bits+ord('0')).tobytes().decode('ascii'))
+    strand=[overhangs[0]]
+    for index in range(0,packed.num_codewords):
+        strand.append(bit_string[index*packed.codeword_length:(index+1)*packed.codeword_length])
+        strand.append(overhangs[(index+1)%num_overhangs])
+    return "".join(strand)
@@ -7,20 +7,22 @@ Description: This file contains the base class that represents a node in an over
 
 '''
 import math
+import numpy as np
 import overhang.dnastorage_utils.codec.base_conversion as bc #support for base conversion, needed to initialize lookup table
+from overhang.node_store import NodeStore, StoredReactionNode
+from overhang.strand_id_set import StrandIDSet
+from overhang.strand_geometry import strand_geometry
 
 
 class ReactionNode:#this class acts as a container for information relevant to nodes in a overhang assembly graph
     def __init__(self, strandID, height,is_pad):
 
-        self._strandIDList=[] #captures the strand IDs that use this node
-        if type(strandID) is not list:
-            self._strandIDList.append(strandID)
-        else:
-            self._strandIDList+=strandID #inputting a list
+        self._strandIDs=StrandIDSet() #captures the strand IDs that use this node
+        self.insert_strand_ID(strandID)
         self._use_count=1 #indicates the number of users of this node
         self._sub_nodes=[] #list of children subnodes, if node is a base node, set this to None
         self._visited=0
+        self._generation=0 #number of the last tree walk that reached this node
         self._is_pad=is_pad #inidcates wheter or not the node is used for padding
         self._is_terminator=0
         self._number_true_children=0 #number of true children (non padding) a node has
@@ -41,17 +43,17 @@ class ReactionNode:#this class acts as a container for information relevant to n
         self._corrected_substrand=corrected_strand
     
     #methods to manage what strand indexes are using this reaction
-    def insert_strand_ID(self,ID):
-        if type(ID) is not list:
-            self._strandIDList.append(ID)
+    def insert_strand_ID(self,ID): #ID can be a single ID, a list of IDs or a StrandIDSet
+        if isinstance(ID,StrandIDSet) or type(ID) is list:
+            self._strandIDs.update(ID)
         else:
-            self._strandIDList+=ID
+            self._strandIDs.add(ID)
 
     def is_ID(self,ID):
-        if ID in self._strandIDList:
-            return True
-        else:
-            return False
+        return ID in self._strandIDs
+
+    def get_strand_IDs(self):
+        return self._strandIDs
 
     #methods for toggling the visited state of the node
     def set_visited(self):
@@ -65,6 +67,10 @@ class ReactionNode:#this class acts as a container for information relevant to n
             self._visited=1
         elif self._visited==1:
             self._visited=0
+    def get_generation(self):
+        return self._generation
+    def set_generation(self,generation):
+        self._generation=generation
 
     #methods to manage node children
     def add_child(self,child):#add child node to this node
@@ -107,6 +113,121 @@ class ReactionNode:#this class acts as a container for information relevant to n
         return self._height
 
 
+_unopt_model_memo={} #(num_overhangs,strand_length_in_codewords,repair_strategy) -> per strand counts of the unoptimized tree
+
+def unopt_strand_model(num_overhangs,strand_length_in_codewords,repair_strategy): #(nodes, padding nodes, inserts, singleton nodes removed) for one strand of an unoptimized tree, memoized
+    key=(num_overhangs,strand_length_in_codewords,repair_strategy)
+    if key in _unopt_model_memo:
+        return _unopt_model_memo[key]
+    h=int(math.ceil(math.log(strand_length_in_codewords,num_overhangs-1)))
+    pad_nodes=0
+    total_nodes=0
+    total_inserts=0
+    previous=False #flag to indicate the previous node is an only child
+    previous_padding=0
+    previous_inserts=0
+    singleton_nodes_removed=0
+    for i in range(1,h+1)[::-1]:
+        #go from the tree top down
+        if i==h:
+            total_nodes+=1
+        else:
+            width=int(math.ceil(float(strand_length_in_codewords)/float((num_overhangs-1)**i)))
+            if i==(h-1):
+                total_nodes+=width
+                continue
+            else:
+                if width%(num_overhangs-1)==0:
+                    total_nodes+=width
+                    previous=0
+                else:
+                    #need to handle incomplete portion of tree
+                    if previous and width%(num_overhangs-1)==1:
+                        #previous is set,therefore we can remove the previous 2 nodes
+                        total_nodes+=(width-1) #add width-1 (don't need last node)
+                        total_nodes-=1 #(remove parent node)
+                        total_nodes-=previous_padding #(no longer need padding of last node)
+                        pad_nodes-=previous_padding
+                        total_inserts-=previous_inserts
+                        previous=False
+                        previous_padding=0
+                        singleton_nodes_removed+=2
+                    else:
+                        total_nodes+=width
+                        _pad=0
+                        _inserts=0
+                        #need to add in some padding
+                        if repair_strategy==0:
+                            #m^2 direct repair, only need one insert
+                            _inserts=1
+                        elif repair_strategy==1:
+                            #2m direct repair
+                            _inserts=(num_overhangs-1)-width%(num_overhangs-1)
+                        elif repair_strategy==2:
+                            _pad=(num_overhangs-1)-width%(num_overhangs-1)
+                            _inserts=_pad*(num_overhangs-1)#each pad node should have m-1 inserts
+                            total_nodes+=_pad
+                        total_inserts+=_inserts
+                        pad_nodes+=_pad
+                        if width%(num_overhangs-1)==1:
+                            #indicate a lonely end node in the width
+                            previous=True
+                            previous_padding=_pad
+                            previous_inserts=_inserts
+                        else:
+                            previous=False
+                            previous_padding=0
+                            previous_inserts=0
+    _unopt_model_memo[key]=(total_nodes,pad_nodes,total_inserts,singleton_nodes_removed)
+    return _unopt_model_memo[key]
+
+
+def unopt_model_grid(num_overhangs,strand_length_in_codewords,repair_strategy): #unopt_strand_model over whole grids, the array arguments are broadcast together
+    #returns arrays of nodes, padding nodes, inserts and singleton nodes removed per strand, every grid point is evaluated in the same pass down the heights
+    num_overhangs,strand_length=np.broadcast_arrays(np.asarray(num_overhangs,dtype=np.int64),np.asarray(strand_length_in_codewords,dtype=np.int64))
+    group_size=num_overhangs-1
+    h=np.vectorize(lambda m,L: int(math.ceil(math.log(L,m-1))),otypes=[np.int64])(num_overhangs,strand_length) #same float rounding as the scalar model
+    total_nodes=np.zeros(h.shape,dtype=np.int64)
+    pad_nodes=np.zeros(h.shape,dtype=np.int64)
+    total_inserts=np.zeros(h.shape,dtype=np.int64)
+    singleton_nodes_removed=np.zeros(h.shape,dtype=np.int64)
+    previous=np.zeros(h.shape,dtype=bool)
+    previous_padding=np.zeros(h.shape,dtype=np.int64)
+    previous_inserts=np.zeros(h.shape,dtype=np.int64)
+    for i in range(int(h.max()) if h.size>0 else 0,0,-1):
+        block_group_size=group_size**np.minimum(i,h) #grid points shorter than i are masked out below, capping the power keeps it from overflowing
+        width=(strand_length+block_group_size-1)//block_group_size
+        remainder=width%group_size
+        top=(h==i)
+        below_top=(h==i+1)
+        lower=(h>i+1)
+        full=lower&(remainder==0)
+        removal=lower&~full&previous&(remainder==1)
+        padded=lower&~full&~removal
+        if repair_strategy==0:
+            _inserts=np.ones(h.shape,dtype=np.int64)
+            _pad=np.zeros(h.shape,dtype=np.int64)
+        elif repair_strategy==1:
+            _inserts=group_size-remainder
+            _pad=np.zeros(h.shape,dtype=np.int64)
+        elif repair_strategy==2:
+            _pad=group_size-remainder
+            _inserts=_pad*group_size
+        else:
+            _inserts=np.zeros(h.shape,dtype=np.int64)
+            _pad=np.zeros(h.shape,dtype=np.int64)
+        total_nodes+=np.where(top,1,0)+np.where(below_top|full|padded,width,0)+np.where(padded,_pad,0)
+        total_nodes-=np.where(removal,2+previous_padding-width,0)
+        pad_nodes+=np.where(padded,_pad,0)-np.where(removal,previous_padding,0)
+        total_inserts+=np.where(padded,_inserts,0)-np.where(removal,previous_inserts,0)
+        singleton_nodes_removed+=np.where(removal,2,0)
+        lonely=padded&(remainder==1)
+        previous=np.where(full|removal,False,np.where(padded,lonely,previous))
+        previous_padding=np.where(lonely,_pad,np.where(full|removal|padded,0,previous_padding))
+        previous_inserts=np.where(lonely,_inserts,np.where(full|removal|padded,0,previous_inserts))
+    return total_nodes,pad_nodes,total_inserts,singleton_nodes_removed
+
+
 class analytical_ReactionTree: #analytics based reaction tree so that we don't use so much memory in non-optimization cases
     def __init__(self,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,end_repair):
         self._tree_stats={}
@@ -151,13 +272,20 @@ class analytical_ReactionTree: #analytics based reaction tree so that we don't u
     def set_singleton_nodes_removed(self,num):
         self._tree_stats["singleton_nodes_removed"]=num
 
+    def apply_unopt_model(self,num_strands): #fill in the unoptimized tree counts of num_strands strands from the memoized per strand model
+        nodes,pad_nodes,inserts,singleton_nodes_removed=unopt_strand_model(self.num_overhangs,self.strand_length_in_codewords,self.end_repair_technique)
+        self.add_node_count(nodes*num_strands)
+        self.add_pad_count(pad_nodes*num_strands)
+        self.set_insert_per_strand(inserts)
+        self.set_singleton_nodes_removed(num_strands*singleton_nodes_removed)
+
     def get_singleton_nodes_removed(self):
         return self._tree_stats["singleton_nodes_removed"]
     
     
 class ReactionTree: #this class will take the place of using the networkx module, should be more lightweight and faster
     
-    def __init__(self,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,end_repair):
+    def __init__(self,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,end_repair,strand_hash_table=None):
         self.num_to_overhang=[] #array used to lookup the string representing an overhang using a number, should be length m.
         self.overhang_to_num={} #find the ID from the overhang
 
@@ -166,8 +294,8 @@ class ReactionTree: #this class will take the place of using the networkx module
         self._tree_stats={}
         self._tree_stats["node_count"]=0
         self._tree_stats["pad_node_count"]=0 #nodes needed to pad tree for overhang correctness
-        self._tree_walk_status=0
         self._tree_walk_count=0
+        self._walk_generation=0 #nodes reached by a walk are marked with its generation, so nothing has to be cleared between walks
 
         #state describing the properties of the reaction network being constructed
         #self.strand_length=strand_length
@@ -177,51 +305,113 @@ class ReactionTree: #this class will take the place of using the networkx module
         self.ideal_children_nodes=num_overhangs-1 #number of nodes that a child should have
         self.end_repair_technique=end_repair # end repair technique used, 0: direct end repair (m^2) extra strands, 1: same reaction repair (2m extra strands) 2: reaction repair (m extra strands)
         self.strand_hash_table={} #hash table used to track redundancy
+        if strand_hash_table is not None:
+            self.strand_hash_table=strand_hash_table #dictionary-like replacement, e.g. a DigestHashTable
         self.h_array=h_array #stat array used to track at what height data is shared
+        self.inventory=None #ReactionInventory of reactions already synthesized, the lite builders count them as matches
+        self.node_store=None #NodeStore holding the nodes of full trees as parallel arrays, None makes ReactionNode objects
         self.num_overhangs=num_overhangs
 
         self.num_to_overhang=[]
         self.overhang_length=int(math.ceil(math.log(num_overhangs,4))) #overhangs are represented as base 4 numbers
+        self.geometry=strand_geometry(num_overhangs,self.overhang_length,codeword_length,strand_length_in_codewords) #heights and sub reaction layout shared by every strand
         
         #initilaize overhang lookup tables
         self._initialize_lookup_table(num_overhangs)
         
+    def new_node(self,strandID,height,is_pad): #node for the full builders, a view into node_store when the tree has one
+        if self.node_store is None:
+            return ReactionNode(strandID,height,is_pad)
+        return StoredReactionNode(self.node_store,self.node_store.add_node(strandID,height,is_pad))
+
     def _initialize_lookup_table(self,num_overhangs):
         self.num_to_overhang=[bc.convertQuarnary(_,self.overhang_length)[::-1] for _ in range(0,self.num_overhangs)] #arbitrary strings that ID overhangs
         for overhangID,overhang in enumerate(self.num_to_overhang):
             self.overhang_to_num[overhang]=overhangID
 
     
-    def tree_walk(self,node=None): #walks the tree recursively, figuring out node stats
+    def walk_nodes(self,roots=None): #yields (node, child list) once per node reachable from roots (the terminators by default), depth first with children in the order the tree holds them
+        self._walk_generation+=1
+        generation=self._walk_generation
+        stack=[]
+        for root in (self._term_nodes if roots is None else roots):
+            if root.get_generation()!=generation:
+                root.set_generation(generation)
+                stack.append(root)
+        stack.reverse() #roots come out in the order they were given
+        while stack:
+            node=stack.pop()
+            children=list(node.get_child_list())
+            for child in reversed(children):
+                if child.get_generation()!=generation:
+                    child.set_generation(generation)
+                    stack.append(child)
+            yield node,children
+
+    def walk_stats(self,roots=None): #one pass with an explicit stack over every node reachable from roots (the terminators by default), each node is counted once
+        self._walk_generation+=1
+        generation=self._walk_generation
+        stack=[]
+        for root in (self._term_nodes if roots is None else roots):
+            if root.get_generation()!=generation:
+                root.set_generation(generation)
+                stack.append(root)
+        node_count=0
+        pad_node_count=0
+        height_counts={} #height -> nodes, pad reactions have height -1
+        pad_height_counts={}
+        fan_out={} #children -> nodes
+        use_counts={} #use count -> nodes
+        parent_edges={} #node -> edges from the parents reached
+        while stack:
+            node=stack.pop()
+            node_count+=1
+            height=node.get_height()
+            height_counts[height]=height_counts.get(height,0)+1
+            if node.is_pad():
+                pad_node_count+=1
+                pad_height_counts[height]=pad_height_counts.get(height,0)+1
+            use_counts[node.get_use_count()]=use_counts.get(node.get_use_count(),0)+1
+            children=node.get_child_list()
+            fan_out[len(children)]=fan_out.get(len(children),0)+1
+            for child in children:
+                parent_edges[child]=parent_edges.get(child,0)+1
+                if child.get_generation()!=generation:
+                    child.set_generation(generation)
+                    stack.append(child)
+        fan_in={} #parent edges -> nodes
+        if node_count>len(parent_edges):
+            fan_in[0]=node_count-len(parent_edges) #roots no reached node points to
+        for edges in parent_edges.values():
+            fan_in[edges]=fan_in.get(edges,0)+1
+        return {"node_count":node_count,
+                "pad_node_count":pad_node_count,
+                "height_counts":height_counts,
+                "pad_height_counts":pad_height_counts,
+                "fan_in":fan_in,
+                "fan_out":fan_out,
+                "use_counts":use_counts}
+
+    def tree_walk(self,node=None): #counts the nodes below node (or every node when node is None) into the node count
         if node==None:#top of the tree
-            for strand_terminator in self._term_nodes:
-                if (strand_terminator.get_visited()==0 and self._tree_walk_status==0) or (strand_terminator.get_visited()==1 and self._tree_walk_status==1) :
-                    tree_walk(node=strand_terminator)
-                    strand_terminator.invert_visited() #do inverse of node visited, that way we don't have to clear the visited check on a subsequent walk, we can just walk the tree
-                    self._tree_stats["node_count"]+=1
+            self._tree_stats["node_count"]+=self.walk_stats()["node_count"]
         else:
-            for child in node.get_child_list():
-                if (child.get_visited()==0 and self._tree_walk_status==0) or (strand_terminator.get_visited()==1 and self._tree_walk_status==1):
-                    tree_walk(node=child)
-                    child.invert_visited()
-                    self._tree_stats["node_count"]+=1
+            self._tree_stats["node_count"]+=self.walk_stats(node.get_child_list())["node_count"]
                     
     def clear_stats(self):#clear stats
         for stat in self._tree_stats:
             self._tree_stats[stat]=0
             
-    def collect_stats(self):
+    def collect_stats(self): #replace the running counts with the ones found by walking the tree, returns the full walk_stats result
+        stats=self.walk_stats()
         self.clear_stats()
-        self.tree_walk()
-        #make sure the status is inverted
-        if self._tree_walk_status==0:
-            self._tree_walk_status=1
-        else:
-            self._tree_walk_status=0
+        self._tree_stats["node_count"]=stats["node_count"]
+        self._tree_stats["pad_node_count"]=stats["pad_node_count"]
         self._tree_walk_count+=1
+        return stats
 
     def order(self):
-        assert (self._tree_walk_count>0 or self._tree_stats["node_count"]>0) #make sure we walk the tree at least once
+        assert (self._tree_walk_count>0 or self._tree_stats["node_count"]>0 or self.inventory is not None) #make sure we walk the tree at least once, with an inventory there may be nothing new to count
         return self._tree_stats["node_count"]
     
 
@@ -0,0 +1,75 @@
+'''
+Author: Kevin Volkel
+
+Filename: rotation.py
+
+Description: Bookkeeping used by the rotate lite builders. RotationShifts tracks how far the overhangs of each codeword have been rotated by the NOPs inserted so far in a strand,
+             and the rotate strand hash tables map each datastrand to a bitmask of the strandIDmods (overhang versions) built for it, bit i set meaning strandIDmod i exists
+
+'''
+
+
+def _mod_inverse(value,modulus): #inverse of value mod modulus, value and modulus must be coprime
+    old_r,r=value%modulus,modulus
+    old_s,s=1,0
+    while r!=0:
+        quotient=old_r//r
+        old_r,r=r,old_r-quotient*r
+        old_s,s=s,old_s-quotient*s
+    assert old_r==1
+    return old_s%modulus
+
+
+def has_mod(mods,strandIDmod):
+    return (mods>>strandIDmod)&1==1
+
+
+def add_mod(mods,strandIDmod): #bitmask with strandIDmod added
+    return mods|(1<<strandIDmod)
+
+
+def mods_of(mods): #strandIDmods held by a bitmask, in increasing order
+    result=[]
+    while mods:
+        lowest=mods&(-mods)
+        result.append(lowest.bit_length()-1)
+        mods^=lowest
+    return result
+
+
+def rotation_distance(mods,strandIDmod,num_overhangs): #NOPs needed to rotate strandIDmod onto the next built version, strandIDmod must not be in mods
+    #rotating only moves forward and wraps past num_overhangs-1, so the nearest version is the lowest set bit above strandIDmod, or failing that the lowest set bit
+    above=mods>>(strandIDmod+1)
+    if above:
+        return (above&(-above)).bit_length()
+    return num_overhangs-strandIDmod+(mods&(-mods)).bit_length()-1
+
+
+class RotationShifts(object): #shift of every codeword of one strand, taken mod num_overhangs since shifts are only used to derive overhang IDs
+    #adding to every codeword from a position on is a point update of a Fenwick tree over the differences and reading a shift is a prefix sum,
+    #scaling every shift is folded into a lazy factor, so each costs O(log strand length) instead of a pass over the strand
+    def __init__(self,strand_length_in_codewords,num_overhangs):
+        self._length=strand_length_in_codewords
+        self._modulus=num_overhangs
+        self._tree=[0]*(strand_length_in_codewords+1)
+        self._scale=1 #every stored difference is multiplied by this when read
+        self._inverse_scale=1
+
+    def add_from(self,position,distance): #add distance to the shift of every codeword from position to the end of the strand
+        value=(distance*self._inverse_scale)%self._modulus
+        index=position+1
+        while index<=self._length:
+            self._tree[index]=(self._tree[index]+value)%self._modulus
+            index+=index&(-index)
+
+    def scale(self,factor): #multiply every shift by factor, factor must be coprime to num_overhangs
+        self._scale=(self._scale*factor)%self._modulus
+        self._inverse_scale=(self._inverse_scale*_mod_inverse(factor,self._modulus))%self._modulus
+
+    def __getitem__(self,position): #shift of the codeword at position, mod num_overhangs
+        total=0
+        index=position+1
+        while index>0:
+            total+=self._tree[index]
+            index-=index&(-index)
+        return (total*self._scale)%self._modulus
@@ -0,0 +1,120 @@
+'''
+Author: Kevin Volkel
+
+Filename: strand_dedup.py
+
+Description: Dedup pass for the ideal and baseopt lite builders. Archives with repeated content give many strands that only differ in their index
+             codewords, so strands are grouped by a digest of their codewords past the index region as they stream by. The first strand of a group
+             is walked in full, later strands only walk the sub reactions reaching into the index region, and the rest of their sub reactions are
+             added to the use counts and h_array once per group, weighted by the number of strands that reached them
+
+'''
+import logging
+import overhang.tree as tree
+from overhang.hash_tables import key_digest
+from overhang.tree_batch import batch_geometry_ok
+
+dlogger=logging.getLogger('dna.overhang.strand_dedup')
+dlogger.addHandler(logging.NullHandler())
+
+'''
+Why the weighted counts match a full walk: while no reaction has a lone child a sub reaction's codeword count fixes its height, and a reaction
+is only put in the table by a walk that goes on to put every reaction below it there too. So once the first strand of a group has been walked,
+every sub reaction of a later strand that lies past the index region is already in the table at its height, and the full walk would match it
+without going deeper. Match decisions only look at whether a key is in the table at the right height, never at its use count, so adding the
+use counts and h_array for those matches later does not change any decision. A lone child or an inventory breaks the first part, so a build
+falls back to walking every strand in full from the first strand with a lone child, and does not group strands at all with an inventory.
+'''
+
+
+def _walk_index_path(num_codewords,key_of,h,index_codewords,reactiontree,weights): #tree_iter_lite for a strand whose codewords past index_codewords match an earlier strand's
+    table=reactiontree.strand_hash_table
+    block_group_sizes=reactiontree.geometry.block_group_sizes
+    stack=[(h,0,num_codewords)]
+    while stack:
+        height,start,end=stack.pop()
+        if start>=index_codewords: #every sub reaction left at this height lies past the index region and is a match, weighted once per strand
+            frame=(height,start,end)
+            weights[frame]=weights.get(frame,0)+1
+            continue
+        sub_end=min(start+block_group_sizes[height],end)
+        if sub_end<end:
+            stack.append((height,sub_end,end))
+        key=key_of(start,sub_end)
+        value=table.get(key)
+        if value is not None and value>>32==height: #make sure heights match
+            if reactiontree.h_array is not None:
+                reactiontree.h_array[height-1]+=1
+            table[key]=value+1 #use count is in the bottom 32 bits
+            continue
+        table[key]=(height<<32)|1
+        reactiontree.inc_node_count()
+        if height>1:
+            stack.append((height-1,start,sub_end))
+    return
+
+
+class StrandGroups(object): #walks the strands of one ideal or baseopt lite build, call flush once every strand has been walked
+    def __init__(self,reactiontree,index_codewords,baseopt):
+        self.reactiontree=reactiontree
+        self.index_codewords=index_codewords #leading codewords that may differ between strands of a group (index and anything before it)
+        self.baseopt=baseopt
+        self.enabled=reactiontree.inventory is None
+        #(codeword count, digest of the substrand past the index region) -> None while the group has one strand,
+        #then [key source of the group's second strand, {(height, first codeword, end codeword): strands reaching those sub reactions}]
+        self._groups={}
+        self._geometry_ok={} #codeword count -> True when no reaction of a strand that long has a lone child
+        self.num_strands=0
+        self.num_grouped=0 #strands that only walked their index region
+
+    def _lone_child_free(self,num_codewords):
+        ok=self._geometry_ok.get(num_codewords)
+        if ok is None:
+            ok=batch_geometry_ok(self.reactiontree.strand_length_in_codewords,num_codewords,self.reactiontree.num_overhangs)
+            self._geometry_ok[num_codewords]=ok
+        return ok
+
+    def walk(self,s,h):
+        self.num_strands+=1
+        num_codewords,data_key,substrand_key=tree._key_source(s,self.reactiontree)
+        if self.enabled and num_codewords>0 and not self._lone_child_free(num_codewords):
+            dlogger.info("strand {} has a lone child, walking the remaining strands in full".format(self.num_strands-1))
+            self.flush()
+            self.enabled=False
+        if not self.enabled or num_codewords<=self.index_codewords: #a strand held entirely in the index region has nothing to group on
+            tree.tree_iter_lite(s,h,self.baseopt,self.reactiontree)
+            return
+        #the substrand key carries the data and the overhangs, which only depend on position, so equal keys past the index region mean equal sub reactions there
+        fingerprint=(num_codewords,key_digest(substrand_key(self.index_codewords,num_codewords)))
+        if fingerprint not in self._groups:
+            self._groups[fingerprint]=None
+            tree.tree_iter_lite(s,h,self.baseopt,self.reactiontree)
+            return
+        key_of=substrand_key if self.baseopt else data_key
+        group=self._groups[fingerprint]
+        if group is None: #the first strand is not kept, this strand's keys past the index region are the same
+            group=[key_of,{}]
+            self._groups[fingerprint]=group
+        self.num_grouped+=1
+        _walk_index_path(num_codewords,key_of,h,self.index_codewords,self.reactiontree,group[1])
+
+    def flush(self): #add the weighted matches held so far to the table and h_array
+        table=self.reactiontree.strand_hash_table
+        h_array=self.reactiontree.h_array
+        block_group_sizes=self.reactiontree.geometry.block_group_sizes
+        for group in self._groups.values():
+            if group is None:
+                continue
+            key_of,weights=group
+            for (height,start,end),weight in weights.items():
+                block_group_size=block_group_sizes[height]
+                for first in range(start,end,block_group_size):
+                    key=key_of(first,min(first+block_group_size,end))
+                    value=table.get(key)
+                    assert value is not None and value>>32==height
+                    table[key]=value+weight
+                    if h_array is not None:
+                        h_array[height-1]+=weight
+            group[1]={}
+        if self.num_strands>0:
+            dlogger.info("{} of {} strands matched an earlier strand past codeword {}".format(self.num_grouped,self.num_strands,self.index_codewords))
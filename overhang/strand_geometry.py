@@ -0,0 +1,61 @@
+'''
+Author: Kevin Volkel
+
+Filename: strand_geometry.py
+
+Description: Layout of the strands a reaction tree is built from. Tree heights, sub reaction sizes and boundaries and the offsets of codeword data
+             in a strand string only depend on the overhang count, overhang and codeword lengths and the strand length, so they are worked out once
+             per geometry and shared by every builder and strand
+
+'''
+import math
+
+_geometries={} #(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords) -> StrandGeometry
+
+
+def strand_geometry(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords): #memoized StrandGeometry
+    key=(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords)
+    geometry=_geometries.get(key)
+    if geometry is None:
+        geometry=StrandGeometry(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords)
+        _geometries[key]=geometry
+    return geometry
+
+
+class StrandGeometry(object): #treat as read only, instances are shared through strand_geometry
+    def __init__(self,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords):
+        self.num_overhangs=num_overhangs
+        self.overhang_length=overhang_length
+        self.codeword_length=codeword_length
+        self.strand_length_in_codewords=strand_length_in_codewords
+        self.stride=codeword_length+overhang_length #characters from one codeword's start to the next in a strand string
+        self.height=int(math.ceil(math.log(strand_length_in_codewords,num_overhangs-1))) #height of the lite builders' trees
+        self.full_height=int(math.log(strand_length_in_codewords,num_overhangs-1)) #the full builders stop at the last complete height
+        #block_group_sizes[height] is the number of codewords joined by a sub reaction at height
+        self.block_group_sizes=[(num_overhangs-1)**_ for _ in range(0,max(self.height,self.full_height)+1)]
+        #payload_offsets[k] is where codeword k's data starts in a strand string
+        self.payload_offsets=[overhang_length+_*self.stride for _ in range(0,strand_length_in_codewords)]
+        self._segments={} #(height,num_codewords) -> sub reaction boundaries
+
+    def sub_reaction_count(self,height,num_codewords): #number of sub reactions a strand of num_codewords codewords is broken into at height
+        block_group_size=self.block_group_sizes[height]
+        return (num_codewords+block_group_size-1)//block_group_size
+
+    def segments(self,height,num_codewords=None): #[(first codeword, end codeword)] of every sub reaction at height, the last one is cut short at the end of the strand
+        if num_codewords is None:
+            num_codewords=self.strand_length_in_codewords
+        bounds=self._segments.get((height,num_codewords))
+        if bounds is None:
+            block_group_size=self.block_group_sizes[height]
+            bounds=[(_,min(_+block_group_size,num_codewords)) for _ in range(0,num_codewords,block_group_size)]
+            self._segments[(height,num_codewords)]=bounds
+        return bounds
+
+    def payload(self,s): #data of every codeword of a strand string with the overhangs cut out, the data of codewords [first,end) is payload[first*codeword_length:end*codeword_length]
+        if self.codeword_length==1:
+            return s[self.overhang_length::self.stride]
+        if len(s)==self.strand_length_in_codewords*self.stride+self.overhang_length:
+            offsets=self.payload_offsets
+        else:
+            offsets=range(self.overhang_length,len(s),self.stride)
+        return "".join([s[_:_+self.codeword_length] for _ in offsets])
@@ -0,0 +1,233 @@
+'''
+Author: Kevin Volkel
+
+Filename: strand_id_set.py
+
+Description: Compressed set of strand IDs used to track which strands use a reaction. Most reactions are used by a few strands, so a set holds up to SMALL_LIMIT IDs in a
+             sorted list. Past that IDs are split on their top bits into containers of 65536 IDs, a container is a sorted array of the low 16 bits while it is sparse
+             and a bitmap once it fills up
+
+'''
+import array
+import bisect
+import struct
+import sys
+import numpy as np
+
+SMALL_LIMIT=8 #IDs a set holds in its sorted list before it moves them to containers
+ARRAY_LIMIT=4096 #entries a sorted array container holds before it becomes a bitmap, at this size both take 8 KB
+BITMAP_BYTES=8192 #one bit per low 16 bit value
+SERIAL_MAGIC=b"SIDS"
+
+_BIT_COUNTS=np.array([bin(_).count("1") for _ in range(0,256)],dtype=np.int64)
+
+
+def _to_bytes(values): #little endian bytes of a typed array
+    values=array.array(values.typecode,values)
+    if sys.byteorder=="big":
+        values.byteswap()
+    return values.tobytes() if hasattr(values,'tobytes') else values.tostring()
+
+
+def _from_bytes(typecode,data):
+    values=array.array(typecode)
+    if hasattr(values,'frombytes'):
+        values.frombytes(data)
+    else:
+        values.fromstring(data)
+    if sys.byteorder=="big":
+        values.byteswap()
+    return values
+
+
+class StrandIDSet(object):
+    __slots__=('_small','_keys','_containers','_size')
+
+    def __init__(self,IDs=None):
+        self._small=[] #sorted IDs while the set is small, None once they have moved to containers
+        self._keys=None #sorted top bits of the IDs held by each container
+        self._containers=None #array('H') of sorted low bits, or a bytearray bitmap
+        self._size=0 #IDs held by the containers
+        if IDs is not None:
+            self.update(IDs)
+
+    def _to_containers(self): #move the IDs of the sorted list into containers
+        small=self._small
+        self._small=None
+        self._keys=array.array('i')
+        self._containers=[]
+        for ID in small:
+            self.add(ID)
+
+    def _container(self,high,create):
+        position=bisect.bisect_left(self._keys,high)
+        if position<len(self._keys) and self._keys[position]==high:
+            return self._containers[position]
+        if not create:
+            return None
+        self._keys.insert(position,high)
+        self._containers.insert(position,array.array('H'))
+        return self._containers[position]
+
+    def _replace(self,high,container):
+        self._containers[bisect.bisect_left(self._keys,high)]=container
+
+    def add(self,ID): #returns True if ID was not already in the set
+        small=self._small
+        if small is not None:
+            if len(small)==0 or ID>small[-1]: #strands are walked in order, so IDs mostly arrive at the end
+                small.append(ID)
+            else:
+                position=bisect.bisect_left(small,ID)
+                if small[position]==ID:
+                    return False
+                small.insert(position,ID)
+            if len(small)>SMALL_LIMIT:
+                self._to_containers()
+            return True
+        high=ID>>16
+        low=ID&0xffff
+        container=self._container(high,True)
+        if isinstance(container,bytearray):
+            if container[low>>3]&(1<<(low&7)):
+                return False
+            container[low>>3]|=1<<(low&7)
+        else:
+            if len(container)==0 or low>container[-1]: #strands are walked in order, so IDs mostly arrive at the end
+                container.append(low)
+            else:
+                position=bisect.bisect_left(container,low)
+                if position<len(container) and container[position]==low:
+                    return False
+                container.insert(position,low)
+            if len(container)>ARRAY_LIMIT:
+                self._replace(high,self._bitmap(container))
+        self._size+=1
+        return True
+
+    def _bitmap(self,container): #bitmap holding the values of a sorted array container
+        bits=np.zeros(BITMAP_BYTES*8,dtype=np.uint8)
+        bits[np.frombuffer(_to_bytes(container),dtype='<u2').astype(np.int64)]=1
+        return bytearray(np.packbits(bits.reshape((-1,8))[:,::-1]).tobytes()) #bit k of byte b is value 8*b+k
+
+    def _values(self,container): #sorted low bits held by a container
+        if isinstance(container,bytearray):
+            bits=np.unpackbits(np.frombuffer(bytes(container),dtype=np.uint8)).reshape((-1,8))[:,::-1].reshape(-1)
+            return np.flatnonzero(bits)
+        return np.frombuffer(_to_bytes(container),dtype='<u2').astype(np.int64) if len(container)>0 else np.zeros(0,dtype=np.int64)
+
+    def __contains__(self,ID):
+        if self._small is not None:
+            position=bisect.bisect_left(self._small,ID)
+            return position<len(self._small) and self._small[position]==ID
+        container=self._container(ID>>16,False)
+        if container is None:
+            return False
+        low=ID&0xffff
+        if isinstance(container,bytearray):
+            return bool(container[low>>3]&(1<<(low&7)))
+        position=bisect.bisect_left(container,low)
+        return position<len(container) and container[position]==low
+
+    def update(self,IDs): #union with another StrandIDSet or any iterable of IDs
+        if not isinstance(IDs,StrandIDSet) or IDs._small is not None:
+            for ID in IDs:
+                self.add(ID)
+            return
+        if self._small is not None:
+            self._to_containers()
+        for high,other in zip(IDs._keys,IDs._containers):
+            container=self._container(high,False)
+            if container is None: #no overlap, take a copy of the other container
+                container=self._container(high,True)
+                self._replace(high,bytearray(other) if isinstance(other,bytearray) else array.array('H',other))
+                self._size+=IDs._count(other)
+                continue
+            size=self._count(container)
+            if isinstance(container,bytearray) or isinstance(other,bytearray) or size+len(other)>ARRAY_LIMIT:
+                merged=np.bitwise_or(np.frombuffer(bytes(self._as_bitmap(container)),dtype=np.uint8),np.frombuffer(bytes(self._as_bitmap(other)),dtype=np.uint8))
+                merged=bytearray(merged.tobytes())
+                if int(_BIT_COUNTS[np.frombuffer(bytes(merged),dtype=np.uint8)].sum())<=ARRAY_LIMIT: #stays sparse
+                    merged=array.array('H',self._values(merged).tolist())
+            else:
+                merged=array.array('H',np.union1d(self._values(container),self._values(other)).tolist())
+            self._replace(high,merged)
+            self._size+=self._count(merged)-size
+
+    def _as_bitmap(self,container):
+        if isinstance(container,bytearray):
+            return container
+        return self._bitmap(container)
+
+    def _count(self,container):
+        if isinstance(container,bytearray):
+            return int(_BIT_COUNTS[np.frombuffer(bytes(container),dtype=np.uint8)].sum())
+        return len(container)
+
+    def union(self,IDs):
+        result=StrandIDSet()
+        result.update(self)
+        result.update(IDs)
+        return result
+
+    def __len__(self):
+        if self._small is not None:
+            return len(self._small)
+        return self._size
+
+    def __iter__(self): #IDs in increasing order
+        if self._small is not None:
+            for ID in list(self._small):
+                yield ID
+            return
+        for high,container in zip(self._keys,self._containers):
+            for low in self._values(container).tolist():
+                yield (high<<16)|low
+
+    def __eq__(self,other):
+        return isinstance(other,StrandIDSet) and len(self)==len(other) and list(self)==list(other)
+
+    def __ne__(self,other):
+        return not self.__eq__(other)
+
+    def memory_bytes(self): #approximate bytes held by the sorted list or the containers
+        if self._small is not None:
+            return 8*len(self._small)
+        return self._keys.itemsize*len(self._keys)+sum([len(_) if isinstance(_,bytearray) else 2*len(_) for _ in self._containers])
+
+    def to_bytes(self): #serialized form: magic, container count, then per container its key, kind (0 array, 1 bitmap), entry count and data
+        source=self
+        if self._small is not None: #a small set is written in container form like any other
+            source=StrandIDSet()
+            source._to_containers()
+            source.update(self)
+        parts=[SERIAL_MAGIC,struct.pack("<I",len(source._keys))]
+        for high,container in zip(source._keys,source._containers):
+            if isinstance(container,bytearray):
+                parts.append(struct.pack("<iBI",high,1,BITMAP_BYTES))
+                parts.append(bytes(container))
+            else:
+                parts.append(struct.pack("<iBI",high,0,len(container)))
+                parts.append(_to_bytes(container))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls,data):
+        assert data[:4]==SERIAL_MAGIC
+        result=cls()
+        result._to_containers()
+        count,=struct.unpack("<I",data[4:8])
+        position=8
+        for _ in range(0,count):
+            high,kind,length=struct.unpack("<iBI",data[position:position+9])
+            position+=9
+            if kind==1:
+                container=bytearray(data[position:position+length])
+                position+=length
+            else:
+                container=_from_bytes('H',data[position:position+2*length])
+                position+=2*length
+            result._keys.append(high)
+            result._containers.append(container)
+            result._size+=result._count(container)
+        return result
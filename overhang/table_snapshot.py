@@ -0,0 +1,151 @@
+'''
+Author: Kevin Volkel
+
+Filename: table_snapshot.py
+
+Description: Read only snapshots of lite builder strand hash tables stored as sorted numpy arrays. A snapshot is opened memory mapped, so later stages like the rotate builder can look keys up without rebuilding or unpickling the table
+
+'''
+import os
+import struct
+import logging
+import numpy as np
+from overhang.hash_tables import key_digest, DigestHashTable, SpillHashTable
+from overhang.rotation import mods_of
+
+slogger=logging.getLogger('dna.overhang.table_snapshot')
+slogger.addHandler(logging.NullHandler())
+
+'''
+Layout: a snapshot is a directory of .npy files, one row per table key, sorted by the 128 bit digest of the key.
+    digest_high, digest_low: high and low 64 bits of key_digest(key,16)
+    height, count: for HEIGHT_COUNTS tables, whose values are (height<<32)|use count (ideal and baseopt)
+    mod_offsets, mods, mod_counts: for MOD_COUNTS tables, whose values are {strandIDmod: count} (baseopt_w), or MOD_BITMASKS tables of strandIDmod bitmasks (rotate), the mods of row i are
+                                   mods[mod_offsets[i]:mod_offsets[i+1]], a bitmask's mods are stored with a count of 1
+'''
+
+
+def _digest_items(table): #(16 byte digest, value) for every entry of a strand hash table
+    if isinstance(table,DigestHashTable):
+        assert table.digest_size==16 #digests must match the ones lookups compute
+        return table.iteritems()
+    items=table.iteritems() if hasattr(table,'iteritems') else table.items()
+    if isinstance(table,SpillHashTable) and table.digest_keys:
+        return items
+    return ((key_digest(key,16),value) for key,value in items)
+
+
+#table kinds, the builders' table values can not be told apart by their type so the caller names the kind
+HEIGHT_COUNTS=0 #(height<<32)|use count integers (ideal and baseopt)
+MOD_COUNTS=1 #{strandIDmod: count} dictionaries (baseopt_w)
+MOD_BITMASKS=2 #strandIDmod bitmask integers (rotate)
+TRANSFORM=3 #transform records, not snapshotted
+
+MAX_HEIGHT=64 #no tree is taller than log2 of a strand length
+
+
+def _check_height_count(value):
+    if isinstance(value,dict) or isinstance(value,bool) or not 1<=value>>32<=MAX_HEIGHT or value&(4294967296-1)==0:
+        raise ValueError("table value {!r} is not a (height<<32)|count record".format(value))
+
+
+def save_table_snapshot(table,path,kind): #write a strand hash table (dictionary, DigestHashTable or SpillHashTable) out as a snapshot directory, kind is one of the table kinds above
+    if kind==TRANSFORM:
+        raise ValueError("transform tables can not be snapshotted")
+    if kind not in (HEIGHT_COUNTS,MOD_COUNTS,MOD_BITMASKS):
+        raise ValueError("unknown table kind {}".format(kind))
+    if not os.path.exists(path):
+        os.makedirs(path)
+    rows=sorted(_digest_items(table),key=lambda _:_[0])
+    if kind==MOD_BITMASKS:
+        for _,value in rows:
+            if isinstance(value,dict) or isinstance(value,bool):
+                raise ValueError("table value {!r} is not a strandIDmod bitmask".format(value))
+        rows=[(digest,dict([(mod,1) for mod in mods_of(value)])) for digest,value in rows]
+    elif kind==MOD_COUNTS:
+        for _,value in rows:
+            if not isinstance(value,dict):
+                raise ValueError("table value {!r} is not a {{strandIDmod: count}} dictionary".format(value))
+    else:
+        for _,value in rows:
+            _check_height_count(value)
+    digests=[struct.unpack(">QQ",_[0]) for _ in rows]
+    np.save(os.path.join(path,"digest_high.npy"),np.array([_[0] for _ in digests],dtype=np.uint64))
+    np.save(os.path.join(path,"digest_low.npy"),np.array([_[1] for _ in digests],dtype=np.uint64))
+    if kind!=HEIGHT_COUNTS:
+        offsets=[0]
+        mods=[]
+        counts=[]
+        for _,value in rows:
+            for mod in sorted(value):
+                mods.append(mod)
+                counts.append(int(value[mod]))
+            offsets.append(len(mods))
+        np.save(os.path.join(path,"mod_offsets.npy"),np.array(offsets,dtype=np.uint64))
+        np.save(os.path.join(path,"mods.npy"),np.array(mods,dtype=np.uint16))
+        np.save(os.path.join(path,"mod_counts.npy"),np.array(counts,dtype=np.uint32))
+    else:
+        np.save(os.path.join(path,"height.npy"),np.array([_[1]>>32 for _ in rows],dtype=np.uint32))
+        np.save(os.path.join(path,"count.npy"),np.array([_[1]&(4294967296-1) for _ in rows],dtype=np.uint32))
+    slogger.info("snapshot of {} keys written to {}".format(len(rows),path))
+
+
+class TableSnapshot(object): #read only, dictionary-like view of a snapshot directory, can be passed as the rotate builder's opt_dictionary
+    def __init__(self,path):
+        self.path=path
+        self._high=self._load("digest_high.npy")
+        self._low=self._load("digest_low.npy")
+        self.per_mod=os.path.exists(os.path.join(path,"mod_offsets.npy"))
+        if self.per_mod:
+            self._mod_offsets=self._load("mod_offsets.npy")
+            self._mods=self._load("mods.npy")
+            self._mod_counts=self._load("mod_counts.npy")
+        else:
+            self._height=self._load("height.npy")
+            self._count=self._load("count.npy")
+        #the builders look up the same key several times in a row, so remember the last row found
+        self._last_key=None
+        self._last_row=-1
+
+    def _load(self,name):
+        return np.load(os.path.join(self.path,name),mmap_mode='r')
+
+    def _row(self,key): #row holding key, -1 if the key is not in the snapshot
+        if key is self._last_key:
+            return self._last_row
+        high,low=struct.unpack(">QQ",key_digest(key,16))
+        row=int(np.searchsorted(self._high,np.uint64(high)))
+        while row<len(self._high) and int(self._high[row])==high and int(self._low[row])<low: #rows with equal high words are sorted by the low word
+            row+=1
+        if row>=len(self._high) or int(self._high[row])!=high or int(self._low[row])!=low:
+            row=-1
+        self._last_key=key
+        self._last_row=row
+        return row
+
+    def _value(self,row):
+        if self.per_mod:
+            start,end=int(self._mod_offsets[row]),int(self._mod_offsets[row+1])
+            return dict(zip(self._mods[start:end].tolist(),self._mod_counts[start:end].tolist()))
+        return (int(self._height[row])<<32)|int(self._count[row])
+
+    def __contains__(self,key):
+        return self._row(key)>=0
+
+    def __getitem__(self,key): #same value the table held, a (height<<32)|count integer or a {strandIDmod: count} dictionary
+        row=self._row(key)
+        if row<0:
+            raise KeyError(key)
+        return self._value(row)
+
+    def get(self,key,default=None):
+        row=self._row(key)
+        if row<0:
+            return default
+        return self._value(row)
+
+    def __setitem__(self,key,value):
+        raise TypeError("table snapshots are read only")
+
+    def __len__(self):
+        return len(self._high)
@@ -0,0 +1,60 @@
+'''
+Author: Kevin Volkel
+
+Filename: transform_state.py
+
+Description: Per datastrand records kept in the transform lite builders' strand hash tables. A record is one integer, the low SEED_BITS hold the
+             seed strandIDmod plus one for data whose other overhang versions are tentatively built from the seed by transforms (0 when there
+             are no transforms), and bit SEED_BITS+i is set once overhang version i is in use
+
+'''
+
+SEED_BITS=16 #enough for any overhang count
+SEED_MASK=(1<<SEED_BITS)-1
+
+'''
+With transforms every overhang version exists from the start. The seed is built directly, the two versions next to the seed take a transform that
+builds on the version 3 past the seed (depth 2), and every other version takes a single transform (depth 1). A transform is only counted as a
+reaction the first time its version is used, so all the builders need to know per version is whether it has been used yet.
+'''
+
+
+def new_record(strandIDmod,transforms): #record for data first seen with overhang version strandIDmod
+    return ((1<<strandIDmod)<<SEED_BITS)|(strandIDmod+1 if transforms else 0)
+
+
+def has_transforms(record):
+    return record&SEED_MASK!=0
+
+
+def is_used(record,strandIDmod):
+    return (record>>(SEED_BITS+strandIDmod))&1==1
+
+
+def has_version(record,strandIDmod): #True if overhang version strandIDmod has been built or can be reached by a transform
+    return has_transforms(record) or is_used(record,strandIDmod)
+
+
+def add_version(record,strandIDmod): #record with overhang version strandIDmod in use
+    return record|(1<<(SEED_BITS+strandIDmod))
+
+
+def transform_depth(record,strandIDmod,num_overhangs): #0 for the seed or data without transforms, otherwise the transforms needed to build the version
+    seed=(record&SEED_MASK)-1
+    if seed<0 or strandIDmod==seed:
+        return 0
+    if strandIDmod==(seed+1)%num_overhangs or strandIDmod==(seed-1)%num_overhangs:
+        return 2
+    return 1
+
+
+def use_version(record,strandIDmod,num_overhangs): #returns the updated record and the transform reactions activated by using strandIDmod
+    if not has_transforms(record) or is_used(record,strandIDmod): #the seed is always in use
+        return record,0
+    activated=1
+    if transform_depth(record,strandIDmod,num_overhangs)==2:
+        base=((record&SEED_MASK)-1+3)%num_overhangs #the version this transform builds on
+        if not is_used(record,base):
+            activated+=1
+            record=add_version(record,base)
+    return add_version(record,strandIDmod),activated
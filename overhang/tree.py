@@ -9,9 +9,93 @@ Description: Provides tools that analyze a set of strands and generates a direct
 #import networkx as nx #graph support library
 import math
 import sys
+import logging
+import numpy as np
 from overhang.util.overhang_utils import * #get/cut overhang utility functions here
 import overhang.dnastorage_utils.codec.base_conversion as bc
 from reaction_node import *
+from overhang.packed_strand import PackedStrand, PackedSegment
+from overhang.inventory import ANY_OVERHANG, substrand_fields
+from overhang.rotation import RotationShifts, has_mod, add_mod, rotation_distance
+from overhang.transform_state import new_record, has_version, add_version, use_version
+from overhang.strand_geometry import strand_geometry
+
+tlogger=logging.getLogger('dna.overhang.tree')
+tlogger.addHandler(logging.NullHandler())
+
+
+def _strand_count(strands): #number of strands in a list or any other iterable
+    if hasattr(strands,'__len__'):
+        return len(strands)
+    return sum(1 for _ in strands)
+
+#helpers that let the lite builders work on both strand strings and packed strands
+def _strand_view(s): #packed strands are walked through segment views, strings are used as is
+    if isinstance(s,PackedStrand):
+        return PackedSegment(s,0,s.num_codewords)
+    return s
+
+def _codeword_count(s,reactiontree): #number of codewords held in a strand or substrand
+    if isinstance(s,PackedSegment):
+        return len(s)
+    return (len(s)-reactiontree.overhang_length)//(reactiontree.codeword_length+reactiontree.overhang_length)
+
+def _sub_reaction_count(s,block_group_size,reactiontree): #number of sub reactions s is broken into
+    return (_codeword_count(s,reactiontree)+block_group_size-1)//block_group_size
+
+def _sub_reaction(s,index,block_group_size,reactiontree): #substrand making up the index-th sub reaction of s
+    if isinstance(s,PackedSegment):
+        return s.sub_segment(index,block_group_size)
+    i=index*block_group_size*(reactiontree.codeword_length+reactiontree.overhang_length)
+    end_index=i+((block_group_size*(reactiontree.codeword_length+reactiontree.overhang_length)+reactiontree.overhang_length))
+    if end_index>=len(s): end_index=len(s)
+    return s[i:end_index]
+
+def _data_key(substrand,reactiontree): #data carried by a substrand with the overhangs cut out
+    if isinstance(substrand,PackedSegment):
+        return substrand.data_key()
+    datastrand=""
+    for data_start in range(reactiontree.overhang_length,len(substrand),reactiontree.codeword_length+reactiontree.overhang_length):
+        datastrand+=substrand[data_start:data_start+reactiontree.codeword_length]
+    return datastrand
+
+def _substrand_key(substrand,reactiontree): #data and bookending overhangs of a substrand
+    if isinstance(substrand,PackedSegment):
+        return substrand.substrand_key(reactiontree.num_overhangs)
+    return substrand
+
+def _key_source(s,reactiontree): #(codeword count, data key of codewords [start,end), substrand key of codewords [start,end)) for one strand
+    #keys are cut straight out of buffers shared by the whole strand, so each key costs one slice rather than a substring copy and a rebuilt datastrand
+    if isinstance(s,PackedStrand):
+        s=_strand_view(s)
+    if isinstance(s,PackedSegment):
+        packed=s.strand
+        offset=s.start
+        return len(s),(lambda start,end: packed.data_key(offset+start,offset+end)),(lambda start,end: packed.substrand_key(offset+start,offset+end,reactiontree.num_overhangs))
+    geometry=reactiontree.geometry
+    stride=geometry.stride
+    codeword_length=geometry.codeword_length
+    data=[] #strand data with every overhang cut out, made on the first data key asked for since substrand keys do not need it
+    def data_key(start,end):
+        if len(data)==0:
+            data.append(geometry.payload(s))
+        return data[0][start*codeword_length:end*codeword_length]
+    return (len(s)-geometry.overhang_length)//stride,data_key,(lambda start,end: s[start*stride:end*stride+geometry.overhang_length])
+
+def _inventory_match(reactiontree,h,table_key,value,payload,start_overhang): #a reaction missing from the table that an earlier job already synthesized is recorded as a match
+    if reactiontree.inventory is None or not reactiontree.inventory.contains(h,payload,start_overhang):
+        return False
+    if reactiontree.h_array is not None:
+        reactiontree.h_array[h-1]+=1
+    reactiontree.strand_hash_table[table_key]=value
+    return True
+
+def _carry_skips(skipped,sub_reaction_count,num_overhangs): #skip flags for the next height down, skipped holds the flags of the height above (None at the top)
+    #sub reactions of a height nest exactly inside those of the height above, so a sub reaction optimized out is flagged once at its own height and its
+    #flag is carried down to the num_overhangs-1 sub reactions below it here, rather than written over every codeword it covers
+    if skipped is None or 1 not in skipped:
+        return bytearray(sub_reaction_count)
+    return bytearray(np.repeat(np.frombuffer(bytes(skipped),dtype=np.uint8),num_overhangs-1)[:sub_reaction_count].tobytes())
 
 #Steps to correcting a node
 '''
@@ -146,10 +230,10 @@ def node_correction(tree,node,parent):
                         padNode=tree.strand_hash_table[reaction_strand]
                         assert(padNode.is_pad())
                         padNode.inc_use_count()
-                        padNode.insert_strand_ID(node._strandIDList)#inherit the node's ID list
+                        padNode.insert_strand_ID(node.get_strand_IDs())#inherit the node's IDs
                     else:
                         #print "new node"
-                        padNode=ReactionNode(node._strandIDList,-1,True) #make pad reaction
+                        padNode=tree.new_node(node.get_strand_IDs(),-1,True) #make pad reaction
                         tree.inc_node_count()
                         tree.inc_pad_count()
                         tree.strand_hash_table[reaction_strand]=padNode
@@ -162,179 +246,203 @@ def node_correction(tree,node,parent):
                 return
 
 
-
-
-
-
-def ideal_tree_rec(s,parent_node,h,strand_index,reactiontree):
-    block_group_size=(reactiontree.num_overhangs-1)**h
-    for i in range(0,len(s),block_group_size*(reactiontree.codeword_length+reactiontree.overhang_length)):#breaks up the input strand into sub reactions  
-        if i == (len(s)-(reactiontree.overhang_length)): break
-        end_index=i+((block_group_size*(reactiontree.codeword_length+reactiontree.overhang_length)+reactiontree.overhang_length))
-        #assert end_index<=len(s)
-        if end_index>=len(s): end_index=len(s)
-        substrand=s[i:end_index]
-        datastrand=""
-        #cut data out of substrand
-        for data_start in range(reactiontree.overhang_length,len(substrand),reactiontree.codeword_length+reactiontree.overhang_length):
-            datastrand+=substrand[data_start:data_start+reactiontree.codeword_length]
-        if datastrand in reactiontree.strand_hash_table and reactiontree.strand_hash_table[datastrand].get_height()==h:
+#ideal tree walk of one strand, depth first with an explicit stack, frames are (height, first codeword, end codeword, parent node) for the sub reactions left to walk at a height
+#and (0, node) once all of node's children have been walked
+def ideal_tree_iter(s,h,strand_index,reactiontree):
+    num_codewords,data_key,_=_key_source(s,reactiontree)
+    block_group_sizes=reactiontree.geometry.block_group_sizes
+    stack=[(h,0,num_codewords,None)] if num_codewords>0 else []
+    while stack:
+        frame=stack.pop()
+        if frame[0]==0:
+            frame[1].set_true_children(len(frame[1].get_child_list()))
+            continue
+        height,start,end,parent_node=frame
+        sub_end=min(start+block_group_sizes[height],end)
+        if sub_end<end:
+            stack.append((height,sub_end,end,parent_node)) #next sub reaction at this height, walked after this one's subtree
+        datastrand=data_key(start,sub_end)
+        if datastrand in reactiontree.strand_hash_table and reactiontree.strand_hash_table[datastrand].get_height()==height:
             if reactiontree.h_array is not None:
-                reactiontree.h_array[h-1]+=1 #increment counter tracking the number of times redundancy was found at a certain height
+                reactiontree.h_array[height-1]+=1 #increment counter tracking the number of times redundancy was found at a certain height
             node=reactiontree.strand_hash_table[datastrand]
             node.inc_use_count()
             node.insert_strand_ID(strand_index)
             if parent_node!=None:
-                #reactiontree.add_edge(node,parent_node)
                 parent_node.add_child(node)
             continue #move onto next substrand at the same level without traversing deeper down the tree
-        else:
-            node=ReactionNode(strand_index,h,False)
-            reactiontree.strand_hash_table[datastrand]=node #add node to the hastable
-            reactiontree.inc_node_count()
-            if parent_node!=None:
-                #reactiontree.add_edge(node,parent_node)
-                parent_node.add_child(node)
-            else: #this is a terminator
-                reactiontree.add_terminator(node)
-                node.set_term()
-            #before going to the next sub-strand at height h, move down the tree
-            if h >1: #if we are at height 1, we are at the bottom of the tree
-                ideal_tree_rec(substrand,node,h-1,strand_index,reactiontree)
-                node.set_true_children(len(node.get_child_list()))
+        node=reactiontree.new_node(strand_index,height,False)
+        reactiontree.strand_hash_table[datastrand]=node #add node to the hastable
+        reactiontree.inc_node_count()
+        if parent_node!=None:
+            parent_node.add_child(node)
+        else: #this is a terminator
+            reactiontree.add_terminator(node)
+            node.set_term()
+        if height>1: #if we are at height 1, we are at the bottom of the tree
+            stack.append((0,node))
+            stack.append((height-1,start,sub_end,node))
     return
 
 
 #optimal tree construction that takes advantage of any data repeat, but also constructs the tree recursively as to not double count sub reactions of a matching strand
-def construct_tree_ideal(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None):
+def construct_tree_ideal(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None,compact_nodes=False):
     
     reactiontree=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,repair_strategy)
+    if compact_nodes: #nodes are rows of a NodeStore instead of ReactionNode objects
+        reactiontree.node_store=NodeStore()
+    h=reactiontree.geometry.full_height
     for strand_index, s in enumerate(strands):
-        h=int(math.log(strand_length_in_codewords,num_overhangs-1))
-        ideal_tree_rec(s,None,h,strand_index,reactiontree)
+        ideal_tree_iter(s,h,strand_index,reactiontree)
+    if compact_nodes: #children are read from CSR arrays from here on
+        reactiontree.node_store.finish()
     return reactiontree
 
 
 
 
-#recursive method used to build the base-opt tree
-def baseopt_tree_rec(s,parent_node,h,strand_index,reactiontree):
-    block_group_size=(reactiontree.num_overhangs-1)**h
-    for i in range(0,len(s),block_group_size*(reactiontree.codeword_length+reactiontree.overhang_length)):#breaks up the input strand into sub reactions  
-        if i == (len(s)-(reactiontree.overhang_length)): break
-        end_index=i+((block_group_size*(reactiontree.codeword_length+reactiontree.overhang_length)+reactiontree.overhang_length))
-        if end_index >= len(s): end_index=len(s)
-        #assert end_index<=len(s)
-        substrand=s[i:end_index]
-        if substrand in reactiontree.strand_hash_table and reactiontree.strand_hash_table[substrand].get_height()==h: #make sure heights match
+#baseopt tree walk of one strand, depth first with an explicit stack, frames are (height, first codeword, end codeword, parent node) for the sub reactions left to walk at a height
+#and (0, node, substrand, parent node) once all of node's children have been walked and node can be corrected
+def baseopt_tree_iter(s,h,strand_index,reactiontree):
+    num_codewords,_,substrand_key=_key_source(s,reactiontree)
+    block_group_sizes=reactiontree.geometry.block_group_sizes
+    stack=[(h,0,num_codewords,None)] if num_codewords>0 else []
+    while stack:
+        frame=stack.pop()
+        if frame[0]==0:
+            _,node,substrand,parent_node=frame
+            node.set_true_children(len(node.get_child_list()))#should be done with all sub tree work once reaching here
+            c_strand=create_corrected_strand_short(node,substrand,reactiontree.overhang_length)
+            node.set_corrected_substrand(c_strand)
+            if node.get_true_children()<reactiontree.ideal_children_nodes and not node.is_term() and node.get_pad_strand() is "":
+                node_correction(reactiontree,node,parent_node)
+            elif node.is_term():
+                node.set_corrected_substrand("")#remove term's strand
+            for _ in node.get_child_list():
+                _.set_corrected_substrand("") #no longer need these children's corrected substrands
+            continue
+        height,start,end,parent_node=frame
+        sub_end=min(start+block_group_sizes[height],end)
+        if sub_end<end:
+            stack.append((height,sub_end,end,parent_node)) #next sub reaction at this height, walked after this one's subtree
+        substrand=substrand_key(start,sub_end)
+        if substrand in reactiontree.strand_hash_table and reactiontree.strand_hash_table[substrand].get_height()==height: #make sure heights match
             if reactiontree.h_array is not None:
-                reactiontree.h_array[h-1]+=1 #increment counter tracking the number of times redundancy was found at a certain height
+                reactiontree.h_array[height-1]+=1 #increment counter tracking the number of times redundancy was found at a certain height
             node=reactiontree.strand_hash_table[substrand]
             node.inc_use_count()
             node.insert_strand_ID(strand_index)
             if parent_node!=None:
-                #reactiontree.add_edge(node,parent_node)
                 parent_node.add_child(node)
             continue #move onto next substrand at the same level without traversing deeper down the tree
-        else:
-            node=ReactionNode(strand_index,h,False)
-            reactiontree.strand_hash_table[substrand]=node #add node to the hastable
-            reactiontree.inc_node_count()
-            if parent_node!=None:
-                #reactiontree.add_edge(node,parent_node)
-                parent_node.add_child(node)
-            #before going to the next sub-strand at height h, move down the tree
-            else:
-                #this is a terminator
-                reactiontree.add_terminator(node)
-                node.set_term()
-            if h >1: #if we are at height 1, we are at the bottom of the tree
-                baseopt_tree_rec(substrand,node,h-1,strand_index,reactiontree)
-                node.set_true_children(len(node.get_child_list()))#should be done with all sub tree work once reaching here
-                c_strand=create_corrected_strand_short(node,substrand,reactiontree.overhang_length)
-                node.set_corrected_substrand(c_strand)
-                if node.get_true_children()<reactiontree.ideal_children_nodes and not node.is_term() and node.get_pad_strand() is "":
-                    node_correction(reactiontree,node,parent_node)
-                elif node.is_term():
-                    node.set_corrected_substrand("")#remove term's strand
-                for _ in node.get_child_list():
-                    _.set_corrected_substrand("") #no longer need these children's corrected substrands
-                
-            if h==1: #at the base but we still need to check for node correction
-                node.set_corrected_substrand(substrand) #bottom of tree set corrected to current
-                start_overhang=get_start_overhang(substrand,reactiontree.overhang_length)
-                #print "node strand {}".format(substrand)
-                #print "start overhang {}".format(start_overhang)
-                end_overhang=get_end_overhang(substrand,reactiontree.overhang_length)
-                #print "end overhang {}".format(end_overhang)
-                start_overhangID=reactiontree.overhang_to_num[start_overhang]
-                end_overhangID=reactiontree.overhang_to_num[end_overhang]
-                #print"start ID {} end ID {}".format(start_overhangID,end_overhangID)
-                #end ID should be m-1 larger (mod m) than the start overhang
-                ideal_ID=(start_overhangID+(reactiontree.num_overhangs-1))%(reactiontree.num_overhangs)
-                if not ideal_ID==end_overhangID: #end repair needs to be done at the base
-                    node_correction(reactiontree,node,parent_node)
-                node.set_true_children(reactiontree.num_overhangs-1)
-                
+        node=reactiontree.new_node(strand_index,height,False)
+        reactiontree.strand_hash_table[substrand]=node #add node to the hastable
+        reactiontree.inc_node_count()
+        if parent_node!=None:
+            parent_node.add_child(node)
+        else: #this is a terminator
+            reactiontree.add_terminator(node)
+            node.set_term()
+        if height>1: #children are walked before the node is corrected
+            stack.append((0,node,substrand,parent_node))
+            stack.append((height-1,start,sub_end,node))
+            continue
+        #at the base but we still need to check for node correction
+        node.set_corrected_substrand(substrand) #bottom of tree set corrected to current
+        start_overhangID=reactiontree.overhang_to_num[get_start_overhang(substrand,reactiontree.overhang_length)]
+        end_overhangID=reactiontree.overhang_to_num[get_end_overhang(substrand,reactiontree.overhang_length)]
+        #end ID should be m-1 larger (mod m) than the start overhang
+        ideal_ID=(start_overhangID+(reactiontree.num_overhangs-1))%(reactiontree.num_overhangs)
+        if not ideal_ID==end_overhangID: #end repair needs to be done at the base
+            node_correction(reactiontree,node,parent_node)
+        node.set_true_children(reactiontree.num_overhangs-1)
     return
 
 
-def construct_tree_baseopt(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None):
+def construct_tree_baseopt(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None,compact_nodes=False):
     reactiontree=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,repair_strategy)
+    if compact_nodes: #nodes are rows of a NodeStore instead of ReactionNode objects
+        reactiontree.node_store=NodeStore()
+    h=reactiontree.geometry.full_height
     for strand_index, s in enumerate(strands):
-        h=int(math.log(strand_length_in_codewords,num_overhangs-1))
-        baseopt_tree_rec(s,None,h,strand_index,reactiontree)
+        baseopt_tree_iter(s,h,strand_index,reactiontree)
+    if compact_nodes: #children are read from CSR arrays from here on
+        reactiontree.node_store.finish()
     return reactiontree
         
 
 
 
 
-#lite version of ideal recursive tree build
-def ideal_tree_rec_lite(s,h,strand_index,reactiontree):
-    block_group_size=(reactiontree.num_overhangs-1)**h
-    for i in range(0,len(s),block_group_size*(reactiontree.codeword_length+reactiontree.overhang_length)):#breaks up the input strand into sub reactions
-        if i == (len(s)-(reactiontree.overhang_length)): break
-        end_index=i+((block_group_size*(reactiontree.codeword_length+reactiontree.overhang_length)+reactiontree.overhang_length))
-        #assert end_index<=len(s)
-        if end_index>=len(s): end_index=len(s)
-        substrand=s[i:end_index]
-        datastrand=""
-        #cut data out of substrand
-        for data_start in range(reactiontree.overhang_length,len(substrand),reactiontree.codeword_length+reactiontree.overhang_length):
-            datastrand+=substrand[data_start:data_start+reactiontree.codeword_length]
-        #if h==12:
-            #print datastrand
-            #print substrand
-            #print len(datastrand)
-        if datastrand in reactiontree.strand_hash_table and reactiontree.strand_hash_table[datastrand]>>32==h:
+#lite ideal and baseopt walk of one strand, a sub reaction that matches the table is counted and not walked any deeper, a new one is added and its sub reactions are walked,
+#depth first with an explicit stack of (height, first codeword, end codeword) frames, one per height holding the sub reactions left to walk there
+def tree_iter_lite(s,h,baseopt,reactiontree):
+    num_codewords,data_key,substrand_key=_key_source(s,reactiontree)
+    keyed_tree_iter_lite(num_codewords,substrand_key if baseopt else data_key,h,baseopt,reactiontree)
+
+def keyed_tree_iter_lite(num_codewords,key_of,h,baseopt,reactiontree): #walk of tree_iter_lite, key_of(first,end) gives the table key of codewords [first,end)
+    table=reactiontree.strand_hash_table
+    block_group_sizes=reactiontree.geometry.block_group_sizes
+    stack=[(h,0,num_codewords)] if num_codewords>0 else []
+    while stack:
+        height,start,end=stack.pop()
+        sub_end=min(start+block_group_sizes[height],end)
+        if sub_end<end:
+            stack.append((height,sub_end,end)) #next sub reaction at this height, walked after this one's subtree
+        key=key_of(start,sub_end)
+        value=table.get(key)
+        if value is not None and value>>32==height: #make sure heights match
             if reactiontree.h_array is not None:
-                reactiontree.h_array[h-1]+=1 #increment counter tracking the number of times redundancy was found at a certain height
-            use_count=reactiontree.strand_hash_table[datastrand]&(4294967296-1)
-            use_count+=1
-            height=reactiontree.strand_hash_table[datastrand]>>32
-            reactiontree.strand_hash_table[datastrand]=(height<<32)|use_count
+                reactiontree.h_array[height-1]+=1 #increment counter tracking the number of times redundancy was found at a certain height
+            table[key]=value+1 #use count is in the bottom 32 bits
             continue #move onto next substrand at the same level without traversing deeper down the tree
-        else:
-            hash_table_value=(h<<32)|1 #height in top 32, use count in bottom 32
-            reactiontree.strand_hash_table[datastrand]=hash_table_value
-            reactiontree.inc_node_count()
-            #before going to the next sub-strand at height h, move down the tree
-            if h >1: #if we are at height 1, we are at the bottom of the tree
-                ideal_tree_rec_lite(substrand,h-1,strand_index,reactiontree)
+        if reactiontree.inventory is not None:
+            if baseopt:
+                payload,start_overhang=substrand_fields(key,reactiontree)
+            else:
+                payload,start_overhang=key,ANY_OVERHANG
+            if _inventory_match(reactiontree,height,key,(height<<32)|1,payload,start_overhang):
+                continue #synthesized by an earlier job, neither counted nor walked
+        table[key]=(height<<32)|1 #height in top 32, use count in bottom 32
+        reactiontree.inc_node_count()
+        if height>1: #if we are at height 1, we are at the bottom of the tree
+            stack.append((height-1,start,sub_end))
     return
 
+def ideal_tree_iter_lite(s,h,strand_index,reactiontree):
+    tree_iter_lite(s,h,False,reactiontree)
+
+def baseopt_tree_iter_lite(s,h,strand_index,reactiontree):
+    tree_iter_lite(s,h,True,reactiontree)
+
 
 #entry point to extremely lightweight node counting for the base optimzation case, also takes into account padding needed for incomplete trees
-def construct_tree_ideal_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None):
-    reactiontree=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,repair_strategy)
+def construct_tree_ideal_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None,hash_table=None,workers=None,inventory=None,index_codewords=None):
+    if workers is not None and workers>1 and inventory is None: #split the strands across a process pool, the result's strand hash table is keyed on digests
+        import overhang.tree_parallel as tree_parallel
+        strands=list(strands)
+        if tree_parallel.sharded_geometry_ok(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,tree_parallel.IDEAL):
+            return tree_parallel.construct_tree_sharded_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,workers,tree_parallel.IDEAL,hash_table)
+    reactiontree=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,repair_strategy,hash_table)
+    reactiontree.inventory=inventory #reactions already in the inventory are not counted again
+    h=reactiontree.geometry.height
+    num_strands=0 #strands can be any iterable, so they are counted as they stream by
+    groups=None
+    if index_codewords is not None: #strands matching an earlier strand past their first index_codewords codewords only walk their index region
+        from overhang.strand_dedup import StrandGroups
+        groups=StrandGroups(reactiontree,index_codewords,False)
     for strand_index, s in enumerate(strands):
-        h=int(math.ceil(math.log(strand_length_in_codewords,num_overhangs-1)))
-        ideal_tree_rec_lite(s,h,strand_index,reactiontree)
+        num_strands+=1
+        if groups is not None:
+            groups.walk(s,h)
+        else:
+            ideal_tree_iter_lite(s,h,strand_index,reactiontree)
+    if groups is not None:
+        groups.flush()
     #create a unoptimized tree lite to calculate necessary padding overheads
-    unopt_tree=construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array)
-    reactiontree.add_pad_count(unopt_tree.get_pad_count()/len(strands)) #can optimize therefore the price of padding count should be only paid once, padding is also not data dependent only alignment dependent per strand
-    reactiontree.add_node_count(unopt_tree.get_pad_count()/len(strands))
+    unopt_tree=construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,num_strands=num_strands)
+    reactiontree.add_pad_count(unopt_tree.get_pad_count()/num_strands) #can optimize therefore the price of padding count should be only paid once, padding is also not data dependent only alignment dependent per strand
+    reactiontree.add_node_count(unopt_tree.get_pad_count()/num_strands)
     reactiontree.dec_node_count(unopt_tree.get_singleton_nodes_removed())
     return reactiontree
 
@@ -343,44 +451,101 @@ def construct_tree_ideal_lite(strands,num_overhangs,overhang_length,codeword_len
 
 
 
-#recursive method, with modifications to make optimization reaction countring more lightweight
-def baseopt_tree_rec_lite(s,h,strand_index,reactiontree):
-    block_group_size=(reactiontree.num_overhangs-1)**h
-    for i in range(0,len(s),block_group_size*(reactiontree.codeword_length+reactiontree.overhang_length)):#breaks up the input strand into sub reactions  
-        if i == (len(s)-(reactiontree.overhang_length)): break
-        end_index=i+((block_group_size*(reactiontree.codeword_length+reactiontree.overhang_length)+reactiontree.overhang_length))
-        if end_index >= len(s): end_index=len(s)
-        #assert end_index<=len(s)
-        substrand=s[i:end_index]
-        if substrand in reactiontree.strand_hash_table and reactiontree.strand_hash_table[substrand]>>32==h: #make sure heights match
-            if reactiontree.h_array is not None:
-                reactiontree.h_array[h-1]+=1 #increment counter tracking the number of times redundancy was found at a certain height
-            use_count=reactiontree.strand_hash_table[substrand]&(4294967296-1)
-            use_count+=1
-            height=reactiontree.strand_hash_table[substrand]>>32
-            reactiontree.strand_hash_table[substrand]=(height<<32)|use_count
-            continue #move onto next substrand at the same level without traversing deeper down the tree
-        else:
-            hash_table_value=(h<<32)|1 #height in top 32, use count in bottom 32
-            reactiontree.strand_hash_table[substrand]=hash_table_value
-            reactiontree.inc_node_count()
-            if h >1: #if we are at height 1, we are at the bottom of the tree
-                baseopt_tree_rec_lite(substrand,h-1,strand_index,reactiontree)
-                
-    return
-
 #entry point to extremely lightweight node counting for the base optimzation case, also takes into account padding needed for incomplete trees
-def construct_tree_baseopt_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None):
-    reactiontree=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,repair_strategy)
+def construct_tree_baseopt_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None,hash_table=None,workers=None,inventory=None,index_codewords=None):
+    if workers is not None and workers>1 and inventory is None: #split the strands across a process pool, the result's strand hash table is keyed on digests
+        import overhang.tree_parallel as tree_parallel
+        strands=list(strands)
+        if tree_parallel.sharded_geometry_ok(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,tree_parallel.BASEOPT):
+            return tree_parallel.construct_tree_sharded_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,workers,tree_parallel.BASEOPT,hash_table)
+    reactiontree=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,repair_strategy,hash_table)
+    reactiontree.inventory=inventory #reactions already in the inventory are not counted again
+    h=reactiontree.geometry.height
+    num_strands=0 #strands can be any iterable, so they are counted as they stream by
+    groups=None
+    if index_codewords is not None: #strands matching an earlier strand past their first index_codewords codewords only walk their index region
+        from overhang.strand_dedup import StrandGroups
+        groups=StrandGroups(reactiontree,index_codewords,True)
     for strand_index, s in enumerate(strands):
-        h=int(math.ceil(math.log(strand_length_in_codewords,num_overhangs-1)))
-        baseopt_tree_rec_lite(s,h,strand_index,reactiontree)
+        num_strands+=1
+        if groups is not None:
+            groups.walk(s,h)
+        else:
+            baseopt_tree_iter_lite(s,h,strand_index,reactiontree)
+    if groups is not None:
+        groups.flush()
+    #create a unoptimized tree lite to calculate necessary padding overheads
+    unopt_tree=construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,num_strands=num_strands)
+    reactiontree.add_pad_count(unopt_tree.get_pad_count()/num_strands) #can optimize therefore the price of padding count should be only paid once, padding is also not data dependent only alignment dependent per strand
+    reactiontree.dec_node_count(unopt_tree.get_singleton_nodes_removed()) #account for removal of nodes
+    return reactiontree
+
+
+
+
+
+#hash-consed (bottom up) versions of the ideal and baseopt lite builders
+#every sub reaction gets an integer ID built from its children's IDs, so table keys stay a few words long at every height
+def _consed_span_IDs(s,h,reactiontree,intern_table): #(codeword count, {(first codeword, end codeword): ID} for every sub reaction of the strand), IDs are equal exactly when the data is equal
+    group_size=reactiontree.num_overhangs-1
+    num_codewords,data_key,substrand_key=_key_source(s,reactiontree)
+    IDs={}
+    spans=[(first,min(first+group_size,num_codewords)) for first in range(0,num_codewords,group_size)]
+    for span in spans: #height 1 reactions are interned by their data
+        datastrand=data_key(span[0],span[1])
+        ID=intern_table.get(datastrand)
+        if ID is None:
+            ID=len(intern_table)
+            intern_table[datastrand]=ID
+        IDs[span]=ID
+    for height in range(2,h+1): #higher reactions are interned by the tuple of their children's IDs
+        level=[]
+        for start in range(0,len(spans),group_size):
+            children=spans[start:start+group_size]
+            span=(children[0][0],children[-1][1])
+            level.append(span)
+            if len(children)==1: #a lone child covers the same codewords as its parent, so they share an ID
+                continue
+            children=tuple([IDs[_] for _ in children])
+            ID=intern_table.get(children)
+            if ID is None:
+                ID=len(intern_table)
+                intern_table[children]=ID
+            IDs[span]=ID
+        spans=level
+    return num_codewords,IDs
+
+def _construct_tree_consed_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,hash_table,workers,baseopt):
+    if workers is not None and workers>1:
+        tlogger.warning("consed builds run in this process, workers={} is ignored".format(workers))
+    reactiontree=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,repair_strategy,hash_table)
+    intern_table={} #maps height 1 data and child ID tuples to IDs
+    h=reactiontree.geometry.height
+    num_strands=0 #strands can be any iterable, so they are counted as they stream by
+    for s in strands:
+        num_strands+=1
+        num_codewords,IDs=_consed_span_IDs(s,h,reactiontree,intern_table)
+        if baseopt: #bookending overhangs are set by the start position
+            key_of=lambda first,end: IDs[(first,end)]*num_overhangs+first%num_overhangs
+        else:
+            key_of=lambda first,end: IDs[(first,end)]
+        keyed_tree_iter_lite(num_codewords,key_of,h,baseopt,reactiontree)
     #create a unoptimized tree lite to calculate necessary padding overheads
-    unopt_tree=construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array)
-    reactiontree.add_pad_count(unopt_tree.get_pad_count()/len(strands)) #can optimize therefore the price of padding count should be only paid once, padding is also not data dependent only alignment dependent per strand
+    unopt_tree=construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,num_strands=num_strands)
+    reactiontree.add_pad_count(unopt_tree.get_pad_count()/num_strands) #can optimize therefore the price of padding count should be only paid once, padding is also not data dependent only alignment dependent per strand
+    if not baseopt:
+        reactiontree.add_node_count(unopt_tree.get_pad_count()/num_strands)
     reactiontree.dec_node_count(unopt_tree.get_singleton_nodes_removed()) #account for removal of nodes
     return reactiontree
 
+#drop in replacement for construct_tree_ideal_lite
+def construct_tree_ideal_consed(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None,hash_table=None,workers=None):
+    return _construct_tree_consed_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,hash_table,workers,False)
+
+#drop in replacement for construct_tree_baseopt_lite
+def construct_tree_baseopt_consed(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None,hash_table=None,workers=None):
+    return _construct_tree_consed_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,hash_table,workers,True)
+
 
 
 
@@ -440,90 +605,18 @@ def construct_tree_unoptimized(strands,num_overhangs,overhang_length,codeword_le
     reactiontree=analytical_ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy)
     
     #print "analytical model"
-    h=int(math.ceil(math.log(strand_length_in_codewords,num_overhangs-1)))
+    h=strand_geometry(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords).height
     for strand_index, s in enumerate(strands):
         unopt_tree_rec(s,None,h,strand_index,reactiontree_x)
     
     return reactiontree
 
-def construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None):
-    #reactiontree_x=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,repair_strategy)
-    '''
-    TODO: Based on strand length and the number of overhangs, do quick analytical calculations rather than recursive algorithm    '''
+def construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None,num_strands=None):
+    #counts come from the memoized analytical model, they only depend on the overhang count, strand length, repair strategy and number of strands
     reactiontree=analytical_ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy)
-    #print "analytical model"
-    h=int(math.ceil(math.log(strand_length_in_codewords,num_overhangs-1)))
-    pad_nodes=0
-    #print h
-    total_nodes=0
-    total_inserts=0
-    previous=False #flag to indicate the previous node is an only child
-    previous_padding=0
-    previous_inserts=0
-    singleton_nodes_removed=0
-    for i in range(1,h+1)[::-1]:
-        #go from the tree top down
-        if i==h:
-            total_nodes+=1
-        else:
-            width=int(math.ceil(float(strand_length_in_codewords)/float((num_overhangs-1)**i)))
-            if i==(h-1):
-                total_nodes+=width
-                continue
-            else:
-                if width%(num_overhangs-1)==0:
-                    total_nodes+=width
-                    previous=0
-                else:
-                    #need to handle incomplete portion of tree
-                    
-                    if previous and width%(num_overhangs-1)==1:
-                        #print "no-opt removal height {} starting reaction count {}".format(i+2,total_nodes+width)
-                        #previous is set,therefore we can remove the previous 2 nodes
-                        total_nodes+=(width-1) #add width-1 (don't need last node)
-                        total_nodes-=1 #(remove parent node)
-                        total_nodes-=previous_padding #(no longer need padding of last node)
-                        #print "no-opt nodes after removal {}".format(total_nodes)
-                        pad_nodes-=previous_padding
-                        total_inserts-=previous_inserts
-                        previous=False
-                        previous_padding=0
-                        singleton_nodes_removed+=2
-                    else:
-                        total_nodes+=width
-                        _pad=0
-                        _inserts=0
-                        #need to add in some padding
-                        if repair_strategy==0:
-                            #m^2 direct repair, only need one insert
-                            _inserts=1
-                        elif repair_strategy==1:
-                            #2m direct repair
-                            _inserts=(num_overhangs-1)-width%(num_overhangs-1)
-                        elif repair_strategy==2:
-                            _pad=(num_overhangs-1)-width%(num_overhangs-1)
-                            _inserts=_pad*(num_overhangs-1)#each pad node should have m-1 inserts
-                            total_nodes+=_pad
-                        total_inserts+=_inserts
-                        pad_nodes+=_pad
-                        if width%(num_overhangs-1)==1:
-                            #print "hang off {}".format(i)
-                            #indicate a lonely end node in the width
-                            previous=True
-                            previous_padding=_pad
-                            previous_inserts=_inserts
-                        else:
-                            previous=False
-                            previous_padding=0
-                            previous_inserts=0
-    total_nodes*=len(strands)
-    pad_nodes*=len(strands)
-    total_singleton_nodes_removed=len(strands)*singleton_nodes_removed
-    reactiontree.add_node_count(total_nodes)
-    reactiontree.add_pad_count(pad_nodes)
-    reactiontree.set_insert_per_strand(total_inserts)
-    reactiontree.set_singleton_nodes_removed(total_singleton_nodes_removed)
-
+    if num_strands is None: #the model only needs the strand count, which callers that stream strands already have
+        num_strands=_strand_count(strands)
+    reactiontree.apply_unopt_model(num_strands)
     return reactiontree
 
 
@@ -532,242 +625,216 @@ def construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codewo
 
 
 ########################## Breadth First Tree Construction (Going to be useful for Assembly Tree Changes for Optimization)#######
-#entry point to extremely lightweight node counting for the base optimzation case, also takes into account padding needed for incomplete trees
-def construct_tree_baseopt_lite_w(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None):
-    reactiontree=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,repair_strategy)
-    for strand_index, s in enumerate(strands):
-        #print len(s)
-        h=int(math.ceil(math.log(strand_length_in_codewords,num_overhangs-1)))
-        skip_array=[False]*strand_length_in_codewords #If an entry is True: you skip this sub strand
-        for height in range(1,h+1)[::-1]:
-            block_group_size=(reactiontree.num_overhangs-1)**height
-            for strandID, i in enumerate(range(0,len(s),block_group_size*(reactiontree.codeword_length+reactiontree.overhang_length))):#breaks up the input strand into sub reactions
-                #print strandID
-                strandIDmod=strandID%num_overhangs
-                if i == (len(s)-(reactiontree.overhang_length)): break
-                if skip_array[strandID*block_group_size]: continue #this tree is already optimized out
-                end_index=i+((block_group_size*(reactiontree.codeword_length+reactiontree.overhang_length)+reactiontree.overhang_length))
-                if end_index>=len(s): end_index=len(s)
-                substrand=s[i:end_index]
-                datastrand=""
-                #cut data out of substrand
-                for data_start in range(reactiontree.overhang_length,len(substrand),reactiontree.codeword_length+reactiontree.overhang_length):
-                    datastrand+=substrand[data_start:data_start+reactiontree.codeword_length]
-                #print len(datastrand)
-                #print codeword_length*block_group_size
-                assert len(datastrand)==codeword_length*block_group_size
-                if datastrand in reactiontree.strand_hash_table:
-                    if strandIDmod in reactiontree.strand_hash_table[datastrand]:#check overhang requirement
-                        #have a match, take the height statistic, don't count the reaction, mark the skip_array
-                        if reactiontree.h_array is not None:
-                            reactiontree.h_array[height-1]+=1 #increment counter tracking the number of times redundancy was found at a certain height
-                        for _ in range(0,block_group_size):
-                            skip_array[_+strandID*block_group_size]=True #set the underlying codewords to all True
-                        reactiontree.strand_hash_table[datastrand][strandIDmod]+=1
-                        continue #move onto next substrand
-                    else: #have seen the data, but not this strandIDmod (overhang version), increment the reaction count
-                        reactiontree.strand_hash_table[datastrand][strandIDmod]=1
-                        reactiontree.inc_node_count()
-                        continue
-                else:#have not seen the data yet
+#per strand body of construct_tree_baseopt_lite_w, data_key(first,end) gives the data of codewords [first,end) of the strand
+def baseopt_w_strand_lite(num_codewords,data_key,h,reactiontree):
+    num_overhangs=reactiontree.num_overhangs
+    geometry=reactiontree.geometry
+    skipped=None #flags sub reactions of the current height that are already optimized out
+    for height in range(1,h+1)[::-1]:
+        block_group_size=geometry.block_group_sizes[height]
+        segments=geometry.segments(height,num_codewords) #codeword bounds of each sub reaction
+        skipped=_carry_skips(skipped,len(segments),num_overhangs)
+        for strandID,(first,end) in enumerate(segments):#breaks up the input strand into sub reactions
+            strandIDmod=strandID%num_overhangs
+            if skipped[strandID]: continue #this tree is already optimized out
+            datastrand=data_key(first,end) #cut data out of the strand
+            assert end-first==block_group_size
+            if reactiontree.inventory is not None and not (datastrand in reactiontree.strand_hash_table and strandIDmod in reactiontree.strand_hash_table[datastrand]) and \
+               reactiontree.inventory.contains(height,datastrand,(strandID*block_group_size)%num_overhangs):
+                #synthesized by an earlier job, count it as a match
+                if reactiontree.h_array is not None:
+                    reactiontree.h_array[height-1]+=1
+                skipped[strandID]=1 #the sub reactions below are optimized out with it
+                if datastrand not in reactiontree.strand_hash_table:
                     reactiontree.strand_hash_table[datastrand]={}
+                reactiontree.strand_hash_table[datastrand][strandIDmod]=1
+                continue
+            if datastrand in reactiontree.strand_hash_table:
+                if strandIDmod in reactiontree.strand_hash_table[datastrand]:#check overhang requirement
+                    #have a match, take the height statistic, don't count the reaction, mark the sub reaction skipped
+                    if reactiontree.h_array is not None:
+                        reactiontree.h_array[height-1]+=1 #increment counter tracking the number of times redundancy was found at a certain height
+                    skipped[strandID]=1 #the sub reactions below are optimized out with it
+                    reactiontree.strand_hash_table[datastrand][strandIDmod]+=1
+                    continue #move onto next substrand
+                else: #have seen the data, but not this strandIDmod (overhang version), increment the reaction count
                     reactiontree.strand_hash_table[datastrand][strandIDmod]=1
                     reactiontree.inc_node_count()
+                    continue
+            else:#have not seen the data yet
+                reactiontree.strand_hash_table[datastrand]={}
+                reactiontree.strand_hash_table[datastrand][strandIDmod]=1
+                reactiontree.inc_node_count()
+
+
+#entry point to extremely lightweight node counting for the base optimzation case, also takes into account padding needed for incomplete trees
+def construct_tree_baseopt_lite_w(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None,hash_table=None,workers=None,inventory=None):
+    if workers is not None and workers>1 and inventory is None: #split the strands across a process pool, the result's strand hash table is keyed on digests
+        import overhang.tree_parallel as tree_parallel
+        strands=list(strands)
+        if tree_parallel.sharded_geometry_ok(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,tree_parallel.BASEOPT_W):
+            return tree_parallel.construct_tree_sharded_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,workers,tree_parallel.BASEOPT_W,hash_table)
+    reactiontree=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,repair_strategy,hash_table)
+    reactiontree.inventory=inventory #reactions already in the inventory are not counted again
+    h=reactiontree.geometry.height
+    num_strands=0 #strands can be any iterable, so they are counted as they stream by
+    for strand_index, s in enumerate(strands):
+        num_strands+=1
+        num_codewords,data_key,_=_key_source(s,reactiontree) #the data of each sub reaction is one slice of the strand's payload
+        baseopt_w_strand_lite(num_codewords,data_key,h,reactiontree)
     #create a unoptimized tree lite to calculate necessary padding overheads
-    unopt_tree=construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array)
-    reactiontree.add_pad_count(unopt_tree.get_pad_count()/len(strands)) #can optimize therefore the price of padding count should be only paid once, padding is also not data dependent only alignment dependent per strand
+    unopt_tree=construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,num_strands=num_strands)
+    reactiontree.add_pad_count(unopt_tree.get_pad_count()/num_strands) #can optimize therefore the price of padding count should be only paid once, padding is also not data dependent only alignment dependent per strand
     reactiontree.dec_node_count(unopt_tree.get_singleton_nodes_removed()) #account for removal of nodes
     return reactiontree
 
 
-def construct_tree_transform_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None):
-    reactiontree=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,repair_strategy)
-    for strand_index, s in enumerate(strands):
-        #print len(s)
-        h=int(math.ceil(math.log(strand_length_in_codewords,num_overhangs-1)))
-        skip_array=[False]*strand_length_in_codewords #If an entry is True: you skip this sub strand
-        for height in range(1,h+1)[::-1]:
-            block_group_size=(reactiontree.num_overhangs-1)**height
-            for strandID, i in enumerate(range(0,len(s),block_group_size*(reactiontree.codeword_length+reactiontree.overhang_length))):#breaks up the input strand into sub reactions
-                strandIDmod=strandID%num_overhangs
-                if i == (len(s)-(reactiontree.overhang_length)): break
-                if skip_array[strandID*block_group_size]: continue #this tree is already optimized out
-                end_index=i+((block_group_size*(reactiontree.codeword_length+reactiontree.overhang_length)+reactiontree.overhang_length))
-                if end_index>=len(s): end_index=len(s)
-                substrand=s[i:end_index]
-                datastrand=""
-                #cut data out of substrand
-                for data_start in range(reactiontree.overhang_length,len(substrand),reactiontree.codeword_length+reactiontree.overhang_length):
-                    datastrand+=substrand[data_start:data_start+reactiontree.codeword_length]
-                #print len(datastrand)
-                #print codeword_length*block_group_size
-                assert len(datastrand)==codeword_length*block_group_size
-                if datastrand in reactiontree.strand_hash_table:
-                    if strandIDmod in reactiontree.strand_hash_table[datastrand]:#check overhang requirement
-                        #have a match, take the height statistic, don't count the reaction, mark the skip_array
-                        if reactiontree.h_array is not None:
-                            reactiontree.h_array[height-1]+=1 #increment counter tracking the number of times redundancy was found at a certain height
-                        for _ in range(0,block_group_size):
-                            skip_array[_+strandID*block_group_size]=True #set the underlying codewords to all True
-                        if height>1 and num_overhangs>=5:
-                            #check to see if this is a product of a transform
-                            transform_info=reactiontree.strand_hash_table[datastrand][strandIDmod]
-                            if transform_info[0]>0:#are using the product of a transform
-                                if transform_info[1]==0:
-                                    reactiontree.inc_node_count() #activate transform
-                                    if transform_info[0]==2:
-                                        transform_info_2=reactiontree.strand_hash_table[datastrand][transform_info[2]]
-                                        if transform_info_2[0]>0:
-                                            if transform_info_2[1]==0:
-                                                reactiontree.inc_node_count()
-                                                reactiontree.strand_hash_table[datastrand][transform_info[2]][1]+=1
-                            reactiontree.strand_hash_table[datastrand][strandIDmod][1]+=1 #increment use count
-                    
-                        elif height==1 or num_overhangs<5:
-                            reactiontree.strand_hash_table[datastrand][strandIDmod][1]+=1 #increment use count     
-                        continue #move onto next substrand
-
-                    else: #have seen the data, but not this strandIDmod (overhang version)
-                        if num_overhangs<5 or height==1:
-                            reactiontree.strand_hash_table[datastrand][strandIDmod]=[0,1]
-                            reactiontree.inc_node_count()
-                        elif num_overhangs>=5 and height>1: #should have transforms upon first creation of the data, assert
-                            assert 0
-                        continue
-                else:#have not seen the data yet
-                    reactiontree.strand_hash_table[datastrand]={}
-                    reactiontree.strand_hash_table[datastrand][strandIDmod]=[0,1,0]
-                    reactiontree.inc_node_count()
-                    if height>1 and num_overhangs>=5: #tentatively create the necessary transforms for all possible strandIDmods using the current strandIDmod as the seed
-                        if strandIDmod==0:
-                            strandIDmod_b=num_overhangs-1
-                        else:
-                            strandIDmod_b=strandIDmod-1
-                        strandIDmod_a=(strandIDmod+1)%num_overhangs
-                        strandIDstart=strandIDmod_a
-                        while strandIDstart!=strandIDmod:
-                            if strandIDstart==strandIDmod_a or strandIDstart==strandIDmod_b:
-                                transform_info=[2,0,(strandIDmod+3)%num_overhangs] #tuple of [depth of transform, and trasform use count]
-                                reactiontree.strand_hash_table[datastrand][strandIDstart]=transform_info
-                            else:
-                                transform_info=[1,0]
-                                reactiontree.strand_hash_table[datastrand][strandIDstart]=transform_info
-                            strandIDstart=(strandIDstart+1)%num_overhangs
+#per strand body of construct_tree_transform_lite
+def transform_strand_lite(num_codewords,data_key,h,reactiontree):
+    num_overhangs=reactiontree.num_overhangs
+    geometry=reactiontree.geometry
+    skipped=None #flags sub reactions of the current height that are already optimized out
+    for height in range(1,h+1)[::-1]:
+        block_group_size=geometry.block_group_sizes[height]
+        segments=geometry.segments(height,num_codewords) #codeword bounds of each sub reaction
+        skipped=_carry_skips(skipped,len(segments),num_overhangs)
+        for strandID,(first,end) in enumerate(segments):#breaks up the input strand into sub reactions
+            strandIDmod=strandID%num_overhangs
+            if skipped[strandID]: continue #this tree is already optimized out
+            datastrand=data_key(first,end) #cut data out of the strand
+            assert end-first==block_group_size
+            record=reactiontree.strand_hash_table.get(datastrand) #transform record of this data, see transform_state.py
+            if record is not None:
+                if has_version(record,strandIDmod):#check overhang requirement
+                    #have a match, take the height statistic, don't count the reaction, mark the sub reaction skipped
+                    if reactiontree.h_array is not None:
+                        reactiontree.h_array[height-1]+=1 #increment counter tracking the number of times redundancy was found at a certain height
+                    skipped[strandID]=1 #the sub reactions below are optimized out with it
+                    if height>1 and num_overhangs>=5:
+                        #check to see if this is a product of a transform, the first use of a transform activates it
+                        record,activated=use_version(record,strandIDmod,num_overhangs)
+                        if activated>0:
+                            reactiontree.add_node_count(activated)
+                            reactiontree.strand_hash_table[datastrand]=record
+                    continue #move onto next substrand
+
+                else: #have seen the data, but not this strandIDmod (overhang version)
+                    if num_overhangs<5 or height==1:
+                        reactiontree.strand_hash_table[datastrand]=add_version(record,strandIDmod)
+                        reactiontree.inc_node_count()
+                    elif num_overhangs>=5 and height>1: #should have transforms upon first creation of the data, assert
+                        assert 0
+                    continue
+            else:#have not seen the data yet
+                #above height 1 the other strandIDmods are tentatively built by transforms using the current strandIDmod as the seed
+                reactiontree.strand_hash_table[datastrand]=new_record(strandIDmod,height>1 and num_overhangs>=5)
+                reactiontree.inc_node_count()
 
+
+def construct_tree_transform_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None,hash_table=None):
+    reactiontree=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,repair_strategy,hash_table)
+    h=reactiontree.geometry.height
+    num_strands=0 #strands can be any iterable, so they are counted as they stream by
+    for strand_index, s in enumerate(strands):
+        num_strands+=1
+        num_codewords,data_key,_=_key_source(s,reactiontree) #the data of each sub reaction is one slice of the strand's payload
+        transform_strand_lite(num_codewords,data_key,h,reactiontree)
     #create a unoptimized tree lite to calculate necessary padding overheads
-    unopt_tree=construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array)
-    reactiontree.add_pad_count(unopt_tree.get_pad_count()/len(strands)) #can optimize therefore the price of padding count should be only paid once, padding is also not data dependent only alignment dependent per strand
+    unopt_tree=construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,num_strands=num_strands)
+    reactiontree.add_pad_count(unopt_tree.get_pad_count()/num_strands) #can optimize therefore the price of padding count should be only paid once, padding is also not data dependent only alignment dependent per strand
     reactiontree.dec_node_count(unopt_tree.get_singleton_nodes_removed()) #account for removal of nodes
     return reactiontree
 
 
+#per strand body of construct_tree_rotate_lite, returns the NOP inserts made in the strand and the reactions needed to merge them
+def rotate_strand_lite(num_codewords,data_key,h,reactiontree,opt_dictionary):
+    DIV=4
+    num_overhangs=reactiontree.num_overhangs
+    geometry=reactiontree.geometry
+    skipped=None #flags sub reactions of the current height that are already optimized out
+    shift_array=RotationShifts(reactiontree.strand_length_in_codewords,num_overhangs) #indicates the number that should be added to strandIDmod in order to derive new strandID
+    insert_height_array=[0]*(h+200) #this array contains the number of NOP reactions inserted at a certain height
+    strand_NOP_inserts=0 #tracks the number of NOP inserts in the strand
+    for height in range(1,h+1)[::-1]:
+        block_group_size=geometry.block_group_sizes[height]
+        NOP_inserts=0
+        segments=geometry.segments(height,num_codewords) #codeword bounds of each sub reaction
+        skipped=_carry_skips(skipped,len(segments),num_overhangs)
+        for strandID,(first,end) in enumerate(segments):#breaks up the input strand into sub reactions
+            if skipped[strandID]: continue #this tree is already optimized out
+            opt_strandID=strandID%num_overhangs #this strand ID preserves its original ID 
+            strandIDmod=(shift_array[strandID*block_group_size]+strandID)%num_overhangs
+            datastrand=data_key(first,end) #cut data out of the strand
+            assert end-first==block_group_size
+            opt_use_count=opt_dictionary[datastrand][opt_strandID]
+            mods=reactiontree.strand_hash_table.get(datastrand) #bitmask of the overhang versions built for this data
+            if mods is not None:
+                if has_mod(mods,strandIDmod):#check overhang requirement
+                    #have a match, take the height statistic, don't count the reaction, mark the sub reaction skipped
+                    if reactiontree.h_array is not None:
+                        reactiontree.h_array[height-1]+=1 #increment counter tracking the number of times redundancy was found at a certain height
+                    skipped[strandID]=1 #the sub reactions below are optimized out with it
+                    continue #move onto next substrand
+                if opt_use_count>10:
+                    #this has been seen to be used a lot just make the node
+                    reactiontree.strand_hash_table[datastrand]=add_mod(mods,strandIDmod)
+                    reactiontree.inc_node_count()                        
+                else: #have seen the data, but not this strandIDmod (overhang version)
+                    #try to rotate to the current strandIDmod
+                    distance=rotation_distance(mods,strandIDmod,num_overhangs) #smallest distance to a version already built
+                    assert distance>0
+                    if distance < (num_overhangs-1)/DIV:  #minimize distance to lower overhead impact
+                        #increment the insertion counters
+                        shift_array.add_from(strandID*block_group_size,distance) #shift every later codeword
+                        NOP_inserts+=distance #track NOP inserts at this height
+                    else:
+                        reactiontree.strand_hash_table[datastrand]=add_mod(mods,strandIDmod)
+                        reactiontree.inc_node_count()
+                continue
+            else:#have not seen the data yet
+                reactiontree.strand_hash_table[datastrand]=add_mod(0,strandIDmod)
+                reactiontree.inc_node_count()
+    
+        insert_height_array[height-1]+=NOP_inserts
+        shift_array.scale(num_overhangs-1)#increase the shift amount to be consistant down the tree
+        strand_NOP_inserts+=NOP_inserts
+    #add analysis of reactions to add for this strand
+    height_array_index=0
+    while insert_height_array[height_array_index]==0:
+        height_array_index+=1
+        if height_array_index==len(insert_height_array): return strand_NOP_inserts,0
+    #have the start of added rotation reactions
+    reaction_counter=0
+    while True:
+        #keep tracking new reactions up the tree until the added reaction at the next level is
+        local_reaction_counter=math.ceil(float(insert_height_array[height_array_index])/float((num_overhangs-1)))
+        reaction_counter+=local_reaction_counter
+        insert_height_array[height_array_index+1]+=local_reaction_counter
+        if insert_height_array[height_array_index+1]-local_reaction_counter==0 and local_reaction_counter==1:#adding 1 to next layer that had nothing 
+            break
+        height_array_index+=1#counter for adding in last reaction to merge all NOPS
+    reaction_counter+=1
+    return strand_NOP_inserts,reaction_counter
+
 
 #analysis for inserting rotation reactions in order to ultimately reduce reactions, opt_dictionary is that of 
-def construct_tree_rotate_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None,opt_dictionary=None):
-    DIV=4
-    reactiontree=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,repair_strategy)
+def construct_tree_rotate_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None,opt_dictionary=None,hash_table=None):
+    reactiontree=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,repair_strategy,hash_table)
     total_NOP_reactions=0
     total_strand_NOP_inserts=0 #tracks the number of NOP inserts in the strand
+    h=reactiontree.geometry.height
+    num_strands=0 #strands can be any iterable, so they are counted as they stream by
     for strand_index, s in enumerate(strands):
-        h=int(math.ceil(math.log(strand_length_in_codewords,num_overhangs-1)))
-        skip_array=[False]*strand_length_in_codewords #If an entry is True: you skip this sub strand
-        shift_array=[0]*strand_length_in_codewords #indicates the number that should be added to strandIDmod in order to derive new strandID
-        insert_height_array=[0]*(h+200) #this array contains the number of NOP reactions inserted at a certain height
-        strand_NOP_inserts=0 #tracks the number of NOP inserts in the strand
-        for height in range(1,h+1)[::-1]:
-            block_group_size=(reactiontree.num_overhangs-1)**height
-            NOP_inserts=0
-            for strandID, i in enumerate(range(0,len(s),block_group_size*(reactiontree.codeword_length+reactiontree.overhang_length))):#breaks up the input strand into sub reactions
-                if i == (len(s)-(reactiontree.overhang_length)): break
-                if skip_array[strandID*block_group_size]: continue #this tree is already optimized out
-                opt_strandID=strandID%num_overhangs #this strand ID preserves its original ID 
-                strandIDmod=(shift_array[strandID*block_group_size]+strandID)%num_overhangs
-                end_index=i+((block_group_size*(reactiontree.codeword_length+reactiontree.overhang_length)+reactiontree.overhang_length))
-                if end_index>=len(s): end_index=len(s)
-                substrand=s[i:end_index]
-                datastrand=""
-                #cut data out of substrand
-                for data_start in range(reactiontree.overhang_length,len(substrand),reactiontree.codeword_length+reactiontree.overhang_length):
-                    datastrand+=substrand[data_start:data_start+reactiontree.codeword_length]
-                assert len(datastrand)==codeword_length*block_group_size
-                opt_use_count=opt_dictionary[datastrand][opt_strandID]
-                if datastrand in reactiontree.strand_hash_table:
-                    if strandIDmod in reactiontree.strand_hash_table[datastrand]:#check overhang requirement
-                        #have a match, take the height statistic, don't count the reaction, mark the skip_array
-                        if reactiontree.h_array is not None:
-                            reactiontree.h_array[height-1]+=1 #increment counter tracking the number of times redundancy was found at a certain height
-                        for _ in range(0,block_group_size):
-                            skip_array[_+strandID*block_group_size]=True #set the underlying codewords to all True
-                        continue #move onto next substrand
-                    if opt_use_count>10:
-                        #print "too large of use"
-                        #this has been seen to be used a lot just make the node
-                        reactiontree.strand_hash_table[datastrand][strandIDmod]=True
-                        reactiontree.inc_node_count()                        
-                    else: #have seen the data, but not this strandIDmod (overhang version)
-                        #try to rotate to the current strandIDmod
-                        #print "going to rotate !!!!!!!!!!!!!!!!!!"
-                        strandIDmod_e=[_ for _ in reactiontree.strand_hash_table[datastrand]]
-                        distance=float('inf')
-                        for dest in strandIDmod_e: #find smallest distance
-                            #get the distance (source to destination distance)  in which we are rotating
-                            if strandIDmod < dest:
-                                _distance=dest-strandIDmod
-                            else:
-                                assert strandIDmod!=dest
-                                distance_to_0=num_overhangs-strandIDmod
-                                distance_from_0=dest
-                                _distance=distance_to_0+distance_from_0
-                            assert _distance>0
-                            if _distance<distance:
-                                distance=_distance
-                        distance=int(distance)
-                        if distance < (num_overhangs-1)/DIV:  #minimize distance to lower overhead impact
-                            #print " strand index {} height {} distance {} num overhangs: {} num_ovrehangs-1/3 {}".format(strand_index,height,distance,num_overhangs,(num_overhangs-1)/3)
-                            #increment the insertion counters
-                            for _ in range(0,len(shift_array[block_group_size*strandID::])):
-                                shift_array[_+strandID*block_group_size]+=distance                                
-                            NOP_inserts+=distance #track NOP inserts at this height
-                        else:
-                            reactiontree.strand_hash_table[datastrand][strandIDmod]=True
-                            reactiontree.inc_node_count()
-                    continue
-                else:#have not seen the data yet
-                    reactiontree.strand_hash_table[datastrand]={}
-                    reactiontree.strand_hash_table[datastrand][strandIDmod]=True
-                    reactiontree.inc_node_count()
-        
-            insert_height_array[height-1]+=NOP_inserts
-            for _index, _ in enumerate(shift_array):
-                shift_array[_index]=shift_array[_index]*(num_overhangs-1)#increase the shift amount to be consistant down the tree
-            strand_NOP_inserts+=NOP_inserts
+        num_strands+=1
+        num_codewords,data_key,_=_key_source(s,reactiontree) #the data of each sub reaction is one slice of the strand's payload
+        strand_NOP_inserts,NOP_reactions=rotate_strand_lite(num_codewords,data_key,h,reactiontree,opt_dictionary)
         total_strand_NOP_inserts+=strand_NOP_inserts
-        #add analysis of reactions to add for this strand
-        height_array_index=0
-        #print insert_height_array
-        #print height_array_index
-        while insert_height_array[height_array_index]==0:
-            height_array_index+=1
-            if height_array_index==len(insert_height_array): break
-        if height_array_index==len(insert_height_array): continue 
-        #have the start of added rotation reactions
-        reaction_counter=0
-        #print insert_height_array
-        while True:
-            #keep tracking new reactions up the tree until the added reaction at the next level is
-            local_reaction_counter=math.ceil(float(insert_height_array[height_array_index])/float((num_overhangs-1)))
-            reaction_counter+=local_reaction_counter
-            insert_height_array[height_array_index+1]+=local_reaction_counter
-            if insert_height_array[height_array_index+1]-local_reaction_counter==0 and local_reaction_counter==1:#adding 1 to next layer that had nothing 
-                break
-            height_array_index+=1#counter for adding in last reaction to merge all NOPS
-        reaction_counter+=1
-        total_NOP_reactions+=reaction_counter
-    print("Total NOP Added {} Total Strands {} Avg NOPs/strand {}".format(total_strand_NOP_inserts,len(strands),float(total_strand_NOP_inserts)/float(len(strands))))
+        total_NOP_reactions+=NOP_reactions
+    tlogger.info("rotate added {} NOPs over {} strands, {} NOPs per strand".format(total_strand_NOP_inserts,num_strands,float(total_strand_NOP_inserts)/float(num_strands)))
     reactiontree.add_node_count(total_NOP_reactions) #add back in NOP counts insertedd      
     #create a unoptimized tree lite to calculate necessary padding overheads
-    unopt_tree=construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array)
-    reactiontree.add_pad_count(unopt_tree.get_pad_count()/len(strands)) #can optimize therefore the price of padding count should be only paid once, padding is also not data dependent only alignment dependent per strand
+    unopt_tree=construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,num_strands=num_strands)
+    reactiontree.add_pad_count(unopt_tree.get_pad_count()/num_strands) #can optimize therefore the price of padding count should be only paid once, padding is also not data dependent only alignment dependent per strand
     reactiontree.dec_node_count(unopt_tree.get_singleton_nodes_removed()) #account for removal of nodes
     return reactiontree
 
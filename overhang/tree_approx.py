@@ -0,0 +1,181 @@
+'''
+Author: Kevin Volkel
+
+Filename: tree_approx.py
+
+Description: Approximate versions of the ideal and baseopt lite builders. Instead of a strand hash table holding every key, each tree height keeps a HyperLogLog sketch of the keys seen there, so memory stays the same no matter how large the workload is
+
+'''
+import math
+import itertools
+import struct
+import logging
+import overhang.tree as tree
+from overhang.reaction_node import ReactionTree
+from overhang.hash_tables import key_digest
+from overhang.tree_fused import StrandKeys
+from overhang.tree_batch import batch_geometry_ok
+
+alogger=logging.getLogger('dna.overhang.tree_approx')
+alogger.addHandler(logging.NullHandler())
+
+'''
+Why distinct counts are enough: a reaction whose parent was a match is never visited, and every reaction whose parent is new is.
+Equal parents split into equal children, so the first occurrence of every key is visited. The reactions a lite builder counts
+at a height are then the distinct keys at that height, and the reactions it visits are the children of the distinct keys one
+height up. Sketches are kept per (height, number of children) so that visits can be estimated too. Like the batch engine this
+matches the lite builders only while no reaction has a lone child, so a workload with a strand whose geometry has one is handed to
+the exact lite builder instead.
+'''
+
+
+class HyperLogLog(object): #distinct count sketch, keys are counted exactly until exact_capacity distinct keys have been seen
+    def __init__(self,precision=14,exact_capacity=2048):
+        self.precision=precision
+        self.num_registers=1<<precision
+        self._registers=bytearray(self.num_registers)
+        self._exact=set() #64 bit hashes of the keys while there are few of them, None once the sketch takes over
+        self.exact_capacity=exact_capacity
+
+    def add_hash(self,hash_value): #hash_value is a uniformly distributed 64 bit integer
+        if self._exact is not None:
+            self._exact.add(hash_value)
+            if len(self._exact)<=self.exact_capacity:
+                return
+            exact=self._exact
+            self._exact=None
+            for _ in exact:
+                self.add_hash(_)
+            return
+        register=hash_value>>(64-self.precision)
+        rest=hash_value&((1<<(64-self.precision))-1)
+        rank=(64-self.precision)-rest.bit_length()+1 #position of the leftmost 1 bit
+        if rank>self._registers[register]:
+            self._registers[register]=rank
+
+    def is_exact(self):
+        return self._exact is not None
+
+    def count(self): #estimated number of distinct keys
+        if self._exact is not None:
+            return len(self._exact)
+        m=self.num_registers
+        alpha=0.7213/(1.0+1.079/m)
+        estimate=alpha*m*m/sum([2.0**-_ for _ in self._registers])
+        zeros=self._registers.count(b"\x00")
+        if estimate<=2.5*m and zeros>0: #small range correction: linear counting
+            estimate=m*math.log(float(m)/zeros)
+        return estimate
+
+    def standard_error(self): #standard error of count()
+        if self._exact is not None:
+            return 0.0
+        return 1.04/math.sqrt(self.num_registers)*self.count()
+
+    def memory_bytes(self):
+        if self._exact is not None:
+            return 8*len(self._exact)
+        return self.num_registers
+
+
+class ApproxReactionTree(ReactionTree): #ReactionTree whose order() is an estimate, keeps the per height sketches used to make it
+    def __init__(self,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,end_repair):
+        ReactionTree.__init__(self,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,end_repair)
+        self.sketches={} #(height, number of children) -> HyperLogLog
+        self._order_error=0.0
+
+    def order_error(self): #standard error of order()
+        return self._order_error
+
+    def order_bounds(self,z=1.96): #(low, high) bounds on the exact reaction count, z standard errors either side of the estimate
+        return (self.order()-z*self._order_error,self.order()+z*self._order_error)
+
+    def sketch_report(self):
+        return {"order":self.order(),
+                "order_error":self._order_error,
+                "sketches":len(self.sketches),
+                "exact_sketches":len([_ for _ in self.sketches.values() if _.is_exact()]),
+                "sketch_bytes":sum([_.memory_bytes() for _ in self.sketches.values()])}
+
+
+def _construct_tree_exact_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,hash_table,workers,baseopt):
+    if baseopt:
+        return tree.construct_tree_baseopt_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,hash_table,workers)
+    return tree.construct_tree_ideal_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,hash_table,workers)
+
+
+def _construct_tree_approx_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,hash_table,workers,baseopt,precision,exact_capacity):
+    reactiontree=ApproxReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,repair_strategy)
+    h=reactiontree.geometry.height
+    top_visits=0 #every top reaction is visited
+    num_strands=0 #strands can be any iterable, so they are counted as they stream by
+    if not batch_geometry_ok(strand_length_in_codewords,strand_length_in_codewords,num_overhangs): #decided before any strand is taken from the input
+        alogger.info("strands of {} codewords have a lone child, using the exact lite builder".format(strand_length_in_codewords))
+        return _construct_tree_exact_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,hash_table,workers,baseopt)
+    taken=[] if iter(strands) is strands else None #a one shot input can not be walked again, so the strands taken from it are kept for a fallback
+    geometry_ok={strand_length_in_codewords:True} #codeword count -> batch_geometry_ok
+    for s in strands:
+        num_strands+=1
+        if taken is not None:
+            taken.append(s)
+        keys=StrandKeys(s,reactiontree)
+        if keys.num_codewords not in geometry_ok:
+            geometry_ok[keys.num_codewords]=batch_geometry_ok(strand_length_in_codewords,keys.num_codewords,num_overhangs)
+        if not geometry_ok[keys.num_codewords]: #a short strand the sketches can not count, nothing has been written to h_array yet
+            alogger.info("strand {} has a lone child, using the exact lite builder".format(num_strands-1))
+            if taken is not None:
+                strands=itertools.chain(taken,strands)
+            return _construct_tree_exact_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,hash_table,workers,baseopt)
+        below=None
+        for height in range(1,h+1): #bottom up, a reaction's digest is built from its children's digests instead of its whole data
+            block_group_size=reactiontree.geometry.block_group_sizes[height]
+            count=keys.count(block_group_size)
+            if below is None:
+                level=[key_digest(keys.data_key(index,block_group_size),8) for index in range(0,count)]
+            else:
+                level=[key_digest(b"".join(below[index*(num_overhangs-1):(index+1)*(num_overhangs-1)]),8) for index in range(0,count)]
+            for index,digest in enumerate(level):
+                if baseopt: #bookending overhangs are set by the start position
+                    digest=key_digest(digest+struct.pack(">Q",(index*block_group_size)%num_overhangs),8)
+                children=0
+                if height>1: #children are needed to estimate the visits made one height down
+                    children=min(num_overhangs-1,len(below)-index*(num_overhangs-1))
+                sketch=reactiontree.sketches.get((height,children))
+                if sketch is None:
+                    sketch=HyperLogLog(precision,exact_capacity)
+                    reactiontree.sketches[(height,children)]=sketch
+                sketch.add_hash(struct.unpack(">Q",digest)[0])
+            below=level
+        top_visits+=len(below)
+    distinct=[0.0]*(h+2)
+    visits=[0.0]*(h+2)
+    variance=0.0
+    for (height,children),sketch in reactiontree.sketches.items():
+        count=sketch.count()
+        distinct[height]+=count
+        visits[height-1]+=children*count
+        variance+=sketch.standard_error()**2
+    visits[h]=top_visits
+    reactiontree.add_node_count(int(round(sum(distinct))))
+    reactiontree._order_error=math.sqrt(variance)
+    if reactiontree.h_array is not None:
+        for height in range(1,h+1):
+            reactiontree.h_array[height-1]+=max(0,int(round(visits[height]-distinct[height]))) #visited reactions that were not new were redundant
+    #create a unoptimized tree lite to calculate necessary padding overheads
+    unopt_tree=tree.construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,num_strands=num_strands)
+    reactiontree.add_pad_count(unopt_tree.get_pad_count()/num_strands) #can optimize therefore the price of padding count should be only paid once, padding is also not data dependent only alignment dependent per strand
+    if not baseopt:
+        reactiontree.add_node_count(unopt_tree.get_pad_count()/num_strands)
+    reactiontree.dec_node_count(unopt_tree.get_singleton_nodes_removed()) #account for removal of nodes
+    alogger.info("approximate {} tree: {}".format("baseopt" if baseopt else "ideal",reactiontree.sketch_report()))
+    return reactiontree
+
+
+#approximate replacement for tree.construct_tree_ideal_lite
+def construct_tree_ideal_approx(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None,hash_table=None,workers=None,precision=14,exact_capacity=2048): #hash_table and workers are only used when falling back to the exact builder
+    return _construct_tree_approx_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,hash_table,workers,False,precision,exact_capacity)
+
+
+#approximate replacement for tree.construct_tree_baseopt_lite
+def construct_tree_baseopt_approx(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None,hash_table=None,workers=None,precision=14,exact_capacity=2048): #hash_table and workers are only used when falling back to the exact builder
+    return _construct_tree_approx_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,hash_table,workers,True,precision,exact_capacity)
@@ -0,0 +1,170 @@
+'''
+Author: Kevin Volkel
+
+Filename: tree_batch.py
+
+Description: Vectorized versions of the ideal and baseopt lite tree builders. All strands of a workload are loaded into a 2-D codeword array and each height is counted in one pass with numpy instead of substring by substring
+
+'''
+import math
+import numpy as np
+import logging
+import overhang.tree as tree
+from overhang.reaction_node import ReactionTree
+from overhang.packed_strand import PackedStrand
+
+blogger=logging.getLogger('dna.overhang.tree_batch')
+blogger.addHandler(logging.NullHandler())
+
+
+_CHUNK_BITS=1<<18 #codeword bits converted to codeword values at a time, bounds the temporary character and bit arrays
+
+
+def _codeword_dtype(codeword_length): #smallest type that holds every codeword value, None if no numpy type does
+    for dtype in [np.uint8,np.uint16,np.uint32]:
+        if codeword_length<=8*np.dtype(dtype).itemsize:
+            return dtype
+    if codeword_length<64: #signed, so that padding groups with -1 does not promote to floats
+        return np.int64
+    return None
+
+
+def codeword_matrix(strands,overhang_length,codeword_length): #(strand count, codewords per strand) array of codeword values, None if the strands can not be stacked
+    dtype=_codeword_dtype(codeword_length)
+    if len(strands)==0 or dtype is None:
+        return None
+    packed=isinstance(strands[0],PackedStrand)
+    if packed:
+        num_codewords=strands[0].num_codewords
+        for s in strands:
+            if not isinstance(s,PackedStrand) or s.num_codewords!=num_codewords or s.codeword_length!=codeword_length:
+                return None
+    else:
+        strand_length=len(strands[0])
+        for s in strands:
+            if len(s)!=strand_length:
+                return None
+        stride=codeword_length+overhang_length
+        num_codewords=(strand_length-overhang_length)//stride
+        columns=(overhang_length+np.arange(num_codewords)[:,np.newaxis]*stride+np.arange(codeword_length)).reshape(-1)
+    matrix=np.zeros((len(strands),num_codewords),dtype=dtype)
+    chunk_strands=max(1,_CHUNK_BITS//max(1,num_codewords*codeword_length))
+    for first in range(0,len(strands),chunk_strands): #only one chunk of strands is copied into numpy at a time
+        chunk=strands[first:first+chunk_strands]
+        if packed:
+            payload=np.frombuffer(b"".join([s.payload for s in chunk]),dtype=np.uint8).reshape((len(chunk),-1))
+            bits=np.unpackbits(payload,axis=1)[:,:num_codewords*codeword_length]
+        else:
+            characters=np.frombuffer("".join(chunk).encode('ascii'),dtype=np.uint8).reshape((len(chunk),strand_length))
+            bits=characters[:,columns]-ord('0')
+        bits=bits.reshape((len(chunk),num_codewords,codeword_length))
+        values=matrix[first:first+len(chunk)]
+        for bit in range(0,codeword_length): #most significant bit first
+            values<<=1
+            values|=bits[:,:,bit]
+    return matrix
+
+
+def _unique_rows(rows): #index of the first occurrence of each distinct row and the distinct row ID of every row
+    #columns are folded into a single int64 key one at a time (mixed radix), when the key would overflow it is first relabeled to dense IDs
+    #sorting int64 keys is far faster than sorting the rows as void records
+    #rows can hold small unsigned codeword values, each column is widened to int64 on its own so the mixed radix keys do not wrap
+    key=rows[:,0].astype(np.int64)-int(rows[:,0].min())
+    key_range=int(key.max())+1
+    for column in range(1,rows.shape[1]):
+        values=rows[:,column].astype(np.int64)-int(rows[:,column].min())
+        value_range=int(values.max())+1
+        if key_range*value_range>=(1<<62):
+            _,key=np.unique(key,return_inverse=True)
+            key_range=int(key.max())+1
+        key=key*value_range+values
+        key_range*=value_range
+    _,first_index,inverse=np.unique(key,return_index=True,return_inverse=True)
+    return first_index,inverse
+
+
+def _group_rows(matrix,group_size,fill): #split every strand's row into groups of group_size columns, the last group is padded with fill
+    num_strands,num_columns=matrix.shape
+    num_groups=(num_columns+group_size-1)//group_size
+    if num_groups*group_size!=num_columns:
+        padded=np.full((num_strands,num_groups*group_size),fill,dtype=np.result_type(matrix.dtype,np.min_scalar_type(fill))) #a negative fill widens unsigned codewords to a signed type
+        padded[:,:num_columns]=matrix
+        matrix=padded
+    return matrix.reshape((num_strands*num_groups,group_size)),num_groups
+
+
+def batch_geometry_ok(strand_length_in_codewords,num_codewords,num_overhangs): #the level-wise counts match the lite builders when no reaction has a lone child
+    h=int(math.ceil(math.log(strand_length_in_codewords,num_overhangs-1)))
+    segments=[None]+[(num_codewords+(num_overhangs-1)**height-1)//(num_overhangs-1)**height for height in range(1,h+1)]
+    for height in range(2,h+1):
+        if segments[height-1]-(segments[height]-1)*(num_overhangs-1)==1:
+            return False #a lone child shares its parent's data, the lite builders see the two as a height mismatch
+    return True
+
+
+def count_levels(codewords,num_overhangs,h,baseopt,h_array=None): #number of new reactions found at each height, same top-down skip rule as the lite builders
+    num_strands=codewords.shape[0]
+    group_size=num_overhangs-1
+    #data IDs for each height, bottom up: a reaction's ID is the distinct row ID of its children's IDs
+    data_IDs=[None]
+    data_first_index=[None]
+    level=codewords
+    for height in range(1,h+1):
+        rows,num_groups=_group_rows(level,group_size,-1) #-1 is never a codeword or an ID, partial reactions stay apart from full ones
+        first_index,inverse=_unique_rows(rows)
+        level=inverse.reshape((num_strands,num_groups)).astype(np.int64)
+        data_IDs.append(level)
+        data_first_index.append(first_index)
+    #top down: a reaction is visited when its parent was new, and new when it is the first visited occurrence of its key
+    new_counts=[0]*(h+1)
+    is_new=None
+    for height in range(h,0,-1):
+        num_groups=data_IDs[height].shape[1]
+        if baseopt: #bookending overhangs are set by the start position mod num_overhangs
+            start_mod=(np.arange(num_groups,dtype=np.int64)*group_size**height)%num_overhangs
+            keys=np.stack((data_IDs[height],np.broadcast_to(start_mod,(num_strands,num_groups))),axis=2).reshape((-1,2))
+            first_index,_=_unique_rows(keys)
+        else: #ideal keys are the data IDs themselves
+            first_index=data_first_index[height]
+        first_seen=np.zeros(num_strands*num_groups,dtype=bool)
+        first_seen[first_index]=True
+        first_seen=first_seen.reshape((num_strands,num_groups))
+        if is_new is None:
+            visited=np.ones((num_strands,num_groups),dtype=bool)
+        else:
+            visited=is_new[:,np.arange(num_groups)//group_size]
+        is_new=visited&first_seen
+        new_counts[height]=int(is_new.sum())
+        if h_array is not None:
+            h_array[height-1]+=int(visited.sum())-new_counts[height] #visited reactions that were not new were redundant
+    return new_counts
+
+
+def _construct_tree_batch_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,hash_table,workers,baseopt):
+    strands=list(strands)
+    codewords=codeword_matrix(strands,overhang_length,codeword_length)
+    if codewords is None or not batch_geometry_ok(strand_length_in_codewords,codewords.shape[1],num_overhangs):
+        blogger.info("batch engine can not count this workload, using the lite builder")
+        if baseopt:
+            return tree.construct_tree_baseopt_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,hash_table,workers)
+        return tree.construct_tree_ideal_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,hash_table,workers)
+    reactiontree=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,repair_strategy)
+    h=reactiontree.geometry.height
+    reactiontree.add_node_count(sum(count_levels(codewords,num_overhangs,h,baseopt,h_array)))
+    #create a unoptimized tree lite to calculate necessary padding overheads
+    unopt_tree=tree.construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array)
+    reactiontree.add_pad_count(unopt_tree.get_pad_count()/len(strands)) #can optimize therefore the price of padding count should be only paid once, padding is also not data dependent only alignment dependent per strand
+    if not baseopt:
+        reactiontree.add_node_count(unopt_tree.get_pad_count()/len(strands))
+    reactiontree.dec_node_count(unopt_tree.get_singleton_nodes_removed()) #account for removal of nodes
+    return reactiontree
+
+
+#drop in replacement for tree.construct_tree_ideal_lite
+def construct_tree_ideal_batch(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None,hash_table=None,workers=None): #hash_table and workers are only used when falling back to the lite builder
+    return _construct_tree_batch_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,hash_table,workers,False)
+
+
+#drop in replacement for tree.construct_tree_baseopt_lite
+def construct_tree_baseopt_batch(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,h_array=None,hash_table=None,workers=None): #hash_table and workers are only used when falling back to the lite builder
+    return _construct_tree_batch_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,hash_table,workers,True)
@@ -0,0 +1,100 @@
+'''
+Author: Kevin Volkel
+
+Filename: tree_fused.py
+
+Description: Fused version of the ideal, baseopt, baseopt_w, transform and rotate lite builders. Each strand is walked once and the keys of its sub reactions are cut out of buffers made once per strand, which every builder shares. The per strand walks are the ones the builders in tree.py use
+
+'''
+import logging
+import overhang.tree as tree
+from overhang.reaction_node import ReactionTree
+
+flogger=logging.getLogger('dna.overhang.tree_fused')
+flogger.addHandler(logging.NullHandler())
+
+IDEAL="ideal"
+BASEOPT="baseopt"
+BASEOPT_W="baseopt_w"
+TRANSFORM="transform"
+ROTATE="rotate"
+ALL_STRATEGIES=(IDEAL,BASEOPT,BASEOPT_W,TRANSFORM,ROTATE)
+
+
+class StrandKeys(object): #keys of one strand's sub reactions, cut out of buffers made once per strand and shared by every builder walking it
+    def __init__(self,s,reactiontree):
+        #data_range(first,end) and substrand_range(first,end) give the same keys as tree._data_key and tree._substrand_key for codewords [first,end)
+        #keys are not cached, a slice of the shared buffer costs less than a dictionary lookup on (first,end)
+        self.num_codewords,self.data_range,self.substrand_range=tree._key_source(s,reactiontree)
+
+    def count(self,block_group_size): #number of sub reactions of block_group_size codewords
+        return (self.num_codewords+block_group_size-1)//block_group_size
+
+    def data_key(self,index,block_group_size): #data key of the index-th sub reaction of block_group_size codewords
+        first=index*block_group_size
+        return self.data_range(first,min(first+block_group_size,self.num_codewords))
+
+
+'''
+Builds the trees of every strategy in strategies with one walk over the strands, returns a dictionary mapping each strategy to its ReactionTree.
+h_arrays and hash_tables map strategies to the h_array and strand hash table their builder would be given.
+Rotate decisions depend on the finished baseopt_w table, so rotate shares the walk only when opt_dictionary is given, otherwise it takes
+a second walk after the first one has finished baseopt_w. strands must be iterable twice in that case, iterators are turned into lists.
+'''
+def construct_trees_fused_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy=None,strategies=ALL_STRATEGIES,h_arrays=None,hash_tables=None,opt_dictionary=None):
+    for strategy in strategies:
+        assert strategy in ALL_STRATEGIES
+    if h_arrays is None:
+        h_arrays={}
+    if hash_tables is None:
+        hash_tables={}
+    second_walk=[]
+    if ROTATE in strategies and opt_dictionary is None:
+        assert BASEOPT_W in strategies #rotate needs the baseopt_w table to decide when to rotate
+        second_walk=[ROTATE]
+        if iter(strands) is strands:
+            strands=list(strands)
+    first_walk=[_ for _ in strategies if _ not in second_walk]
+    trees={}
+    for strategy in strategies:
+        trees[strategy]=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_arrays.get(strategy),repair_strategy,hash_tables.get(strategy))
+    h=trees[strategies[0]].geometry.height
+    NOP_counts=[0,0] #NOP inserts and NOP reactions made by rotate
+    num_strands=0 #strands can be any iterable, so they are counted as they stream by
+    walks=[first_walk]
+    if len(second_walk)>0:
+        walks.append(second_walk)
+    for walk in walks:
+        num_strands=0
+        for s in strands:
+            num_strands+=1
+            keys=StrandKeys(s,trees[walk[0]])
+            for strategy in walk:
+                reactiontree=trees[strategy]
+                if strategy==IDEAL:
+                    tree.keyed_tree_iter_lite(keys.num_codewords,keys.data_range,h,False,reactiontree)
+                elif strategy==BASEOPT:
+                    tree.keyed_tree_iter_lite(keys.num_codewords,keys.substrand_range,h,True,reactiontree)
+                elif strategy==BASEOPT_W:
+                    tree.baseopt_w_strand_lite(keys.num_codewords,keys.data_range,h,reactiontree)
+                elif strategy==TRANSFORM:
+                    tree.transform_strand_lite(keys.num_codewords,keys.data_range,h,reactiontree)
+                else:
+                    if opt_dictionary is None:
+                        opt_dictionary=trees[BASEOPT_W].strand_hash_table
+                    strand_NOP_inserts,NOP_reactions=tree.rotate_strand_lite(keys.num_codewords,keys.data_range,h,reactiontree,opt_dictionary)
+                    NOP_counts[0]+=strand_NOP_inserts
+                    NOP_counts[1]+=NOP_reactions
+    flogger.info("fused walk of {} strands for {}".format(num_strands,strategies))
+    #create a unoptimized tree lite to calculate necessary padding overheads, it is the same for every strategy
+    unopt_tree=tree.construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,None,num_strands=num_strands)
+    for strategy in strategies:
+        reactiontree=trees[strategy]
+        if strategy==ROTATE:
+            flogger.info("rotate added {} NOPs over {} strands".format(NOP_counts[0],num_strands))
+            reactiontree.add_node_count(NOP_counts[1]) #add back in NOP counts inserted
+        reactiontree.add_pad_count(unopt_tree.get_pad_count()/num_strands) #can optimize therefore the price of padding count should be only paid once, padding is also not data dependent only alignment dependent per strand
+        if strategy==IDEAL:
+            reactiontree.add_node_count(unopt_tree.get_pad_count()/num_strands)
+        reactiontree.dec_node_count(unopt_tree.get_singleton_nodes_removed()) #account for removal of nodes
+    return trees
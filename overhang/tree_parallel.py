@@ -0,0 +1,155 @@
+'''
+Author: Kevin Volkel
+
+Filename: tree_parallel.py
+
+Description: Multiprocess versions of the ideal, baseopt and baseopt_w lite builders. Strands are split across a process pool, the keys each process finds are partitioned by hash into shards, and the shards are merged into global per-height counts
+
+'''
+import logging
+import multiprocessing
+from overhang.reaction_node import ReactionTree
+from overhang.hash_tables import DigestHashTable, key_digest
+import overhang.tree as tree
+from overhang.packed_strand import PackedSegment
+from overhang.tree_batch import batch_geometry_ok
+
+plogger=logging.getLogger('dna.overhang.tree_parallel')
+plogger.addHandler(logging.NullHandler())
+
+'''
+Why the counts can be merged: for these builders a reaction whose parent was a match is never visited, and every reaction
+whose parent is new is. Equal parents split into equal children, so the first occurrence of any key is always visited.
+The number of new reactions at a height is then the number of distinct keys at that height, and the number of visited
+reactions is the number of children of the distinct keys one height up. Neither depends on the order strands are seen in,
+which only holds while no reaction has a lone child (a lone child has the same key as its parent).
+'''
+
+IDEAL=0
+BASEOPT=1
+BASEOPT_W=2
+
+
+def _level_keys(s,data,height,mode,reactiontree): #digests of the keys each builder uses at one height, baseopt_w keeps the overhang ID next to the data digest
+    block_group_size=reactiontree.geometry.block_group_sizes[height]
+    count=tree._sub_reaction_count(s,block_group_size,reactiontree)
+    if mode==BASEOPT:
+        return [key_digest(tree._substrand_key(tree._sub_reaction(s,index,block_group_size,reactiontree),reactiontree)) for index in range(0,count)]
+    if data is None: #packed strands build their data keys directly
+        keys=[key_digest(tree._data_key(tree._sub_reaction(s,index,block_group_size,reactiontree),reactiontree)) for index in range(0,count)]
+    else: #the data of a string substrand is a slice of the strand's data
+        width=block_group_size*reactiontree.codeword_length
+        keys=[key_digest(data[index*width:(index+1)*width]) for index in range(0,count)]
+    if mode==BASEOPT_W:
+        keys=[(key,index%reactiontree.num_overhangs) for index,key in enumerate(keys)]
+    return keys
+
+
+def _shard_of(key,num_shards):
+    digest=key[0] if isinstance(key,tuple) else key
+    return (ord(digest[0:1])<<8|ord(digest[1:2]))%num_shards
+
+
+def _map_strands(args): #worker: keys of every reaction in a chunk of strands, each distinct key is stored once along with its children's keys
+    strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,mode,num_shards=args
+    reactiontree=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,None,None)
+    h=reactiontree.geometry.height
+    group_size=num_overhangs-1
+    shards=[[{} for _ in range(0,h+1)] for _ in range(0,num_shards)] #shards[shard][height] maps key -> child keys
+    top_counts={} #every top reaction is visited, so its use count is its number of occurrences
+    for s in strands:
+        s=tree._strand_view(s)
+        data=None
+        if not isinstance(s,PackedSegment) and mode!=BASEOPT:
+            data=reactiontree.geometry.payload(s) #cut the data out once per strand
+        below=None
+        for height in range(1,h+1): #bottom up so the child keys are known
+            keys=_level_keys(s,data,height,mode,reactiontree)
+            for index,key in enumerate(keys):
+                table=shards[_shard_of(key,num_shards)][height]
+                if key not in table:
+                    table[key]=() if below is None else tuple(below[index*group_size:(index+1)*group_size])
+            below=keys
+        for key in below:
+            top_counts[key]=top_counts.get(key,0)+1
+    return shards,top_counts
+
+
+def _reduce_shard(args): #worker: merge one shard from every chunk, count its distinct keys and the children they visit
+    shard_tables,h=args
+    distinct=[0]*(h+1)
+    child_counts=[{} for _ in range(0,h+1)] #child_counts[height] maps key -> number of visits from distinct parents one height up
+    for height in range(1,h+1):
+        merged={}
+        for tables in shard_tables:
+            merged.update(tables[height])
+        distinct[height]=len(merged)
+        counts=child_counts[height-1]
+        for children in merged.values():
+            for child in children:
+                counts[child]=counts.get(child,0)+1
+    return distinct,child_counts
+
+
+def construct_tree_sharded_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array,workers,mode,hash_table=None):
+    strands=list(strands)
+    if hash_table is not None:
+        plogger.warning("sharded builds key their table on plain digests, the {} handed in is ignored".format(type(hash_table).__name__))
+    reactiontree=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,h_array,repair_strategy,DigestHashTable()) #keys cross process boundaries as digests, so the table is keyed on them too
+    h=reactiontree.geometry.height
+    num_chunks=min(len(strands),workers*4)
+    chunk_size=(len(strands)+num_chunks-1)//num_chunks
+    chunks=[(strands[_:_+chunk_size],num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,mode,workers) for _ in range(0,len(strands),chunk_size)]
+    pool=multiprocessing.Pool(workers)
+    try:
+        mapped=pool.map(_map_strands,chunks)
+        reduced=pool.map(_reduce_shard,[([shards[shard] for shards,_ in mapped],h) for shard in range(0,workers)])
+    finally:
+        pool.close()
+        pool.join()
+    #use counts: top reactions by occurrence, lower reactions by the visits made from distinct parents
+    use_counts=[{} for _ in range(0,h+1)]
+    for _,top_counts in mapped:
+        for key,count in top_counts.items():
+            use_counts[h][key]=use_counts[h].get(key,0)+count
+    distinct=[0]*(h+1)
+    for shard_distinct,child_counts in reduced:
+        for height in range(1,h+1):
+            distinct[height]+=shard_distinct[height]
+            for key,count in child_counts[height].items():
+                use_counts[height][key]=use_counts[height].get(key,0)+count
+    for height in range(1,h+1):
+        reactiontree.add_node_count(distinct[height])
+        if reactiontree.h_array is not None:
+            reactiontree.h_array[height-1]+=sum(use_counts[height].values())-distinct[height] #visited reactions that were not new were redundant
+        for key,count in use_counts[height].items(): #same values the serial builders leave in the strand hash table
+            if mode==BASEOPT_W:
+                mods=reactiontree.strand_hash_table.get_digest(key[0])
+                if mods is None:
+                    mods={}
+                    reactiontree.strand_hash_table.set_digest(key[0],mods)
+                mods[key[1]]=count
+            else:
+                reactiontree.strand_hash_table.set_digest(key,(height<<32)|count)
+    #create a unoptimized tree lite to calculate necessary padding overheads
+    unopt_tree=tree.construct_tree_unoptimized_lite(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,repair_strategy,h_array)
+    reactiontree.add_pad_count(unopt_tree.get_pad_count()/len(strands)) #can optimize therefore the price of padding count should be only paid once, padding is also not data dependent only alignment dependent per strand
+    if mode==IDEAL:
+        reactiontree.add_node_count(unopt_tree.get_pad_count()/len(strands))
+    reactiontree.dec_node_count(unopt_tree.get_singleton_nodes_removed()) #account for removal of nodes
+    return reactiontree
+
+
+def sharded_geometry_ok(strands,num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,mode=IDEAL): #the sharded counts match the serial builders when no reaction has a lone child
+    if len(strands)==0:
+        return False
+    reactiontree=ReactionTree(num_overhangs,overhang_length,codeword_length,strand_length_in_codewords,None,None)
+    num_codewords=tree._codeword_count(tree._strand_view(strands[0]),reactiontree)
+    for s in strands:
+        if tree._codeword_count(tree._strand_view(s),reactiontree)!=num_codewords:
+            return False
+    if mode==BASEOPT_W: #the serial baseopt_w builder only takes strands whose sub reactions are all complete
+        block_group_sizes=reactiontree.geometry.block_group_sizes
+        if any([num_codewords%block_group_sizes[height]!=0 for height in range(1,reactiontree.geometry.height+1)]):
+            return False
+    return batch_geometry_ok(strand_length_in_codewords,num_codewords,num_overhangs)
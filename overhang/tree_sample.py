@@ -0,0 +1,116 @@
+'''
+Author: Kevin Volkel
+
+Filename: tree_sample.py
+
+Description: Estimates the reaction count of a full workload from tree builds over random strand samples of increasing size. The number of new reactions found at each height is extrapolated to the full strand count with a power law fit, sampling stops once the confidence interval is tight enough
+
+'''
+import math
+import random
+import logging
+from overhang.reaction_node import unopt_strand_model
+
+slogger=logging.getLogger('dna.overhang.tree_sample')
+slogger.addHandler(logging.NullHandler())
+
+FIT_POINTS=3 #number of the largest samples the power law is fit to
+
+
+class SampledEstimate(object): #result of estimate_order_sampled
+    def __init__(self,order,low,high,sample_size,num_strands,history):
+        self.order=order #estimated reaction count of all strands
+        self.low=low #confidence interval on order
+        self.high=high
+        self.sample_size=sample_size #strands in the largest sample built
+        self.num_strands=num_strands
+        self.exact=sample_size==num_strands #the last build covered every strand, order is exact
+        self.history=history #(sample size, estimate, low, high) for every sample built
+
+    def relative_width(self): #half width of the interval relative to the estimate
+        if self.order==0:
+            return 0.0
+        return (self.high-self.low)/2.0/abs(self.order)
+
+
+def _height_counts(reactiontree): #new reactions per height of an ideal or baseopt lite tree, whose table values are (height<<32)|use count
+    table=reactiontree.strand_hash_table
+    items=table.iteritems() if hasattr(table,'iteritems') else table.items()
+    max_height=reactiontree.geometry.height
+    counts={}
+    for _,value in items:
+        if isinstance(value,dict) or isinstance(value,list) or isinstance(value,bool) or not 1<=value>>32<=max_height:
+            raise ValueError("strand hash table values are not (height<<32)|count records, per height estimates need an ideal or baseopt lite build")
+        counts[value>>32]=counts.get(value>>32,0)+1
+    return counts
+
+
+def _power_law_fit(sizes,counts,num_strands,z): #extrapolate counts(size) to num_strands with a least squares fit of log count against log size, returns (estimate, low, high)
+    points=[(math.log(size),math.log(count)) for size,count in zip(sizes,counts) if count>0][-FIT_POINTS:] #growth slows as samples grow, so only the largest samples are fit
+    if len(points)==0:
+        return 0.0,0.0,0.0
+    if len(points)<3: #too few points to put an interval on the fit
+        return float(counts[-1])*num_strands/sizes[-1],0.0,float('inf')
+    x_mean=sum([_[0] for _ in points])/len(points)
+    y_mean=sum([_[1] for _ in points])/len(points)
+    sxx=sum([(_[0]-x_mean)**2 for _ in points])
+    slope=sum([(_[0]-x_mean)*(_[1]-y_mean) for _ in points])/sxx
+    slope=min(max(slope,0.0),1.0) #new reactions can neither shrink nor grow faster than the strand count
+    intercept=y_mean-slope*x_mean
+    residual=sum([(_[1]-intercept-slope*_[0])**2 for _ in points])
+    s=math.sqrt(residual/(len(points)-2)) if len(points)>2 else 0.0
+    x=math.log(num_strands)
+    se=s*math.sqrt(1.0/len(points)+(x-x_mean)**2/sxx)
+    y=intercept+slope*x
+    return math.exp(y),math.exp(y-z*se),math.exp(y+z*se)
+
+
+'''
+build takes a list of strands and returns the finished ReactionTree, e.g. a lambda around one of the lite builders.
+pad_nodes_counted is True for builders that add padding reactions to their node count (the ideal builders).
+per_height is True for builders whose table values are (height<<32)|use count (the ideal and baseopt lite builders), each height is then fit
+on its own. Every other builder keeps its own records in the table (baseopt_w count dictionaries, transform records, rotate bitmasks), so
+their whole count is fit instead.
+The part of the count that depends on the data is extrapolated, the padding and singleton terms come from the analytical model.
+'''
+def estimate_order_sampled(build,strands,num_overhangs,strand_length_in_codewords,repair_strategy=None,pad_nodes_counted=False,per_height=False,
+                           initial_strands=64,growth=2.0,rel_tolerance=0.02,z=1.96,seed=0):
+    strands=list(strands)
+    num_strands=len(strands)
+    _,pad_nodes,_,singleton_nodes_removed=unopt_strand_model(num_overhangs,strand_length_in_codewords,repair_strategy)
+    sample_order=list(range(0,num_strands))
+    random.Random(seed).shuffle(sample_order) #samples are nested prefixes of one random permutation
+    sizes=[]
+    height_counts=[] #new reactions per height for each sample, when per_height
+    data_counts=[] #data dependent part of the count for each sample
+    history=[]
+    size=min(initial_strands,num_strands)
+    while True:
+        reactiontree=build([strands[_] for _ in sample_order[:size]])
+        sizes.append(size)
+        data_counts.append(reactiontree.order()-(pad_nodes if pad_nodes_counted else 0)+size*singleton_nodes_removed)
+        if per_height:
+            height_counts.append(_height_counts(reactiontree))
+        del reactiontree
+        if size==num_strands:
+            estimate=low=high=float(data_counts[-1])
+        elif per_height: #fit each height on its own, heights saturate at very different sample sizes
+            estimate=low=high=0.0
+            variance=0.0
+            for height in set([_ for counts in height_counts for _ in counts]):
+                fit=_power_law_fit(sizes,[counts.get(height,0) for counts in height_counts],num_strands,z)
+                estimate+=fit[0]
+                variance+=((fit[2]-fit[1])/(2.0*z))**2
+            unmatched=data_counts[-1]-sum(height_counts[-1].values()) #nodes counted twice by height mismatches, scaled with the strand count
+            estimate+=float(unmatched)*num_strands/size
+            low=estimate-z*math.sqrt(variance)
+            high=estimate+z*math.sqrt(variance)
+        else:
+            estimate,low,high=_power_law_fit(sizes,data_counts,num_strands,z)
+        offset=(pad_nodes if pad_nodes_counted else 0)-num_strands*singleton_nodes_removed
+        history.append((size,estimate+offset,low+offset,high+offset))
+        slogger.info("sample of {} of {} strands: estimate {} interval ({}, {})".format(size,num_strands,*history[-1][1:]))
+        result=SampledEstimate(estimate+offset,low+offset,high+offset,size,num_strands,history)
+        if size==num_strands or (len(sizes)>=3 and result.relative_width()<=rel_tolerance):
+            return result
+        size=min(num_strands,int(math.ceil(size*growth)))
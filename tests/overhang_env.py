@@ -0,0 +1,71 @@
+'''
+Filename: overhang_env.py
+
+Description: Test setup shared by the test modules, import it before any overhang module. overhang.tree pulls its overhang helpers from
+             overhang.util.overhang_utils, which is not shipped with this package, so when that import fails a stand in module with the four
+             helpers tree.py uses is installed. Strands are laid out overhang first, so the cutting helpers only slice the strand string, and
+             the stand in create_corrected_strand_short gives back the substrand as it was walked (STAND_IN is True then). overhang.tree
+             is Python 2.7 only, like the rest of the project, so modules importing this one are skipped under Python 3
+
+'''
+import math
+import random
+import sys
+import types
+import unittest
+
+if sys.version_info[0]>2:
+    raise unittest.SkipTest("overhang.tree only runs under Python 2.7")
+
+STAND_IN=False #True when the stand in helpers are used, counts of padded builds were recorded with them
+
+try:
+    import overhang.util.overhang_utils
+except ImportError:
+    STAND_IN=True
+
+    def get_start_overhang(strand,overhang_length):
+        return strand[:overhang_length]
+
+    def get_end_overhang(strand,overhang_length):
+        return strand[-overhang_length:]
+
+    def cut_end_overhang(strand,overhang_length):
+        return strand[:-overhang_length]
+
+    def create_corrected_strand_short(node,substrand,overhang_length):
+        return substrand
+
+    util=types.ModuleType('overhang.util')
+    overhang_utils=types.ModuleType('overhang.util.overhang_utils')
+    overhang_utils.get_start_overhang=get_start_overhang
+    overhang_utils.get_end_overhang=get_end_overhang
+    overhang_utils.cut_end_overhang=cut_end_overhang
+    overhang_utils.create_corrected_strand_short=create_corrected_strand_short
+    overhang_utils.__all__=['get_start_overhang','get_end_overhang','cut_end_overhang','create_corrected_strand_short']
+    util.overhang_utils=overhang_utils
+    sys.modules['overhang.util']=util
+    sys.modules['overhang.util.overhang_utils']=overhang_utils
+
+import overhang.dnastorage_utils.codec.base_conversion as bc
+
+
+def overhang(ID,overhang_length): #the string ReactionTree.num_to_overhang gives the overhang ID
+    return bc.convertQuarnary(ID,overhang_length)[::-1]
+
+
+def make_strand(codewords,num_overhangs,overhang_length): #overhang 0, then each codeword followed by the next overhang
+    return overhang(0,overhang_length)+"".join([str(codeword)+overhang((index+1)%num_overhangs,overhang_length) for index,codeword in enumerate(codewords)])
+
+
+def workload(num_strands,num_overhangs,strand_length,seed): #1 bit strands drawn from a few base strands with some codewords flipped, so reactions repeat
+    overhang_length=int(math.ceil(math.log(num_overhangs,4)))
+    rnd=random.Random(seed)
+    bases=[[rnd.randrange(2) for _ in range(0,strand_length)] for _ in range(0,4)]
+    strands=[]
+    for _ in range(0,num_strands):
+        codewords=list(rnd.choice(bases))
+        for _ in range(0,rnd.randrange(0,4)):
+            codewords[rnd.randrange(strand_length)]^=1
+        strands.append(make_strand(codewords,num_overhangs,overhang_length))
+    return strands
@@ -0,0 +1,54 @@
+'''
+Filename: test_carry_skips.py
+
+Description: Checks that the per height skip flags of _carry_skips skip the same sub reactions as the per codeword skip list the breadth first
+             lite builders used to keep
+
+'''
+import math
+import random
+import unittest
+import overhang_env
+import overhang.tree as tree
+from overhang.strand_geometry import strand_geometry
+
+
+def _walks(geometry,num_codewords,h,matches): #sub reactions walked per height, with the per codeword list and with _carry_skips
+    skip_list=[False]*num_codewords #True once the codeword's sub reaction at some height is optimized out
+    skipped=None
+    list_walked=[]
+    flag_walked=[]
+    for height in range(1,h+1)[::-1]:
+        segments=geometry.segments(height,num_codewords)
+        skipped=tree._carry_skips(skipped,len(segments),geometry.num_overhangs)
+        list_walked.append([_ for _,(first,end) in enumerate(segments) if not skip_list[first]])
+        flag_walked.append([_ for _ in range(0,len(segments)) if not skipped[_]])
+        for strandID in list_walked[-1]: #the walked sub reactions that match are optimized out along with everything below them
+            if (height,strandID) in matches:
+                first,end=segments[strandID]
+                for _ in range(first,end):
+                    skip_list[_]=True
+                skipped[strandID]=1
+    return list_walked,flag_walked
+
+
+class TestCarrySkips(unittest.TestCase):
+    def test_matches_skip_list(self):
+        rnd=random.Random(0)
+        for num_overhangs in [3,4,5,9]:
+            for num_codewords in [1,5,16,27,64,100]:
+                overhang_length=int(math.ceil(math.log(num_overhangs,4)))
+                geometry=strand_geometry(num_overhangs,overhang_length,1,max(num_codewords,2))
+                h=geometry.height
+                for _ in range(0,20):
+                    matches=set()
+                    for height in range(1,h+1):
+                        for strandID in range(0,geometry.sub_reaction_count(height,num_codewords)):
+                            if rnd.random()<0.2:
+                                matches.add((height,strandID))
+                    list_walked,flag_walked=_walks(geometry,num_codewords,h,matches)
+                    self.assertEqual(flag_walked,list_walked)
+
+
+if __name__=="__main__":
+    unittest.main()
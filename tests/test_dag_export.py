@@ -0,0 +1,105 @@
+'''
+Filename: test_dag_export.py
+
+Description: Checks that export_dag_csr and load_dag_csr give back the DAG a tree holds, for ReactionNode and NodeStore trees, and that
+             write_edge_list writes the same nodes and edges
+
+'''
+import math
+import os
+import shutil
+import tempfile
+import unittest
+import overhang_env
+import overhang.tree as tree
+from overhang.dag_export import export_dag_csr, load_dag_csr, write_edge_list
+
+
+def _tree_rows(reactiontree): #(height, use count, is_pad, is_term, child rows) per node in the order walk_nodes reaches them, children as walk positions
+    nodes=list(reactiontree.walk_nodes())
+    positions=dict([(_.get_index() if hasattr(_,'get_index') else id(_),position) for position,(_,children) in enumerate(nodes)])
+    position_of=lambda node: positions[node.get_index() if hasattr(node,'get_index') else id(node)]
+    return [(node.get_height(),node.get_use_count(),bool(node.is_pad()),bool(node.is_term()),[position_of(_) for _ in children]) for node,children in nodes]
+
+
+def _csr_rows(data,order): #rows of _tree_rows read from the exported arrays, order gives the node ID at each walk position
+    position_of=dict([(ID,position) for position,ID in enumerate(order)])
+    rows=[]
+    for ID in order:
+        children=data['children'][data['child_offsets'][ID]:data['child_offsets'][ID+1]].tolist()
+        rows.append((int(data['height'][ID]),int(data['use_count'][ID]),bool(data['is_pad'][ID]),bool(data['is_term'][ID]),[position_of[_] for _ in children]))
+    return rows
+
+
+class TestDagExport(unittest.TestCase):
+    def setUp(self):
+        self.directory=tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def trees(self):
+        for num_overhangs,strand_length in [(3,16),(5,20),(9,64)]:
+            strands=overhang_env.workload(30,num_overhangs,strand_length,num_overhangs+strand_length)
+            overhang_length=int(math.ceil(math.log(num_overhangs,4)))
+            for compact_nodes in [False,True]:
+                yield tree.construct_tree_ideal(strands,num_overhangs,overhang_length,1,strand_length,compact_nodes=compact_nodes)
+
+    def test_csr_round_trip(self):
+        for reactiontree in self.trees():
+            path=os.path.join(self.directory,"dag.npz")
+            num_nodes=export_dag_csr(reactiontree,path)
+            data=load_dag_csr(path)
+            stats=reactiontree.walk_stats()
+            self.assertEqual(num_nodes,stats["node_count"])
+            self.assertEqual(len(data['height']),num_nodes)
+            self.assertEqual(data['child_offsets'][-1],len(data['children']))
+            self.assertEqual(data['terminators'].tolist(),list(range(0,len(reactiontree._term_nodes)))) #terminators take the first IDs
+            #IDs are given out as nodes are first reached, so walk position -> ID follows the children of each node as it is reached
+            order=[]
+            seen=set()
+            for ID in data['terminators'].tolist():
+                seen.add(ID)
+            stack=list(reversed(data['terminators'].tolist()))
+            while stack:
+                ID=stack.pop()
+                order.append(ID)
+                children=data['children'][data['child_offsets'][ID]:data['child_offsets'][ID+1]].tolist()
+                for child in reversed(children):
+                    if child not in seen:
+                        seen.add(child)
+                        stack.append(child)
+            self.assertEqual(sorted(order),list(range(0,num_nodes)))
+            self.assertEqual(_csr_rows(data,order),_tree_rows(reactiontree))
+            self.assertEqual(data['pad_strands'][data['pad_strand']].tolist(),[b""]*num_nodes) #ideal trees are not padded
+
+    def test_edge_list(self):
+        for reactiontree in self.trees():
+            path=os.path.join(self.directory,"dag.npz")
+            export_dag_csr(reactiontree,path)
+            data=load_dag_csr(path)
+            with open(os.path.join(self.directory,"dag.txt"),"w") as out_file:
+                num_nodes,num_edges=write_edge_list(reactiontree,out_file)
+            with open(os.path.join(self.directory,"dag.txt")) as in_file:
+                lines=in_file.read().splitlines()
+            self.assertEqual((num_nodes,num_edges),(len(data['height']),len(data['children'])))
+            nodes={}
+            edges={} #parent ID -> child IDs in the order they were written
+            for line in lines:
+                if line.startswith("#"):
+                    continue
+                fields=line.split()
+                if fields[0]=="n":
+                    nodes[int(fields[1])]=tuple([int(_) for _ in fields[2:]])
+                else:
+                    self.assertEqual(fields[0],"e")
+                    edges.setdefault(int(fields[1]),[]).append(int(fields[2]))
+            self.assertEqual(sorted(nodes),list(range(0,num_nodes)))
+            for ID,(height,use_count,is_pad,is_term) in nodes.items():
+                self.assertEqual((height,use_count,is_pad,is_term),(data['height'][ID],data['use_count'][ID],int(data['is_pad'][ID]),int(data['is_term'][ID])))
+            for ID in range(0,num_nodes):
+                self.assertEqual(edges.get(ID,[]),data['children'][data['child_offsets'][ID]:data['child_offsets'][ID+1]].tolist())
+
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+'''
+Filename: test_inventory.py
+
+Description: Checks that a tree recorded in a reaction inventory is not counted again by a later build that reopens the inventory, and that
+             compacting an inventory keeps its use counts
+
+'''
+import glob
+import math
+import os
+import shutil
+import tempfile
+import unittest
+import overhang_env
+import overhang.tree as tree
+from overhang.inventory import ReactionInventory, ANY_OVERHANG
+
+NUM_OVERHANGS=5
+OVERHANG_LENGTH=int(math.ceil(math.log(NUM_OVERHANGS,4)))
+STRAND_LENGTH=64 #a power of NUM_OVERHANGS-1, so there is no padding and order() is the count of new reactions
+
+
+class TestReactionInventory(unittest.TestCase):
+    def setUp(self):
+        self.path=tempfile.mkdtemp()
+        self.strands=overhang_env.workload(30,NUM_OVERHANGS,STRAND_LENGTH,0)
+
+    def tearDown(self):
+        shutil.rmtree(self.path,ignore_errors=True)
+
+    def test_recorded_tree_is_not_counted_again(self):
+        for kind,builder in [("ideal",tree.construct_tree_ideal_lite),("baseopt",tree.construct_tree_baseopt_lite),("baseopt_w",tree.construct_tree_baseopt_lite_w)]:
+            path=os.path.join(self.path,kind)
+            first_tree=builder(self.strands,NUM_OVERHANGS,OVERHANG_LENGTH,1,STRAND_LENGTH,inventory=ReactionInventory(path))
+            self.assertTrue(first_tree.order()>0)
+            ReactionInventory(path).record_tree(first_tree,kind)
+            inventory=ReactionInventory(path) #reopened from disk
+            second_tree=builder(self.strands,NUM_OVERHANGS,OVERHANG_LENGTH,1,STRAND_LENGTH,inventory=inventory)
+            self.assertEqual(second_tree.order(),0)
+            self.assertTrue(inventory.hits>0)
+
+    def test_compact_keeps_counts(self):
+        inventory=ReactionInventory(self.path)
+        for count in [1,2,3]:
+            inventory.add(1,"0101",ANY_OVERHANG,count)
+            inventory.add(2,"0110",4,1)
+            inventory.flush()
+        self.assertEqual(len(glob.glob(os.path.join(self.path,"segment_*.high.npy"))),3)
+        inventory.compact()
+        self.assertEqual(len(glob.glob(os.path.join(self.path,"segment_*.high.npy"))),1)
+        for opened in [inventory,ReactionInventory(self.path)]:
+            self.assertEqual(opened.lookup(1,"0101",ANY_OVERHANG),6)
+            self.assertEqual(opened.lookup(2,"0110",4),3)
+            self.assertEqual(opened.lookup(2,"0110",3),0)
+            self.assertEqual(len(opened),2)
+
+
+if __name__=="__main__":
+    unittest.main()
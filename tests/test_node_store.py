@@ -0,0 +1,74 @@
+'''
+Filename: test_node_store.py
+
+Description: Checks the child views and identity of stored nodes, before and after a NodeStore is finished, and that child_csr gives back the
+             children that were added
+
+'''
+import math
+import unittest
+import overhang_env
+import overhang.tree as tree
+from overhang.node_store import NodeStore, StoredReactionNode
+
+
+def _store(): #five nodes, children added to nodes 0 and 1 in turn so their edges interleave in the log
+    store=NodeStore()
+    for ID in range(0,5):
+        store.add_node(ID,1,False)
+    for parent,child in [(0,2),(1,3),(0,3),(1,4),(0,4)]:
+        store.add_child(parent,child)
+    return store
+
+
+class TestNodeStore(unittest.TestCase):
+    def test_child_list(self):
+        for finished in [False,True]:
+            store=_store()
+            if finished:
+                store.finish()
+            children=StoredReactionNode(store,0).get_child_list()
+            self.assertEqual(len(children),3)
+            self.assertEqual([_.get_index() for _ in children],[2,3,4])
+            self.assertEqual(children[1].get_index(),3)
+            self.assertEqual(children[-1].get_index(),4)
+            self.assertRaises(IndexError,children.__getitem__,3)
+            self.assertRaises(IndexError,children.__getitem__,-4)
+            children[-1]=StoredReactionNode(store,1) #node_correction overwrites the last child
+            children[0]=StoredReactionNode(store,1)
+            self.assertEqual(store.children(0),[1,3,1])
+            self.assertEqual(store.children(1),[3,4])
+            self.assertEqual(len(StoredReactionNode(store,2).get_child_list()),0)
+        self.assertRaises(AssertionError,store.add_child,2,3) #a finished store takes no new children
+
+    def test_equality_and_hash(self):
+        store=_store()
+        other=_store()
+        self.assertEqual(StoredReactionNode(store,1),StoredReactionNode(store,1))
+        self.assertEqual(hash(StoredReactionNode(store,1)),hash(StoredReactionNode(store,1)))
+        self.assertNotEqual(StoredReactionNode(store,1),StoredReactionNode(store,2))
+        self.assertNotEqual(StoredReactionNode(store,1),StoredReactionNode(other,1))
+        self.assertNotEqual(StoredReactionNode(store,1),1)
+        self.assertEqual(len(set([StoredReactionNode(store,_%3) for _ in range(0,9)])),3)
+
+    def test_child_csr(self):
+        store=_store()
+        expected=[store.children(_) for _ in range(0,len(store))]
+        offsets,children=store.child_csr()
+        self.assertEqual(offsets.tolist(),[0,3,5,5,5,5])
+        self.assertEqual([children[offsets[_]:offsets[_+1]].tolist() for _ in range(0,len(store))],expected)
+        self.assertEqual([store.children(_) for _ in range(0,len(store))],expected)
+
+    def test_compact_nodes_match_reaction_nodes(self):
+        num_overhangs=5
+        strand_length=64
+        overhang_length=int(math.ceil(math.log(num_overhangs,4)))
+        strands=overhang_env.workload(30,num_overhangs,strand_length,0)
+        object_tree=tree.construct_tree_ideal(strands,num_overhangs,overhang_length,1,strand_length)
+        stored_tree=tree.construct_tree_ideal(strands,num_overhangs,overhang_length,1,strand_length,compact_nodes=True)
+        self.assertTrue(stored_tree.node_store.child_offsets is not None)
+        self.assertEqual(stored_tree.walk_stats(),object_tree.walk_stats())
+
+
+if __name__=="__main__":
+    unittest.main()
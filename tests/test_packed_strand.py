@@ -0,0 +1,64 @@
+'''
+Filename: test_packed_strand.py
+
+Description: Checks that packed strands unpack to the strands they were packed from, and that their data and substrand keys tell sub reactions
+             apart exactly when the string keys of the strand builders do
+
+'''
+import math
+import random
+import unittest
+import overhang_env
+from overhang.packed_strand import pack_strand, unpack_strand, PackedSegment
+
+
+def _strand(rnd,num_codewords,num_overhangs,codeword_length,bases): #codewords drawn from a few base strands so sub reactions repeat
+    overhang_length=int(math.ceil(math.log(num_overhangs,4)))
+    overhangs=[overhang_env.overhang(_,overhang_length) for _ in range(0,num_overhangs)]
+    codewords=list(rnd.choice(bases))[:num_codewords]
+    for _ in range(0,rnd.randrange(0,3)):
+        codewords[rnd.randrange(num_codewords)]="".join([rnd.choice("01") for _ in range(0,codeword_length)])
+    return overhangs[0]+"".join([codeword+overhangs[(index+1)%num_overhangs] for index,codeword in enumerate(codewords)])
+
+
+class TestPackedStrand(unittest.TestCase):
+    def test_round_trip(self):
+        rnd=random.Random(0)
+        for num_overhangs in [3,5,9,20]:
+            for codeword_length in [1,3,8]:
+                bases=[["".join([rnd.choice("01") for _ in range(0,codeword_length)]) for _ in range(0,40)] for _ in range(0,3)]
+                for num_codewords in [1,7,40]:
+                    s=_strand(rnd,num_codewords,num_overhangs,codeword_length,bases)
+                    packed=pack_strand(s,num_overhangs,codeword_length)
+                    self.assertEqual(len(packed),num_codewords)
+                    self.assertEqual(unpack_strand(packed,num_overhangs),s)
+                    overhang_length=int(math.ceil(math.log(num_overhangs,4)))
+                    stride=codeword_length+overhang_length
+                    self.assertEqual(packed.codewords().tolist(),[int(s[overhang_length+_*stride:overhang_length+_*stride+codeword_length],2) for _ in range(0,num_codewords)])
+
+    def test_keys_match_string_keys(self): #string keys as the strand builders cut them: data with the overhangs removed, and the substrand with both end overhangs
+        rnd=random.Random(1)
+        for num_overhangs in [3,5,9]:
+            overhang_length=int(math.ceil(math.log(num_overhangs,4)))
+            for codeword_length in [1,2]:
+                stride=codeword_length+overhang_length
+                bases=[["".join([rnd.choice("01") for _ in range(0,codeword_length)]) for _ in range(0,16)] for _ in range(0,2)]
+                data_keys={} #packed key -> string key
+                substrand_keys={}
+                for _ in range(0,10):
+                    s=_strand(rnd,16,num_overhangs,codeword_length,bases)
+                    packed=pack_strand(s,num_overhangs,codeword_length)
+                    for start in range(0,16):
+                        for end in range(start+1,17):
+                            substrand=s[start*stride:end*stride+overhang_length]
+                            data="".join([substrand[overhang_length+_*stride:overhang_length+_*stride+codeword_length] for _ in range(0,end-start)])
+                            self.assertEqual(data_keys.setdefault(packed.data_key(start,end),data),data)
+                            self.assertEqual(substrand_keys.setdefault(packed.substrand_key(start,end,num_overhangs),substrand),substrand)
+                            segment=PackedSegment(packed,start,end)
+                            self.assertEqual((segment.data_key(),segment.substrand_key(num_overhangs)),(packed.data_key(start,end),packed.substrand_key(start,end,num_overhangs)))
+                self.assertEqual(len(set(data_keys.values())),len(data_keys)) #no two packed keys stand for the same string key
+                self.assertEqual(len(set(substrand_keys.values())),len(substrand_keys))
+
+
+if __name__=="__main__":
+    unittest.main()
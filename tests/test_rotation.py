@@ -0,0 +1,63 @@
+'''
+Filename: test_rotation.py
+
+Description: Checks RotationShifts against the per codeword shift list the rotate builders used to keep, and the bitmask rotation_distance
+             against the search over a set of built overhang versions it replaced
+
+'''
+import random
+import unittest
+from overhang.rotation import RotationShifts, rotation_distance, has_mod, add_mod, mods_of
+
+
+def _set_distance(versions,strandIDmod,num_overhangs): #smallest forward rotation from strandIDmod onto a version in versions
+    distance=float('inf')
+    for dest in versions:
+        if strandIDmod<dest:
+            _distance=dest-strandIDmod
+        else:
+            _distance=num_overhangs-strandIDmod+dest
+        distance=min(distance,_distance)
+    return int(distance)
+
+
+class TestRotationShifts(unittest.TestCase):
+    def test_matches_shift_list(self): #suffix additions and per height rescales as the rotate builder does them
+        rnd=random.Random(0)
+        for num_overhangs in [3,4,5,9,17]:
+            for strand_length in [1,7,64,100]:
+                shifts=RotationShifts(strand_length,num_overhangs)
+                shift_list=[0]*strand_length
+                for _ in range(0,4):
+                    for _ in range(0,rnd.randrange(0,10)):
+                        position=rnd.randrange(strand_length)
+                        distance=rnd.randrange(1,num_overhangs)
+                        shifts.add_from(position,distance)
+                        for index in range(position,strand_length):
+                            shift_list[index]+=distance
+                        self.assertEqual([shifts[_] for _ in range(0,strand_length)],[_%num_overhangs for _ in shift_list])
+                    shifts.scale(num_overhangs-1)
+                    shift_list=[_*(num_overhangs-1) for _ in shift_list]
+                    self.assertEqual([shifts[_] for _ in range(0,strand_length)],[_%num_overhangs for _ in shift_list])
+
+
+class TestRotationDistance(unittest.TestCase):
+    def test_matches_set_search(self):
+        for num_overhangs in [3,4,5,9,20]:
+            for mods in range(1,1<<min(num_overhangs,10)):
+                versions=set(mods_of(mods))
+                self.assertEqual(versions,set([_ for _ in range(0,num_overhangs) if has_mod(mods,_)]))
+                for strandIDmod in range(0,num_overhangs):
+                    if strandIDmod in versions:
+                        continue
+                    self.assertEqual(rotation_distance(mods,strandIDmod,num_overhangs),_set_distance(versions,strandIDmod,num_overhangs))
+
+    def test_add_mod(self):
+        mods=0
+        for strandIDmod in [5,0,63,5]:
+            mods=add_mod(mods,strandIDmod)
+        self.assertEqual(mods_of(mods),[0,5,63])
+
+
+if __name__=="__main__":
+    unittest.main()
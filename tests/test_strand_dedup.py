@@ -0,0 +1,48 @@
+'''
+Filename: test_strand_dedup.py
+
+Description: Checks that ideal and baseopt lite builds grouping strands past their index region give the counts, h_arrays and tables of builds
+             walking every strand in full, including geometries with lone children where grouping falls back to full walks
+
+'''
+import math
+import random
+import unittest
+import overhang_env
+import overhang.tree as tree
+from overhang.packed_strand import pack_strand
+
+
+def _indexed_workload(num_strands,num_overhangs,strand_length,index_codewords,seed): #1 bit strands with a unique index, most repeat a base strand past it
+    overhang_length=int(math.ceil(math.log(num_overhangs,4)))
+    rnd=random.Random(seed)
+    bases=[[rnd.randrange(2) for _ in range(0,strand_length)] for _ in range(0,3)]
+    strands=[]
+    for strand_index in range(0,num_strands):
+        codewords=list(rnd.choice(bases)) if rnd.random()<0.8 else [rnd.randrange(2) for _ in range(0,strand_length)]
+        codewords[:index_codewords]=[(strand_index>>_)&1 for _ in range(0,index_codewords)]
+        strands.append(overhang_env.make_strand(codewords,num_overhangs,overhang_length))
+    return strands
+
+
+class TestStrandDedup(unittest.TestCase):
+    def test_matches_full_walks(self):
+        for num_overhangs,strand_length in [(3,16),(5,20),(9,64),(4,10),(5,17)]: #(4,10) and (5,17) have lone children
+            overhang_length=int(math.ceil(math.log(num_overhangs,4)))
+            strands=_indexed_workload(60,num_overhangs,strand_length,6,num_overhangs+strand_length)
+            for builder in [tree.construct_tree_ideal_lite,tree.construct_tree_baseopt_lite]:
+                h_array=[0]*8
+                full=builder(strands,num_overhangs,overhang_length,1,strand_length,h_array=h_array)
+                expected=(full.order(),h_array,dict(full.strand_hash_table))
+                for index_codewords in [0,6,9]:
+                    for dedup_strands in [strands,[pack_strand(_,num_overhangs,1) for _ in strands]]:
+                        h_array=[0]*8
+                        grouped=builder(dedup_strands,num_overhangs,overhang_length,1,strand_length,h_array=h_array,index_codewords=index_codewords)
+                        if dedup_strands is strands:
+                            self.assertEqual((grouped.order(),h_array,dict(grouped.strand_hash_table)),expected)
+                        else: #packed strands key the table with integers
+                            self.assertEqual((grouped.order(),h_array),expected[:2])
+
+
+if __name__=="__main__":
+    unittest.main()
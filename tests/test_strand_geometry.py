@@ -0,0 +1,47 @@
+'''
+Filename: test_strand_geometry.py
+
+Description: Checks the StrandGeometry plan against working the layout out from the strand string each time, and that plans are shared
+
+'''
+import math
+import random
+import unittest
+from overhang.strand_geometry import strand_geometry
+
+
+def _strand(rnd,num_codewords,codeword_length,overhang_length): #random overhangs and codewords, overhang first
+    letters="ACGT"
+    parts=["".join([rnd.choice(letters) for _ in range(0,overhang_length)])]
+    for _ in range(0,num_codewords):
+        parts.append("".join([rnd.choice("01") for _ in range(0,codeword_length)]))
+        parts.append("".join([rnd.choice(letters) for _ in range(0,overhang_length)]))
+    return "".join(parts)
+
+
+class TestStrandGeometry(unittest.TestCase):
+    def test_layout(self):
+        rnd=random.Random(0)
+        for num_overhangs in [3,5,9,20]:
+            overhang_length=int(math.ceil(math.log(num_overhangs,4)))
+            for codeword_length in [1,2,8]:
+                for strand_length in [2,7,16,64,100]:
+                    geometry=strand_geometry(num_overhangs,overhang_length,codeword_length,strand_length)
+                    self.assertTrue(geometry is strand_geometry(num_overhangs,overhang_length,codeword_length,strand_length))
+                    self.assertEqual(geometry.height,int(math.ceil(math.log(strand_length,num_overhangs-1))))
+                    self.assertEqual(geometry.full_height,int(math.log(strand_length,num_overhangs-1)))
+                    for num_codewords in [strand_length,strand_length//2+1]: #full strands and shorter ones
+                        s=_strand(rnd,num_codewords,codeword_length,overhang_length)
+                        stride=codeword_length+overhang_length
+                        codewords=[s[overhang_length+_*stride:overhang_length+_*stride+codeword_length] for _ in range(0,num_codewords)]
+                        self.assertEqual(geometry.payload(s),"".join(codewords))
+                        for height in range(0,geometry.height+1):
+                            size=(num_overhangs-1)**height
+                            bounds=[(_,min(_+size,num_codewords)) for _ in range(0,num_codewords,size)]
+                            self.assertEqual(geometry.segments(height,num_codewords),bounds)
+                            self.assertEqual(geometry.sub_reaction_count(height,num_codewords),len(bounds))
+                    self.assertEqual(geometry.segments(1),geometry.segments(1,strand_length))
+
+
+if __name__=="__main__":
+    unittest.main()
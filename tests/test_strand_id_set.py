@@ -0,0 +1,69 @@
+'''
+Filename: test_strand_id_set.py
+
+Description: Checks StrandIDSet against a python set while it is a sorted list, array containers and bitmap containers, and that to_bytes and
+             from_bytes give back the same set
+
+'''
+import random
+import unittest
+from overhang.strand_id_set import StrandIDSet, SMALL_LIMIT, ARRAY_LIMIT
+
+
+def _IDs(rnd,count,span):
+    return [rnd.randrange(span) for _ in range(0,count)]
+
+
+class TestStrandIDSet(unittest.TestCase):
+    def check_same(self,IDs,expected):
+        self.assertEqual(len(IDs),len(expected))
+        self.assertEqual(list(IDs),sorted(expected))
+        for ID in list(expected)[:100]:
+            self.assertTrue(ID in IDs)
+        for ID in [-1,max(expected)+1 if expected else 0,1<<20]:
+            self.assertEqual(ID in IDs,ID in expected)
+
+    def test_set_not_multiset(self): #strand IDs used to be kept in a list, a strand using a reaction twice is now held once
+        IDs=StrandIDSet()
+        self.assertTrue(IDs.add(7))
+        self.assertFalse(IDs.add(7))
+        IDs.update([3,7,3])
+        self.assertEqual(list(IDs),[3,7])
+        self.assertEqual(len(IDs),2)
+
+    def test_sizes(self): #sorted list, then array containers, then a bitmap container, with IDs in and out of order
+        rnd=random.Random(0)
+        for count in [0,1,SMALL_LIMIT,SMALL_LIMIT+1,100,ARRAY_LIMIT+10,20000]:
+            for span in [2*SMALL_LIMIT,70000,1<<20]:
+                IDs=_IDs(rnd,count,span)
+                self.check_same(StrandIDSet(IDs),set(IDs))
+                self.check_same(StrandIDSet(sorted(IDs)),set(IDs))
+
+    def test_update_union(self):
+        rnd=random.Random(1)
+        for first_count,second_count in [(3,4),(3,50),(50,3),(5000,6000),(0,5000)]:
+            first=_IDs(rnd,first_count,1<<18)
+            second=_IDs(rnd,second_count,1<<18)
+            union=StrandIDSet(first).union(StrandIDSet(second))
+            self.check_same(union,set(first)|set(second))
+            IDs=StrandIDSet(first)
+            IDs.update(StrandIDSet(second))
+            self.assertEqual(IDs,union)
+            IDs=StrandIDSet(first)
+            IDs.update(second)
+            self.assertEqual(IDs,union)
+
+    def test_bytes_round_trip(self):
+        rnd=random.Random(2)
+        for count in [0,3,SMALL_LIMIT+1,1000,20000]:
+            IDs=StrandIDSet(_IDs(rnd,count,1<<17))
+            copy=StrandIDSet.from_bytes(IDs.to_bytes())
+            self.assertEqual(copy,IDs)
+            self.assertEqual(list(copy),list(IDs))
+            copy.add(1<<17)
+            self.assertTrue(1<<17 in copy)
+        self.assertEqual(StrandIDSet([1,2]).to_bytes(),StrandIDSet.from_bytes(StrandIDSet([2,1]).to_bytes()).to_bytes()) #a small set is written like a container set
+
+
+if __name__=="__main__":
+    unittest.main()
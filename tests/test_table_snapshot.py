@@ -0,0 +1,39 @@
+'''
+Filename: test_table_snapshot.py
+
+Description: Checks that snapshots are written for the table kind the caller names and refused for tables of another kind
+
+'''
+import shutil
+import tempfile
+import unittest
+from overhang.table_snapshot import save_table_snapshot, TableSnapshot, HEIGHT_COUNTS, MOD_COUNTS, MOD_BITMASKS, TRANSFORM
+from overhang.transform_state import new_record
+
+
+class TestTableSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.path=tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path,ignore_errors=True)
+
+    def test_round_trip(self):
+        for table,kind,expected in [({"AC":(2<<32)|3,"GT":(1<<32)|1},HEIGHT_COUNTS,{"AC":(2<<32)|3,"GT":(1<<32)|1}),
+                                    ({"AC":{0:2,4:1}},MOD_COUNTS,{"AC":{0:2,4:1}}),
+                                    ({"AC":(1<<0)|(1<<5)},MOD_BITMASKS,{"AC":{0:1,5:1}})]:
+            save_table_snapshot(table,self.path,kind)
+            snapshot=TableSnapshot(self.path)
+            for key in expected:
+                self.assertEqual(snapshot[key],expected[key])
+            shutil.rmtree(self.path)
+
+    def test_wrong_kind_raises(self):
+        self.assertRaises(ValueError,save_table_snapshot,{"AC":new_record(3,True)},self.path,TRANSFORM)
+        self.assertRaises(ValueError,save_table_snapshot,{"AC":(1<<0)|(1<<5)},self.path,HEIGHT_COUNTS) #a rotate bitmask has no height
+        self.assertRaises(ValueError,save_table_snapshot,{"AC":new_record(3,True)},self.path,HEIGHT_COUNTS) #nor does a transform record
+        self.assertRaises(ValueError,save_table_snapshot,{"AC":(1<<32)|1},self.path,MOD_COUNTS)
+
+
+if __name__=="__main__":
+    unittest.main()
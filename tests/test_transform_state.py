@@ -0,0 +1,67 @@
+'''
+Filename: test_transform_state.py
+
+Description: Checks the packed transform records against the per strandIDmod dictionaries the transform lite builder used to keep, over random
+             sequences of lookups the builder makes
+
+'''
+import random
+import unittest
+from overhang.transform_state import new_record, has_version, add_version, use_version, transform_depth
+
+
+def _old_record(strandIDmod,transforms,num_overhangs): #strandIDmod -> [transform depth, use count(, version a depth 2 transform builds on)]
+    record={strandIDmod:[0,1,0]}
+    if transforms:
+        strandIDmod_a=(strandIDmod+1)%num_overhangs
+        strandIDmod_b=(strandIDmod-1)%num_overhangs
+        strandIDstart=strandIDmod_a
+        while strandIDstart!=strandIDmod:
+            if strandIDstart==strandIDmod_a or strandIDstart==strandIDmod_b:
+                record[strandIDstart]=[2,0,(strandIDmod+3)%num_overhangs]
+            else:
+                record[strandIDstart]=[1,0]
+            strandIDstart=(strandIDstart+1)%num_overhangs
+    return record
+
+
+def _old_use(record,strandIDmod): #reactions activated by a match on strandIDmod
+    activated=0
+    transform_info=record[strandIDmod]
+    if transform_info[0]>0 and transform_info[1]==0:
+        activated+=1
+        if transform_info[0]==2:
+            transform_info_2=record[transform_info[2]]
+            if transform_info_2[0]>0 and transform_info_2[1]==0:
+                activated+=1
+                transform_info_2[1]+=1
+    transform_info[1]+=1
+    return activated
+
+
+class TestTransformState(unittest.TestCase):
+    def test_matches_dict_records(self):
+        rnd=random.Random(0)
+        for num_overhangs in [3,4,5,6,9,17]:
+            for trial in range(0,200):
+                seed=rnd.randrange(num_overhangs)
+                transforms=num_overhangs>=5 and trial%4!=0 #height 1 data has no transforms
+                record=new_record(seed,transforms)
+                old_record=_old_record(seed,transforms,num_overhangs)
+                for _ in range(0,rnd.randrange(1,2*num_overhangs)):
+                    strandIDmod=rnd.randrange(num_overhangs)
+                    self.assertEqual(has_version(record,strandIDmod),strandIDmod in old_record)
+                    if strandIDmod in old_record:
+                        if transforms: #the builder only counts transform activations above height 1
+                            self.assertEqual(transform_depth(record,strandIDmod,num_overhangs),old_record[strandIDmod][0])
+                            record,activated=use_version(record,strandIDmod,num_overhangs)
+                            self.assertEqual(activated,_old_use(old_record,strandIDmod))
+                    else:
+                        record=add_version(record,strandIDmod)
+                        old_record[strandIDmod]=[0,1]
+                for strandIDmod in range(0,num_overhangs):
+                    self.assertEqual(has_version(record,strandIDmod),strandIDmod in old_record)
+
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+'''
+Filename: test_tree_approx.py
+
+Description: Checks that the approximate builders give the lite builders' counts while the sketches are exact, including strand lengths where a reaction has a lone child
+
+'''
+import math
+import unittest
+import overhang_env
+import overhang.tree as tree
+import overhang.tree_approx as tree_approx
+
+
+
+class TestApproxBuilders(unittest.TestCase):
+    def test_matches_lite_builders(self): #40 strands keep every sketch exact, (3,13), (5,17), (4,20) and (5,50) have lone children
+        for num_overhangs,strand_length in [(3,13),(5,17),(4,20),(5,50),(3,16),(5,64)]:
+            strands=overhang_env.workload(40,num_overhangs,strand_length,num_overhangs+strand_length)
+            overhang_length=int(math.ceil(math.log(num_overhangs,4)))
+            for approx,lite in [(tree_approx.construct_tree_ideal_approx,tree.construct_tree_ideal_lite),(tree_approx.construct_tree_baseopt_approx,tree.construct_tree_baseopt_lite)]:
+                approx_h_array=[0]*8
+                lite_h_array=[0]*8
+                approx_tree=approx(strands,num_overhangs,overhang_length,1,strand_length,h_array=approx_h_array)
+                lite_tree=lite(strands,num_overhangs,overhang_length,1,strand_length,h_array=lite_h_array)
+                self.assertEqual(approx_tree.order(),lite_tree.order())
+                self.assertEqual(approx_h_array,lite_h_array)
+
+    def test_generator_input(self): #a one shot input must reach the exact builder whole, whether the lone child is known up front or found mid stream
+        long_strands=overhang_env.workload(30,3,16,1)
+        for num_overhangs,strand_length,strands in [(4,10,overhang_env.workload(30,4,10,0)),
+                                                     (3,16,long_strands[:15]+overhang_env.workload(1,3,13,2)+long_strands[15:])]: #13 codewords at 3 overhangs have a lone child
+            overhang_length=int(math.ceil(math.log(num_overhangs,4)))
+            for approx,lite in [(tree_approx.construct_tree_ideal_approx,tree.construct_tree_ideal_lite),(tree_approx.construct_tree_baseopt_approx,tree.construct_tree_baseopt_lite)]:
+                approx_h_array=[0]*8
+                lite_h_array=[0]*8
+                approx_tree=approx(iter(strands),num_overhangs,overhang_length,1,strand_length,h_array=approx_h_array)
+                lite_tree=lite(strands,num_overhangs,overhang_length,1,strand_length,h_array=lite_h_array)
+                self.assertEqual(approx_tree.order(),lite_tree.order())
+                self.assertEqual(approx_h_array,lite_h_array)
+
+
+if __name__=="__main__":
+    unittest.main()
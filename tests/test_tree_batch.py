@@ -0,0 +1,51 @@
+'''
+Filename: test_tree_batch.py
+
+Description: Checks that the batch builders give the lite builders' counts and height maps, and that codeword_matrix stores codewords in the
+             smallest type that holds them
+
+'''
+import math
+import random
+import unittest
+import overhang_env
+import numpy as np
+import overhang.tree as tree
+import overhang.tree_batch as tree_batch
+from overhang.packed_strand import pack_strand
+
+
+class TestBatchBuilders(unittest.TestCase):
+    def test_matches_lite_builders(self): #(3,13) and (5,17) have lone children and fall back to the lite builders
+        chunk_bits=tree_batch._CHUNK_BITS
+        tree_batch._CHUNK_BITS=200 #several chunks per workload
+        try:
+            for num_overhangs,strand_length in [(3,13),(5,17),(3,16),(5,64),(9,100)]:
+                self.assertEqual(tree_batch.batch_geometry_ok(strand_length,strand_length,num_overhangs),(num_overhangs,strand_length) not in [(3,13),(5,17)])
+                strands=overhang_env.workload(40,num_overhangs,strand_length,num_overhangs+strand_length)
+                overhang_length=int(math.ceil(math.log(num_overhangs,4)))
+                packed_strands=[pack_strand(_,num_overhangs,1) for _ in strands]
+                for batch,lite in [(tree_batch.construct_tree_ideal_batch,tree.construct_tree_ideal_lite),(tree_batch.construct_tree_baseopt_batch,tree.construct_tree_baseopt_lite)]:
+                    lite_h_array=[0]*8
+                    lite_tree=lite(strands,num_overhangs,overhang_length,1,strand_length,h_array=lite_h_array)
+                    for batch_strands in [strands,packed_strands]:
+                        batch_h_array=[0]*8
+                        batch_tree=batch(batch_strands,num_overhangs,overhang_length,1,strand_length,h_array=batch_h_array)
+                        self.assertEqual(batch_tree.order(),lite_tree.order())
+                        self.assertEqual(batch_h_array,lite_h_array)
+        finally:
+            tree_batch._CHUNK_BITS=chunk_bits
+
+    def test_codeword_matrix(self):
+        rnd=random.Random(0)
+        for codeword_length,dtype in [(1,np.uint8),(8,np.uint8),(9,np.uint16),(20,np.uint32),(40,np.int64)]:
+            codewords=[[rnd.randrange(1<<codeword_length) for _ in range(0,10)] for _ in range(0,5)]
+            strands=[overhang_env.make_strand([format(_,'0{}b'.format(codeword_length)) for _ in row],5,2) for row in codewords]
+            for matrix_strands in [strands,[pack_strand(_,5,codeword_length) for _ in strands]]:
+                matrix=tree_batch.codeword_matrix(matrix_strands,2,codeword_length)
+                self.assertEqual(matrix.dtype,np.dtype(dtype))
+                self.assertEqual(matrix.tolist(),codewords)
+
+
+if __name__=="__main__":
+    unittest.main()
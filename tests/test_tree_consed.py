@@ -0,0 +1,31 @@
+'''
+Filename: test_tree_consed.py
+
+Description: Checks that the hash-consed builders give the lite builders' counts and height maps, for strand strings and packed strands
+
+'''
+import math
+import unittest
+import overhang_env
+import overhang.tree as tree
+from overhang.packed_strand import pack_strand
+
+
+class TestConsedBuilders(unittest.TestCase):
+    def test_matches_lite_builders(self): #(3,13) and (5,17) have lone children
+        for num_overhangs,strand_length in [(3,13),(5,17),(3,16),(5,64),(9,100)]:
+            strands=overhang_env.workload(40,num_overhangs,strand_length,num_overhangs+strand_length)
+            overhang_length=int(math.ceil(math.log(num_overhangs,4)))
+            packed_strands=[pack_strand(_,num_overhangs,1) for _ in strands]
+            for consed,lite in [(tree.construct_tree_ideal_consed,tree.construct_tree_ideal_lite),(tree.construct_tree_baseopt_consed,tree.construct_tree_baseopt_lite)]:
+                lite_h_array=[0]*8
+                lite_tree=lite(strands,num_overhangs,overhang_length,1,strand_length,h_array=lite_h_array)
+                for consed_strands in [strands,packed_strands]:
+                    consed_h_array=[0]*8
+                    consed_tree=consed(consed_strands,num_overhangs,overhang_length,1,strand_length,h_array=consed_h_array)
+                    self.assertEqual(consed_tree.order(),lite_tree.order())
+                    self.assertEqual(consed_h_array,lite_h_array)
+
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+'''
+Filename: test_tree_full.py
+
+Description: Regression test of the full ideal and baseopt builders on fixed strands. The expected node counts, pad node counts and h_arrays were
+             recorded from the recursive builders the iterative walks replaced, baseopt ones with the overhang_env stand in helpers
+
+'''
+import math
+import unittest
+import overhang_env
+import overhang.tree as tree
+
+#(num_overhangs, strand_length) -> (node count, pad node count, h_array) of the ideal build, then of the baseopt build for repair strategies 0, 1 and 2
+EXPECTED={(3,10):[(123,0,[21,24,12,0,0,0,0,0]),(137,0,[28,17,12,0,0,0,0,0]),(137,0,[28,17,12,0,0,0,0,0]),(138,1,[28,17,12,0,0,0,0,0])],
+          (4,30):[(161,0,[116,28,7,0,0,0,0,0]),(180,0,[101,27,7,0,0,0,0,0]),(180,0,[101,27,7,0,0,0,0,0]),(182,2,[101,27,7,0,0,0,0,0])],
+          (5,20):[(97,0,[78,7,0,0,0,0,0,0]),(114,0,[61,7,0,0,0,0,0,0]),(114,0,[61,7,0,0,0,0,0,0]),(114,0,[61,7,0,0,0,0,0,0])],
+          (9,64):[(85,0,[149,4,0,0,0,0,0,0]),(96,0,[138,4,0,0,0,0,0,0]),(96,0,[138,4,0,0,0,0,0,0]),(96,0,[138,4,0,0,0,0,0,0])]}
+
+
+def _build(builder,num_overhangs,strand_length,repair_strategy,compact_nodes):
+    strands=overhang_env.workload(30,num_overhangs,strand_length,num_overhangs+strand_length)
+    overhang_length=int(math.ceil(math.log(num_overhangs,4)))
+    h_array=[0]*8
+    reactiontree=builder(strands,num_overhangs,overhang_length,1,strand_length,repair_strategy,h_array=h_array,compact_nodes=compact_nodes)
+    return (reactiontree.order(),reactiontree._tree_stats["pad_node_count"],h_array)
+
+
+class TestFullBuilders(unittest.TestCase):
+    def test_ideal(self):
+        for (num_overhangs,strand_length),expected in EXPECTED.items():
+            for compact_nodes in [False,True]:
+                self.assertEqual(_build(tree.construct_tree_ideal,num_overhangs,strand_length,None,compact_nodes),expected[0])
+
+    @unittest.skipUnless(overhang_env.STAND_IN,"baseopt counts were recorded with the stand in create_corrected_strand_short")
+    def test_baseopt(self):
+        for (num_overhangs,strand_length),expected in EXPECTED.items():
+            for repair_strategy in [0,1,2]:
+                for compact_nodes in [False,True]:
+                    self.assertEqual(_build(tree.construct_tree_baseopt,num_overhangs,strand_length,repair_strategy,compact_nodes),expected[1+repair_strategy])
+
+
+if __name__=="__main__":
+    unittest.main()
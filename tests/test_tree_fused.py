@@ -0,0 +1,42 @@
+'''
+Filename: test_tree_fused.py
+
+Description: Checks that the fused builder gives every strategy the counts and height maps of its separate lite builder
+
+'''
+import math
+import unittest
+import overhang_env
+import overhang.tree as tree
+import overhang.tree_fused as tree_fused
+from overhang.packed_strand import pack_strand
+
+
+def _separate_builds(strands,num_overhangs,overhang_length,strand_length): #strategy -> (count, h_array) from the separate lite builders
+    builds={}
+    for strategy,builder in [(tree_fused.IDEAL,tree.construct_tree_ideal_lite),(tree_fused.BASEOPT,tree.construct_tree_baseopt_lite),
+                             (tree_fused.BASEOPT_W,tree.construct_tree_baseopt_lite_w),(tree_fused.TRANSFORM,tree.construct_tree_transform_lite)]:
+        h_array=[0]*8
+        builds[strategy]=(builder(strands,num_overhangs,overhang_length,1,strand_length,h_array=h_array),h_array)
+    h_array=[0]*8
+    rotate_tree=tree.construct_tree_rotate_lite(strands,num_overhangs,overhang_length,1,strand_length,h_array=h_array,opt_dictionary=builds[tree_fused.BASEOPT_W][0].strand_hash_table)
+    builds[tree_fused.ROTATE]=(rotate_tree,h_array)
+    return dict([(strategy,(reactiontree.order(),h_array)) for strategy,(reactiontree,h_array) in builds.items()])
+
+
+class TestFusedBuilder(unittest.TestCase):
+    def test_matches_separate_builders(self): #transform needs complete sub reactions, so strand lengths are powers of num_overhangs-1
+        for num_overhangs,strand_length in [(3,32),(5,64),(9,64)]:
+            strands=overhang_env.workload(40,num_overhangs,strand_length,num_overhangs+strand_length)
+            overhang_length=int(math.ceil(math.log(num_overhangs,4)))
+            expected=_separate_builds(strands,num_overhangs,overhang_length,strand_length)
+            packed_strands=[pack_strand(_,num_overhangs,1) for _ in strands]
+            for fused_strands in [strands,packed_strands,iter(strands)]: #an iterator is walked twice, since rotate needs the finished baseopt_w table
+                h_arrays=dict([(strategy,[0]*8) for strategy in tree_fused.ALL_STRATEGIES])
+                trees=tree_fused.construct_trees_fused_lite(fused_strands,num_overhangs,overhang_length,1,strand_length,h_arrays=h_arrays)
+                for strategy in tree_fused.ALL_STRATEGIES:
+                    self.assertEqual((trees[strategy].order(),h_arrays[strategy]),expected[strategy])
+
+
+if __name__=="__main__":
+    unittest.main()
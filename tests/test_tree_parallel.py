@@ -0,0 +1,34 @@
+'''
+Filename: test_tree_parallel.py
+
+Description: Checks that splitting a build across workers does not change its result
+
+'''
+import unittest
+import overhang_env
+import overhang.tree as tree
+import overhang.tree_parallel as tree_parallel
+
+
+
+class TestShardedBuilds(unittest.TestCase):
+    def test_baseopt_w_partial_sub_reactions(self): #(5,40) has no lone child but its last sub reactions are short, which baseopt_w does not take
+        strands=overhang_env.workload(20,5,40,0)
+        self.assertTrue(tree_parallel.sharded_geometry_ok(strands,5,2,1,40,tree_parallel.BASEOPT))
+        self.assertFalse(tree_parallel.sharded_geometry_ok(strands,5,2,1,40,tree_parallel.BASEOPT_W))
+        self.assertRaises(AssertionError,tree.construct_tree_baseopt_lite_w,strands,5,2,1,40)
+        self.assertRaises(AssertionError,tree.construct_tree_baseopt_lite_w,strands,5,2,1,40,workers=2)
+
+    def test_sharded_counts_match_serial(self):
+        strands=overhang_env.workload(40,5,64,1)
+        for builder in [tree.construct_tree_ideal_lite,tree.construct_tree_baseopt_lite,tree.construct_tree_baseopt_lite_w]:
+            serial_h_array=[0]*4
+            sharded_h_array=[0]*4
+            serial=builder(strands,5,2,1,64,h_array=serial_h_array)
+            sharded=builder(strands,5,2,1,64,h_array=sharded_h_array,workers=2)
+            self.assertEqual(serial.order(),sharded.order())
+            self.assertEqual(serial_h_array,sharded_h_array)
+
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+'''
+Filename: test_tree_sample.py
+
+Description: Checks that sampled estimates are only fit per height on tables that hold (height<<32)|count values
+
+'''
+import math
+import unittest
+import overhang_env
+import overhang.tree as tree
+import overhang.tree_sample as tree_sample
+
+NUM_OVERHANGS=33
+OVERHANG_LENGTH=int(math.ceil(math.log(NUM_OVERHANGS,4)))
+STRAND_LENGTH=1024 #a power of NUM_OVERHANGS-1, the transform builder needs complete sub reactions
+
+
+def _transform_build(strands):
+    return tree.construct_tree_transform_lite(strands,NUM_OVERHANGS,OVERHANG_LENGTH,1,STRAND_LENGTH)
+
+
+def _rotate_build(strands):
+    opt_tree=tree.construct_tree_baseopt_lite_w(strands,NUM_OVERHANGS,OVERHANG_LENGTH,1,STRAND_LENGTH)
+    return tree.construct_tree_rotate_lite(strands,NUM_OVERHANGS,OVERHANG_LENGTH,1,STRAND_LENGTH,opt_dictionary=opt_tree.strand_hash_table)
+
+
+def _ideal_build(strands):
+    return tree.construct_tree_ideal_lite(strands,NUM_OVERHANGS,OVERHANG_LENGTH,1,STRAND_LENGTH)
+
+
+class TestSampledEstimates(unittest.TestCase):
+    def setUp(self):
+        self.strands=overhang_env.workload(400,NUM_OVERHANGS,STRAND_LENGTH,0)
+
+    def test_height_counts_rejects_packed_records(self): #transform records and rotate bitmasks are not (height<<32)|count values
+        for build in [_transform_build,_rotate_build]:
+            self.assertRaises(ValueError,tree_sample._height_counts,build(self.strands[:64]))
+        counts=tree_sample._height_counts(_ideal_build(self.strands[:64]))
+        self.assertTrue(all([1<=_<=int(math.ceil(math.log(STRAND_LENGTH,NUM_OVERHANGS-1))) for _ in counts]))
+
+    def test_sampled_transform_build(self):
+        exact=_transform_build(self.strands).order()
+        estimate=tree_sample.estimate_order_sampled(_transform_build,self.strands,NUM_OVERHANGS,STRAND_LENGTH,rel_tolerance=0.5)
+        self.assertFalse(estimate.exact)
+        self.assertLess(abs(estimate.order-exact),0.25*exact)
+        self.assertRaises(ValueError,tree_sample.estimate_order_sampled,_transform_build,self.strands,NUM_OVERHANGS,STRAND_LENGTH,per_height=True)
+
+    def test_sampled_rotate_build(self): #rotate tables hold overhang version bitmasks
+        exact=_rotate_build(self.strands).order()
+        estimate=tree_sample.estimate_order_sampled(_rotate_build,self.strands,NUM_OVERHANGS,STRAND_LENGTH,rel_tolerance=0.5)
+        self.assertLess(abs(estimate.order-exact),0.25*exact)
+
+    def test_sampled_ideal_build_per_height(self): #a sample holding every strand is an exact build
+        exact=_ideal_build(self.strands).order()
+        estimate=tree_sample.estimate_order_sampled(_ideal_build,self.strands,NUM_OVERHANGS,STRAND_LENGTH,pad_nodes_counted=True,per_height=True,initial_strands=len(self.strands))
+        self.assertTrue(estimate.exact)
+        self.assertEqual(int(round(estimate.order)),exact)
+
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+'''
+Filename: test_unopt_model.py
+
+Description: Checks that unopt_model_grid matches unopt_strand_model at every point of a grid of overhang counts and strand lengths
+
+'''
+import unittest
+import numpy as np
+from overhang.reaction_node import unopt_strand_model, unopt_model_grid
+
+
+class TestUnoptModelGrid(unittest.TestCase):
+    def test_matches_strand_model(self):
+        overhang_counts=np.array([3,4,5,9,17,33,65])
+        strand_lengths=np.array(list(range(2,300))+[511,512,513,1024,1025,4099])
+        for repair_strategy in [None,0,1,2]:
+            grid=unopt_model_grid(overhang_counts[:,np.newaxis],strand_lengths[np.newaxis,:],repair_strategy)
+            for overhang_index,num_overhangs in enumerate(overhang_counts):
+                for length_index,strand_length in enumerate(strand_lengths):
+                    expected=unopt_strand_model(int(num_overhangs),int(strand_length),repair_strategy)
+                    self.assertEqual(tuple([int(_[overhang_index,length_index]) for _ in grid]),expected)
+
+
+if __name__=="__main__":
+    unittest.main()
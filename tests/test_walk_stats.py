@@ -0,0 +1,91 @@
+'''
+Filename: test_walk_stats.py
+
+Description: Checks collect_stats and walk_stats against a recursive walk with a visited set, the way tree_walk counted nodes before it was
+             made iterative, on DAGs where nodes are shared by several parents
+
+'''
+import math
+import unittest
+import overhang_env
+import overhang.tree as tree
+from overhang.reaction_node import ReactionNode, ReactionTree
+
+
+def _recursive_stats(reactiontree): #each node reachable from the terminators is counted once, the first time a parent reaches it
+    visited=set()
+    stats={"node_count":0,"pad_node_count":0,"height_counts":{},"pad_height_counts":{},"fan_out":{},"use_counts":{}}
+    parent_edges={}
+    def key(node):
+        return node.get_index() if hasattr(node,'get_index') else id(node)
+    def count(counts,value):
+        counts[value]=counts.get(value,0)+1
+    def walk(node):
+        stats["node_count"]+=1
+        count(stats["height_counts"],node.get_height())
+        if node.is_pad():
+            stats["pad_node_count"]+=1
+            count(stats["pad_height_counts"],node.get_height())
+        count(stats["use_counts"],node.get_use_count())
+        count(stats["fan_out"],len(node.get_child_list()))
+        for child in node.get_child_list():
+            count(parent_edges,key(child))
+            if key(child) not in visited:
+                visited.add(key(child))
+                walk(child)
+    for terminator in reactiontree._term_nodes:
+        if key(terminator) not in visited:
+            visited.add(key(terminator))
+            walk(terminator)
+    fan_in={}
+    if stats["node_count"]>len(parent_edges):
+        fan_in[0]=stats["node_count"]-len(parent_edges)
+    for edges in parent_edges.values():
+        count(fan_in,edges)
+    stats["fan_in"]=fan_in
+    return stats
+
+
+class TestWalkStats(unittest.TestCase):
+    def check_tree(self,reactiontree):
+        expected=_recursive_stats(reactiontree)
+        for _ in range(0,2): #a second walk has to reach the nodes the first one marked
+            self.assertEqual(reactiontree.collect_stats(),expected)
+            self.assertEqual(reactiontree.order(),expected["node_count"])
+            self.assertEqual(reactiontree._tree_stats["pad_node_count"],expected["pad_node_count"])
+
+    def test_shared_nodes(self): #two terminators sharing a child, and a grandchild shared inside one subtree
+        reactiontree=ReactionTree(3,1,1,4,None,None)
+        bottom=[ReactionNode(0,1,False) for _ in range(0,3)]
+        middle=[ReactionNode(0,2,False) for _ in range(0,2)]
+        pad=ReactionNode(0,-1,True)
+        middle[0].add_child(bottom[0])
+        middle[0].add_child(bottom[1])
+        middle[1].add_child(bottom[1])
+        middle[1].add_child(bottom[2])
+        middle[1].add_child(pad)
+        for index in range(0,2):
+            terminator=ReactionNode(index,3,False)
+            terminator.set_term()
+            terminator.add_child(middle[0])
+            terminator.add_child(middle[index])
+            reactiontree.add_terminator(terminator)
+        bottom[1].inc_use_count()
+        middle[0].inc_use_count()
+        self.check_tree(reactiontree)
+        self.assertEqual(reactiontree.order(),8)
+        self.assertEqual(reactiontree.walk_stats([middle[1]])["node_count"],4)
+
+    def test_built_trees(self):
+        for num_overhangs,strand_length in [(3,10),(4,30),(9,64)]:
+            strands=overhang_env.workload(30,num_overhangs,strand_length,num_overhangs+strand_length)
+            overhang_length=int(math.ceil(math.log(num_overhangs,4)))
+            for compact_nodes in [False,True]:
+                ideal_tree=tree.construct_tree_ideal(strands,num_overhangs,overhang_length,1,strand_length,compact_nodes=compact_nodes)
+                self.assertTrue(max(_recursive_stats(ideal_tree)["fan_in"])>1) #reactions are shared
+                self.check_tree(ideal_tree)
+                self.check_tree(tree.construct_tree_baseopt(strands,num_overhangs,overhang_length,1,strand_length,2,compact_nodes=compact_nodes))
+
+
+if __name__=="__main__":
+    unittest.main()
@@ -19,9 +19,28 @@ if __name__ == "__main__":
     parser.add_argument('--cw_size',dest='cw_size',action="store_true",default=False,help="Do codeword size experiment")
     parser.add_argument('--1_bit',dest='_1_bit',action="store_true",default=False,help="Do 1 bit analysis")
     parser.add_argument('--pickled_results', dest='pickled_results',action="store",default=None,help="path to pickled results that will be plotted by the analysis chosen")
+    parser.add_argument('--packed',dest='packed',action="store_true",default=False,help="Pass packed strands (payload bits in bytes) to the tree builders to save memory")
+    parser.add_argument('--digest_keys',dest='digest_keys',action="store_true",default=False,help="Key the lite builders' strand hash tables on 128 bit digests to cut memory use")
+    parser.add_argument('--digest_audit_rate',dest='digest_audit_rate',action="store",type=float,default=0.0,help="Fraction of digest keys kept in full to check for digest collisions")
+    parser.add_argument('--batch',dest='batch',action="store_true",default=False,help="Count ideal and baseopt trees with the vectorized numpy engine")
+    parser.add_argument('--consed',dest='consed',action="store_true",default=False,help="Key the ideal and baseopt tables on interned sub reaction IDs built bottom up instead of sub reaction strings")
+    parser.add_argument('--workers',dest='workers',action="store",type=int,default=None,help="Number of processes used to build the ideal and baseopt trees")
+    parser.add_argument('--stream',dest='stream',action="store_true",default=False,help="Stream strands into each tree build, built from the cached codeword payloads, instead of keeping the strand strings in memory")
+    parser.add_argument('--spill_budget',dest='spill_budget',action="store",type=int,default=None,help="Megabytes of strand hash table kept in memory before cold partitions are spilled to disk")
+    parser.add_argument('--spill_dir',dest='spill_dir',action="store",default=None,help="Directory used for strand hash table spill files")
+    parser.add_argument('--fused',dest='fused',action="store_true",default=False,help="Build the transform, optimized and ideal trees of the 1 bit analysis with one walk over the strands")
+    parser.add_argument('--approx',dest='approx',action="store_true",default=False,help="Estimate ideal and baseopt reaction counts with HyperLogLog sketches instead of exact strand hash tables")
+    parser.add_argument('--sample',dest='sample',action="store",type=float,default=None,help="Estimate the 1 bit reaction counts from growing random strand samples, stopping once the confidence interval half width is below this fraction of the estimate")
+    parser.add_argument('--snapshot_dir',dest='snapshot_dir',action="store",default=None,help="Directory the optimized tables are written to as memory mapped snapshots, the rotate builds read them from there")
     args = parser.parse_args()
 
-    t_analysis=tree_analysis(w_dir=args.w_dir, random_data=False, out_dir=args.out_dir, pickle=args.pickled_results)
+    t_analysis=tree_analysis(w_dir=args.w_dir, random_data=False, out_dir=args.out_dir, pickle=args.pickled_results, packed_strands=args.packed,
+                             digest_keys=args.digest_keys, digest_audit_rate=args.digest_audit_rate,
+                             batch_engine=args.batch, consed_builds=args.consed, workers=args.workers,
+                             stream_strands=args.stream,
+                             spill_budget=None if args.spill_budget is None else args.spill_budget*(1<<20), spill_dir=args.spill_dir,
+                             fused_engine=args.fused, approx_counts=args.approx,
+                             sample_tolerance=args.sample, snapshot_dir=args.snapshot_dir)
 
     if args._1_bit:
         #codeword size = 1 bit experiments